@@ -5,11 +5,65 @@
 ANALYSIS_CONFIG = {
     'min_data_points': 50,
     'significance_level': 0.05,
-    'test_period': '1y'
+    'test_period': '1y',
+    # Тип цен панели при поиске пар: 'float32' вдвое уменьшает память
+    'price_dtype': 'float64'
+}
+
+# Предварительный отбор пар-кандидатов (src.prefilter) перед тестом коинтеграции
+PREFILTER_CONFIG = {
+    'method': 'correlation',  # 'correlation' (|corr| цен) или 'distance' (расстояние нормированных цен)
+    'top_k': None,            # k лучших соседей каждого тикера (None - без отбора по соседям)
+    'threshold': None,        # порог оценки пары (None - без порога)
+}
+
+# Значимость пар: эмпирические p-value по репликам и поправка на множественные сравнения
+SIGNIFICANCE_CONFIG = {
+    'replicates': 0,          # число реплик (0 - асимптотические p-value МакКиннона)
+    'method': 'bootstrap',    # 'bootstrap' (блоки с возвращением) или 'permutation'
+    'block_size': None,       # длина блока (None - T^(1/3))
+    'screen': 0.2,            # реплики только для пар с асимптотическим p-value не выше
+    'seed': 0,
+    'fdr_level': None,        # уровень FDR Бенджамини-Хохберга (None - без поправки)
+}
+
+# Перебор параметров стратегии (python main.py sweep)
+SWEEP_CONFIG = {
+    'entry_grid': (1.5, 2.0, 2.5),        # пороги входа по |z|
+    'exit_grid': (0.0, 0.5, 1.0),         # пороги выхода (только меньше порога входа)
+    'lookbacks': (20, 60),                # окна z-score, дней
+    'significance_levels': (0.01, 0.05),  # портфели из пар с p-value не выше уровня
+    'cost_bps': 5.0,                      # издержки, б.п. от объема сделки
 }
 
 # Настройки визуализации
 VIZ_CONFIG = {
     'fig_size': (12, 8),
     'style': 'seaborn-v0_8'
-}
\ No newline at end of file
+}
+
+# Данные: хранилище цен, CSV для совместимости и тикеры для загрузки
+DATA_CONFIG = {
+    'store': 'data/prices_store',
+    'csv': 'data/stocks_prices.csv',
+    'tickers': [
+        'AAPL',    # Apple
+        'MSFT',    # Microsoft
+        'GOOGL',   # Google
+        'AMZN',    # Amazon
+        'META',    # Meta (Facebook)
+        'TSLA',    # Tesla
+        'NVDA',    # NVIDIA
+        'JPM',     # JPMorgan
+        'JNJ',     # Johnson & Johnson
+        'V',       # Visa
+        'PG',      # Procter & Gamble
+        'UNH',     # UnitedHealth
+        'HD',      # Home Depot
+        'DIS',     # Disney
+        'BAC',     # Bank of America
+        'MA',      # Mastercard
+        'CVX',     # Chevron
+        'XOM',     # Exxon Mobil
+    ],
+}
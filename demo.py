@@ -3,9 +3,37 @@
 Скрипт для демонстрации функционала научному руководителю
 """
 
+import glob
 import os
-import pandas as pd
-from datetime import datetime
+
+def show_latest_run(store):
+    """Сводка по последнему запуску из хранилища результатов"""
+    latest = store.latest_run()
+    if latest is None:
+        print("   • Результаты не найдены. Запустите python main.py")
+        return
+    print(f"   📊 Последний анализ (запуск {latest['run_id']}, {latest['created']}):")
+    print(f"      Найдено пар: {latest['n_pairs']}")
+    if latest['data_start']:
+        print(f"      Период данных: {latest['data_start']} - {latest['data_end']}")
+    for pair in store.run_pairs(latest['run_id'], limit=3):
+        print(f"      {pair['ticker_x']} - {pair['ticker_y']}: p-value {pair['p_value']:.6f}, "
+              f"R² {pair['r_squared']:.4f}, beta {pair['beta']:.4f}")
+    print(f"      Всего запусков в хранилище: {len(store.runs())}")
+
+def show_latest_text_result():
+    """Последний best_pair_*.txt - результаты запусков до хранилища pairs.sqlite"""
+    # Время запуска входит в имя файла, поэтому последний по имени - самый свежий
+    results_files = sorted(glob.glob('results/best_pair_*.txt'))
+    if not results_files:
+        print("   • Результаты не найдены. Запустите python main.py")
+        return
+    with open(results_files[-1], 'r', encoding='utf-8') as f:
+        content = f.read()
+    print("   📊 Последний анализ:")
+    for line in content.split('\n'):
+        if line.strip():
+            print(f"      {line}")
 
 def show_demo():
     print("=" * 60)
@@ -23,33 +51,43 @@ def show_demo():
     
     # Показываем информацию о данных
     print("\n2. ДАННЫЕ ДЛЯ АНАЛИЗА:")
-    if os.path.exists('data/stocks_prices.csv'):
-        data = pd.read_csv('data/stocks_prices.csv', index_col=0, parse_dates=True)
+    from src.price_store import PriceStore
+    store = PriceStore('data/prices_store')
+    if store.exists() or os.path.exists('data/stocks_prices.csv'):
+        if store.exists():
+            data = store.read()
+        else:
+            import pandas as pd
+            data = pd.read_csv('data/stocks_prices.csv', index_col=0, parse_dates=True)
         print(f"   • Акций: {data.shape[1]}")
         print(f"   • Торговых дней: {data.shape[0]}")
         print(f"   • Период: {data.index[0].strftime('%Y-%m-%d')} - {data.index[-1].strftime('%Y-%m-%d')}")
         print(f"   • Примеры акций: {', '.join(data.columns.tolist()[:3])}...")
     else:
-        print("   • Данные не найдены. Запустите scripts/download_data.py")
+        print("   • Данные не найдены. Запустите python main.py download")
     
     # Показываем последние результаты
     print("\n3. РЕЗУЛЬТАТЫ АНАЛИЗА:")
-    results_files = [f for f in os.listdir('results') if f.endswith('.txt')]
-    if results_files:
-        latest_result = max(results_files)
-        with open(f'results/{latest_result}', 'r', encoding='utf-8') as f:
-            content = f.read()
-            print("   📊 Последний анализ:")
-            for line in content.split('\n'):
-                if line.strip():
-                    print(f"      {line}")
+    # Последний запуск - из хранилища результатов, а не по имени файла
+    if os.path.exists('results/pairs.sqlite'):
+        from src.result_store import ResultStore
+        store = ResultStore('results/pairs.sqlite', pool_size=1)
+        try:
+            show_latest_run(store)
+        finally:
+            store.close()
     else:
-        print("   • Результаты не найдены. Запустите python main.py")
+        show_latest_text_result()
     
     print("\n4. ЗАПУСК АНАЛИЗА:")
     print("   • python main.py          # Полный анализ")
-    print("   • python demo.py          # Эта демонстрация")
-    print("   • python scripts/download_data.py # Загрузка данных")
+    print("   • python main.py scan     # Только поиск пар, без графиков")
+    print("   • python main.py report   # Графики пар из последних результатов")
+    print("   • python main.py demo     # Эта демонстрация")
+    print("   • python main.py download # Загрузка данных")
+    print("   • python main.py query --ticker XOM --beta 0.5 2 --last-runs 30  # Пары из истории запусков")
+    print("   • python main.py serve    # HTTP/JSON запросы: /pairs?ticker=XOM&last_runs=30")
+    print("   • python scripts/convert_prices.py # CSV -> бинарное хранилище")
     
     print("\n" + "=" * 60)
     print("Для подробного анализа запустите: python main.py")
@@ -2,13 +2,29 @@
 """
 Главный файл для запуска анализа коинтеграции
 Полная версия с анализом коинтеграции
+
+Подкоманды:
+    python main.py [run]     # полный анализ (по умолчанию)
+    python main.py scan      # только поиск и сохранение пар, без бэктеста и графиков
+    python main.py report    # графики пар из последних сохраненных результатов
+    python main.py sweep     # перебор порогов и окон стратегии на сохраненных парах
+    python main.py download  # загрузка цен
+    python main.py query     # пары из хранилища запусков results/pairs.sqlite
+    python main.py serve     # HTTP/JSON сервис запросов к хранилищу
+    python main.py demo      # краткая сводка по проекту
+
+Тяжелые модули (pandas, statsmodels, matplotlib) импортируются только
+в тех подкомандах, которым они нужны. Параметры анализа и графиков
+берутся из config.py.
 """
 
+import argparse
 import logging
-import pandas as pd
 import os
 from datetime import datetime
 
+from config import ANALYSIS_CONFIG, DATA_CONFIG, PREFILTER_CONFIG, SIGNIFICANCE_CONFIG, SWEEP_CONFIG, VIZ_CONFIG
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -17,30 +33,93 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def main():
-    """Основная функция запуска анализа"""
+PRICES_CSV = DATA_CONFIG['csv']
+PRICES_STORE = DATA_CONFIG['store']
+
+PAIR_CACHE = 'results/pair_cache.sqlite'
+RESULTS_DB = 'results/pairs.sqlite'
+
+def main(n_jobs=1, tickers=None, start=None, end=None, use_cache=True, stream_dir=None, top_k=100,
+         max_basket_size=0, dynamic_hedge=False, plots_dir=None, profile=None, backtest=True, plots=True,
+         replicates=SIGNIFICANCE_CONFIG['replicates'], fdr_level=SIGNIFICANCE_CONFIG['fdr_level'],
+         prefilter_top_k=PREFILTER_CONFIG['top_k']):
+    """Основная функция запуска анализа
+    
+    Время этапов и счетчики тестов пишутся в results/run_report_*.json;
+    profile ('cprofile' или 'sample') дополнительно профилирует запуск.
+    backtest=False и plots=False пропускают бэктест и графики (подкоманда scan).
+    replicates > 0 заменяет p-value пар эмпирическими (SIGNIFICANCE_CONFIG),
+    fdr_level отбирает пары по q-value Бенджамини-Хохберга; с stream_dir
+    поправка невозможна (нужны все тесты сразу), такое сочетание - ошибка.
+    prefilter_top_k оставляет для теста только k лучших соседей каждого
+    тикера (метод и порог - PREFILTER_CONFIG).
+    """
+    if stream_dir and fdr_level is not None:
+        raise ValueError("Контроль FDR несовместим с потоковой записью (stream_dir)")
+    from src.metrics import RunMetrics, profiled
+    settings = dict(n_jobs=n_jobs, tickers=tickers, start=start, end=end, use_cache=use_cache,
+                    stream_dir=stream_dir, top_k=top_k, max_basket_size=max_basket_size,
+                    dynamic_hedge=dynamic_hedge, plots_dir=plots_dir, backtest=backtest, plots=plots,
+                    replicates=replicates, fdr_level=fdr_level, prefilter_top_k=prefilter_top_k)
+    metrics = RunMetrics()
+    run = {'status': 'failed'}
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    profile_summary = {}
+    try:
+        with profiled(profile, f'results/profile_{timestamp}') as profile_summary:
+            run_analysis(metrics, run, **settings)
+    finally:
+        logger.info("Время этапов:")
+        metrics.log_summary()
+        report_file = metrics.write(f'results/run_report_{timestamp}.json',
+                                    settings=dict(settings, profile=profile, config=ANALYSIS_CONFIG,
+                                                  significance=SIGNIFICANCE_CONFIG, prefilter=PREFILTER_CONFIG),
+                                    profile=profile_summary or None, **run)
+        logger.info(f"Отчет о запуске сохранен в: {report_file}")
+
+def load_prices(fetcher, tickers=None, start=None, end=None):
+    """Цены из бинарного хранилища или CSV; None, если данных нет"""
+    from src.price_store import PriceStore
+    
+    # Бинарное хранилище быстрее, CSV - запасной вариант
+    if PriceStore(PRICES_STORE).exists():
+        return fetcher.load_from_store(PRICES_STORE, tickers=tickers, start=start, end=end)
+    if os.path.exists(PRICES_CSV):
+        logger.info("Хранилище не найдено, читаем CSV (scripts/convert_prices.py ускорит загрузку)")
+        price_data = fetcher.load_from_csv(PRICES_CSV)
+        if price_data is not None:
+            fetcher.data = price_data = price_data.loc[start:end, tickers or price_data.columns]
+        return price_data
+    logger.error(f"Файл {PRICES_CSV} не найден")
+    logger.info("Сначала загрузите данные: python main.py download")
+    return None
+
+def run_analysis(metrics, run, n_jobs=1, tickers=None, start=None, end=None, use_cache=True,
+                 stream_dir=None, top_k=100, max_basket_size=0, dynamic_hedge=False, plots_dir=None,
+                 backtest=True, plots=True, replicates=0, fdr_level=None, prefilter_top_k=None):
+    """Этапы анализа; run заполняется сведениями о запуске для отчета"""
     logger.info("=== ЗАПУСК АНАЛИЗА КОИНТЕГРАЦИИ ===")
     
     try:
         # 1. Загрузка данных
         logger.info("1. Загрузка данных...")
         
-        # Проверяем существование файла с данными
-        if not os.path.exists('data/stocks_prices.csv'):
-            logger.error("Файл data/stocks_prices.csv не найден")
-            logger.info("Сначала запустите scripts/download_data.py для загрузки данных")
-            return
-        
         from src.data_fetcher import DataFetcher
         fetcher = DataFetcher()
-        price_data = fetcher.load_from_csv('data/stocks_prices.csv')
+        
+        with metrics.timer('load'):
+            price_data = load_prices(fetcher, tickers=tickers, start=start, end=end)
         
         if price_data is None:
             logger.error("Не удалось загрузить данные")
+            run['status'] = 'no_data'
             return
+        run['raw_shape'] = list(price_data.shape)
         
         # Подготовка данных
-        clean_data = fetcher.prepare_data(min_data_points=50)
+        with metrics.timer('prepare'):
+            clean_data = fetcher.prepare_data(min_data_points=ANALYSIS_CONFIG['min_data_points'])
+        run['data_shape'] = list(clean_data.shape)
         logger.info(f"Данные готовы: {clean_data.shape[1]} акций")
         
         # 2. Покажем базовую информацию о данных
@@ -52,44 +131,121 @@ def main():
         # 3. Анализ коинтеграции
         logger.info("3. Поиск коинтегрированных пар...")
         from src.cointegration_tester import CointegrationTester
-        tester = CointegrationTester(significance_level=0.05)
-        cointegrated_pairs = tester.find_cointegrated_pairs(clean_data)
+        from src.result_cache import PairResultCache
+        cache = PairResultCache(PAIR_CACHE) if use_cache else None
+        significance = None
+        if replicates > 0:
+            from src.significance import SignificanceEngine
+            significance = SignificanceEngine(replicates, method=SIGNIFICANCE_CONFIG['method'],
+                                              block_size=SIGNIFICANCE_CONFIG['block_size'],
+                                              seed=SIGNIFICANCE_CONFIG['seed'],
+                                              screen=SIGNIFICANCE_CONFIG['screen'], n_jobs=n_jobs)
+        prefilter = None
+        if prefilter_top_k is not None or PREFILTER_CONFIG['threshold'] is not None:
+            from src.prefilter import PairPrefilter
+            prefilter = PairPrefilter(PREFILTER_CONFIG['method'], top_k=prefilter_top_k,
+                                      threshold=PREFILTER_CONFIG['threshold'])
+        tester = CointegrationTester(significance_level=ANALYSIS_CONFIG['significance_level'],
+                                     min_data_points=ANALYSIS_CONFIG['min_data_points'],
+                                     n_jobs=n_jobs, cache=cache, metrics=metrics,
+                                     dtype=ANALYSIS_CONFIG['price_dtype'],
+                                     significance=significance, fdr_level=fdr_level, prefilter=prefilter)
+        with metrics.timer('scan'):
+            if stream_dir:
+                # Все пары пишутся на диск частями, в памяти - только лучшие top_k
+                from src.result_stream import scan_to_disk
+                cointegrated_pairs = scan_to_disk(tester, clean_data, stream_dir, top_k=top_k)
+                logger.info(f"Все найденные пары записаны в {stream_dir}")
+            else:
+                cointegrated_pairs = tester.find_cointegrated_pairs(clean_data)
+        run['stage_counts'] = dict(tester.stage_counts)
+        if cache is not None:
+            run['cache'] = {'hits': cache.hits, 'misses': cache.misses}
         
         if not cointegrated_pairs:
             logger.warning("Коинтегрированные пары не найдены")
+            run['status'] = 'no_pairs'
             return
         
+        # Корзины из графа найденных пар (тест Йохансена)
+        if max_basket_size >= 3:
+            from src.basket_search import BasketSearch
+            with metrics.timer('baskets'):
+                baskets = BasketSearch(max_size=max_basket_size).search(clean_data, cointegrated_pairs)
+            run['n_baskets'] = len(baskets)
+            for basket in baskets[:3]:
+                logger.info(f"  Корзина {basket}")
+        
+        hedge = None
+        if backtest:
+            # Бэктест стратегии на найденных парах
+            from src.strategy import PairsBacktester
+            with metrics.timer('backtest'):
+                if dynamic_hedge:
+                    # Меняющиеся alpha, beta (фильтр Калмана) вместо статической регрессии
+                    from src.kalman_hedge import DynamicHedge
+                    hedge = DynamicHedge().fit(clean_data, cointegrated_pairs)
+                backtest_result = PairsBacktester().run(clean_data, cointegrated_pairs, hedge=hedge)
+            portfolio = backtest_result['portfolio']
+            logger.info(f"Бэктест портфеля пар: доходность {portfolio['total_return']:.2%}, "
+                        f"Sharpe {portfolio['sharpe']:.2f}, просадка {portfolio['max_drawdown']:.2%}, "
+                        f"сделок {portfolio['n_trades']}")
+        
         # 4. Визуализация результатов
-        logger.info("4. Визуализация результатов...")
-        from src.visualizer import Visualizer
-        viz = Visualizer()
-        
-        # Топ пар
-        viz.plot_top_pairs(cointegrated_pairs, top_n=min(10, len(cointegrated_pairs)))
-        
-        # Детальный анализ лучших пар
-        top_pairs_to_show = min(3, len(cointegrated_pairs))
-        logger.info(f"\nТоп-{top_pairs_to_show} коинтегрированных пар:")
-        for i in range(top_pairs_to_show):
-            pair = cointegrated_pairs[i]
-            logger.info(f"  {i+1}. {pair['ticker_x']}-{pair['ticker_y']}: "
-                       f"p-value: {pair['p_value']:.4f}, R²: {pair['r_squared']:.3f}")
+        if plots:
+            logger.info("4. Визуализация результатов...")
+            from src.visualizer import Visualizer
             
-            viz.plot_price_comparison(clean_data, pair)
-            viz.plot_spread(pair)
+            if plots_dir:
+                # Без экрана: графики всех пар в файлы
+                with metrics.timer('plots'):
+                    paths = Visualizer(output_dir=plots_dir, **VIZ_CONFIG).render_pairs(
+                        clean_data, cointegrated_pairs, spreads=None if hedge is None else hedge['spread'],
+                        n_jobs=n_jobs)
+                run['n_plots'] = len(paths)
+            else:
+                viz = Visualizer(**VIZ_CONFIG)
+                with metrics.timer('plots'):
+                    # Топ пар
+                    viz.plot_top_pairs(cointegrated_pairs, top_n=min(10, len(cointegrated_pairs)))
+                    
+                    # Детальный анализ лучших пар
+                    top_pairs_to_show = min(3, len(cointegrated_pairs))
+                    logger.info(f"\nТоп-{top_pairs_to_show} коинтегрированных пар:")
+                    for i in range(top_pairs_to_show):
+                        pair = cointegrated_pairs[i]
+                        logger.info(f"  {i+1}. {pair['ticker_x']}-{pair['ticker_y']}: "
+                                   f"p-value: {pair['p_value']:.4f}, R²: {pair['r_squared']:.3f}")
+                        
+                        viz.plot_price_comparison(clean_data, pair)
+                        if hedge is None:
+                            viz.plot_spread(pair)
+                        else:
+                            viz.plot_spread(pair, spread=hedge['spread'][(pair['ticker_x'], pair['ticker_y'])])
         
         # 5. Сохраняем результаты
         logger.info("5. Сохранение результатов...")
-        save_results(cointegrated_pairs, clean_data)
+        with metrics.timer('save'):
+            save_results(cointegrated_pairs, clean_data,
+                         settings=dict(tickers=tickers, start=start, end=end, replicates=replicates,
+                                       fdr_level=fdr_level, prefilter_top_k=prefilter_top_k,
+                                       config=ANALYSIS_CONFIG))
+        run['n_pairs'] = len(cointegrated_pairs)
+        run['status'] = 'ok'
         
         logger.info("=== АНАЛИЗ ЗАВЕРШЕН УСПЕШНО ===")
-        
+    
     except Exception as e:
         logger.error(f"Критическая ошибка: {e}")
         raise
 
-def save_results(cointegrated_pairs, price_data):
-    """Сохранение результатов анализа"""
+def save_results(cointegrated_pairs, price_data, settings=None, db=RESULTS_DB):
+    """Сохранение результатов анализа
+    
+    Кроме CSV и best_pair_*.txt запуск записывается в хранилище db
+    (src.result_store), по которому работают подкоманды query и serve.
+    """
+    import pandas as pd
     try:
         # Создаем папку для результатов
         os.makedirs('results', exist_ok=True)
@@ -104,10 +260,14 @@ def save_results(cointegrated_pairs, price_data):
                 'Alpha': p['alpha'],
                 'Beta': p['beta'],
                 'R_Squared': p['r_squared'],
-                'Hedge_Ratio': p['beta']
+                'Hedge_Ratio': p['beta'],
+                'Q_Value': p.get('q_value', float('nan'))
             }
             for p in cointegrated_pairs
         ])
+        # Столбец q-value - только если применялась поправка FDR
+        if 'Q_Value' in pairs_df and pairs_df['Q_Value'].isna().all():
+            pairs_df = pairs_df.drop(columns='Q_Value')
         
         results_file = f'results/cointegrated_pairs_{timestamp}.csv'
         pairs_df.to_csv(results_file, index=False)
@@ -121,15 +281,270 @@ def save_results(cointegrated_pairs, price_data):
                 f.write(f"Лучшая коинтегрированная пара:\n")
                 f.write(f"Пара: {best_pair['ticker_x']} - {best_pair['ticker_y']}\n")
                 f.write(f"P-value: {best_pair['p_value']:.6f}\n")
+                if 'Q_Value' in pairs_df:
+                    f.write(f"Q-value (FDR): {best_pair['q_value']:.6f}\n")
                 f.write(f"R²: {best_pair['r_squared']:.4f}\n")
                 f.write(f"Alpha: {best_pair['alpha']:.4f}\n")
                 f.write(f"Beta: {best_pair['beta']:.4f}\n")
                 f.write(f"Hedge Ratio: {best_pair['beta']:.4f}\n")
             
             logger.info(f"Информация о лучшей паре сохранена в: {best_pair_file}")
-            
+        
+        if db:
+            from src.result_store import ResultStore
+            store = ResultStore(db, pool_size=1)
+            try:
+                store.add_run(cointegrated_pairs, price_data, results_file=results_file, settings=settings)
+            finally:
+                store.close()
+    
     except Exception as e:
         logger.error(f"Ошибка при сохранении результатов: {e}")
 
+def report(results='results', plots_dir=None, n_jobs=1, top_n=None, tickers=None, start=None, end=None):
+    """Графики пар из сохраненных результатов без повторного поиска
+    
+    results - хранилище запусков, CSV save_results или каталог (берется
+    последний запуск, см. load_pairs).
+    Возвращает пути созданных файлов.
+    """
+    from src.data_fetcher import DataFetcher
+    from src.live_monitor import load_pairs
+    from src.pair_result import PairResult
+    from src.visualizer import Visualizer
+    
+    table = load_pairs(results)
+    fetcher = DataFetcher()
+    if load_prices(fetcher, tickers=tickers, start=start, end=end) is None:
+        return []
+    price_data = fetcher.prepare_data(min_data_points=ANALYSIS_CONFIG['min_data_points'])
+    
+    known = table['ticker_x'].isin(price_data.columns) & table['ticker_y'].isin(price_data.columns)
+    if not known.all():
+        logger.warning(f"Пропущено пар без данных о ценах: {int((~known).sum())}")
+    pairs = [PairResult(row.ticker_x, row.ticker_y, row.p_value, row.alpha, row.beta, row.r_squared, price_data,
+                        row.q_value)
+             for row in table[known].head(top_n).itertuples()]
+    
+    plots_dir = plots_dir or f"results/plots_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    return Visualizer(output_dir=plots_dir, **VIZ_CONFIG).render_pairs(price_data, pairs, n_jobs=n_jobs)
+
+def sweep(results='results', output=None, by='portfolio', n_jobs=1, tickers=None, start=None, end=None):
+    """Перебор параметров стратегии (SWEEP_CONFIG) на сохраненных парах
+    
+    Пары берутся из results, как в report. Таблица ParameterSweep
+    пишется в output (по умолчанию results/sweep_*.csv); возвращает
+    путь файла или None, если нет данных или пар.
+    """
+    from src.data_fetcher import DataFetcher
+    from src.live_monitor import load_pairs
+    from src.strategy import ParameterSweep
+    
+    table = load_pairs(results)
+    fetcher = DataFetcher()
+    if load_prices(fetcher, tickers=tickers, start=start, end=end) is None:
+        return None
+    price_data = fetcher.prepare_data(min_data_points=ANALYSIS_CONFIG['min_data_points'])
+    
+    known = table['ticker_x'].isin(price_data.columns) & table['ticker_y'].isin(price_data.columns)
+    if not known.all():
+        logger.warning(f"Пропущено пар без данных о ценах: {int((~known).sum())}")
+    pairs = table[known].to_dict('records')
+    if not pairs:
+        logger.warning("Нет пар для перебора параметров")
+        return None
+    
+    result = ParameterSweep(n_jobs=n_jobs, **SWEEP_CONFIG).run(price_data, pairs, by=by)
+    output = output or f"results/sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    result.to_csv(output, index=False)
+    logger.info(f"Таблица перебора ({len(result)} строк) сохранена в: {output}")
+    return output
+
+def download(tickers=None, store=PRICES_STORE, start=None, csv=PRICES_CSV):
+    """Инкрементальная загрузка цен в хранилище и выгрузка в CSV"""
+    from src.price_store import PriceStore
+    from src.price_updater import IncrementalUpdater
+    
+    tickers = tickers or DATA_CONFIG['tickers']
+    print("Начинаем загрузку данных")
+    print(f"Загружаем данные для {len(tickers)} акций")
+    
+    try:
+        price_store = PriceStore(store)
+        updater = IncrementalUpdater(price_store)
+        added = updater.update(tickers, start=start)
+        
+        if not price_store.exists():
+            print("Данные не загружены")
+            return
+        
+        prices = price_store.read()
+        print(f"Успешно загружено!")
+        print(f"Добавлено новых значений: {added}")
+        print(f"Размер данных: {prices.shape}")
+        print(f"Период: {prices.index[0].strftime('%Y-%m-%d')} - {prices.index[-1].strftime('%Y-%m-%d')}")
+        print(f"Всего торговых дней: {len(prices)}")
+        
+        # Выгрузка в CSV для совместимости
+        if csv:
+            prices.to_csv(csv)
+            print(f"\nДанные выгружены в '{csv}'")
+        
+        # Быстрая проверка качества
+        print(f"\nПроверим качество данных:")
+        missing_data = prices.isnull().sum()
+        print("Пропуски по акциям:")
+        for ticker, missing in missing_data.items():
+            if missing > 0:
+                print(f"   {ticker}: {missing} пропусков")
+            else:
+                print(f"   {ticker}: нет пропусков")
+    
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+def build_parser():
+    """Парсер командной строки с подкомандами"""
+    # Общие группы аргументов
+    data = argparse.ArgumentParser(add_help=False)
+    data.add_argument('--tickers', nargs='+', default=None, help="Анализировать только эти тикеры")
+    data.add_argument('--start', default=None, help="Начало периода (YYYY-MM-DD)")
+    data.add_argument('--end', default=None, help="Конец периода (YYYY-MM-DD)")
+    
+    scan = argparse.ArgumentParser(add_help=False)
+    scan.add_argument('--n-jobs', type=int, default=1,
+                      help="Число процессов для поиска пар (-1 - все ядра)")
+    scan.add_argument('--no-cache', action='store_true', help="Не использовать кэш результатов пар")
+    scan.add_argument('--stream-dir', default=None,
+                      help="Писать найденные пары на диск в этот каталог (с продолжением после сбоя)")
+    scan.add_argument('--top-k', type=int, default=100,
+                      help="Сколько лучших пар держать в памяти при --stream-dir")
+    scan.add_argument('--max-basket-size', type=int, default=0,
+                      help="Искать корзины из 3..N акций по графу пар (0 - не искать)")
+    scan.add_argument('--bootstrap', type=int, default=SIGNIFICANCE_CONFIG['replicates'], metavar='N',
+                      help="Эмпирические p-value по N репликам (метод и блоки - в config.py, 0 - асимптотические)")
+    scan.add_argument('--fdr', type=float, default=SIGNIFICANCE_CONFIG['fdr_level'], metavar='Q',
+                      help="Отбор пар по q-value Бенджамини-Хохберга на уровне FDR Q")
+    scan.add_argument('--prefilter-top-k', type=int, default=PREFILTER_CONFIG['top_k'], metavar='K',
+                      help="Тестировать только K лучших соседей каждого тикера (метод - в config.py)")
+    scan.add_argument('--profile', choices=('cprofile', 'sample'), default=None,
+                      help="Профилировать запуск: cprofile (точный, results/profile_*.prof) "
+                           "или sample (выборочный, почти без замедления)")
+    
+    run = argparse.ArgumentParser(add_help=False)
+    run.add_argument('--dynamic-hedge', action='store_true',
+                     help="Динамический коэффициент хеджирования (фильтр Калмана)")
+    run.add_argument('--plots-dir', default=None,
+                     help="Сохранять графики всех найденных пар в этот каталог вместо показа на экране")
+    
+    # Общие аргументы - только у подкоманд: иначе значения по умолчанию
+    # подкоманды затирают флаги, указанные перед ней
+    parser = argparse.ArgumentParser(description="Анализ коинтеграции пар акций")
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('run', parents=[data, scan, run], help="Полный анализ: поиск, бэктест, графики")
+    commands.add_parser('scan', parents=[data, scan], help="Только поиск и сохранение пар")
+    
+    report_parser = commands.add_parser('report', parents=[data], help="Графики пар из сохраненных результатов")
+    report_parser.add_argument('--results', default='results',
+                               help="Хранилище запусков (*.sqlite), CSV save_results или каталог с ними")
+    report_parser.add_argument('--plots-dir', default=None, help="Каталог графиков (по умолчанию results/plots_*)")
+    report_parser.add_argument('--n-jobs', type=int, default=1, help="Число процессов отрисовки")
+    report_parser.add_argument('--top-n', type=int, default=None, help="Только N лучших пар")
+    
+    sweep_parser = commands.add_parser('sweep', parents=[data],
+                                       help="Перебор порогов и окон стратегии (сетки - в config.py)")
+    sweep_parser.add_argument('--results', default='results',
+                              help="Хранилище запусков (*.sqlite), CSV save_results или каталог с ними")
+    sweep_parser.add_argument('--output', default=None, help="CSV таблицы (по умолчанию results/sweep_*.csv)")
+    sweep_parser.add_argument('--by', choices=('portfolio', 'pair'), default='portfolio',
+                              help="Строка на портфель уровня значимости или на пару")
+    sweep_parser.add_argument('--n-jobs', type=int, default=1, help="Число процессов (по окнам z-score)")
+    
+    download_parser = commands.add_parser('download', help="Инкрементальная загрузка цен")
+    download_parser.add_argument('--store', default=PRICES_STORE, help="Каталог хранилища цен")
+    download_parser.add_argument('--tickers', nargs='+', default=None,
+                                 help="Список тикеров (по умолчанию из config.py)")
+    download_parser.add_argument('--start', default=None,
+                                 help="Начало истории для новых тикеров (по умолчанию год назад)")
+    download_parser.add_argument('--csv', default=PRICES_CSV, help="Куда выгрузить CSV ('' - не выгружать)")
+    
+    query_parser = commands.add_parser('query', help="Пары из хранилища запусков (JSON)")
+    query_parser.add_argument('--db', default=RESULTS_DB, help="Файл хранилища запусков")
+    query_parser.add_argument('--ticker', default=None, help="Пары, содержащие тикер")
+    query_parser.add_argument('--beta', nargs=2, type=float, default=None, metavar=('MIN', 'MAX'),
+                              help="Диапазон beta")
+    query_parser.add_argument('--p-max', type=float, default=None, help="Максимальный p-value")
+    query_parser.add_argument('--last-runs', type=int, default=None, help="Только последние N запусков")
+    query_parser.add_argument('--limit', type=int, default=None, help="Не больше N пар")
+    
+    serve_parser = commands.add_parser('serve', help="Локальный HTTP/JSON сервис запросов к хранилищу")
+    serve_parser.add_argument('--db', default=RESULTS_DB, help="Файл хранилища запусков")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="Адрес сервиса")
+    serve_parser.add_argument('--port', type=int, default=8765, help="Порт сервиса")
+    
+    commands.add_parser('demo', help="Краткая сводка по проекту")
+    parser.commands = tuple(commands.choices)
+    return parser
+
+def parse_args(argv=None):
+    """Аргументы командной строки
+    
+    Без подкоманды - полный анализ с прежними аргументами (подставляется run).
+    """
+    import sys
+    parser = build_parser()
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in parser.commands and argv[0] not in ('-h', '--help')):
+        misplaced = [arg for arg in argv if arg in parser.commands]
+        if misplaced:
+            parser.error(f"аргументы указываются после подкоманды: {misplaced[0]} ...")
+        argv.insert(0, 'run')
+    args = parser.parse_args(argv)
+    if getattr(args, 'stream_dir', None) and getattr(args, 'fdr', None) is not None:
+        parser.error("--fdr несовместим с --stream-dir: поправка Бенджамини-Хохберга требует всех тестов сразу")
+    return args
+
+def cli(argv=None):
+    """Точка входа: разбор аргументов и запуск подкоманды"""
+    args = parse_args(argv)
+    if args.command == 'download':
+        download(tickers=args.tickers, store=args.store, start=args.start, csv=args.csv)
+    elif args.command == 'demo':
+        from demo import show_demo
+        show_demo()
+    elif args.command == 'query':
+        import json
+        from src.result_store import ResultStore
+        if not os.path.exists(args.db):
+            logger.error(f"Хранилище запусков {args.db} не найдено")
+            return
+        beta_min, beta_max = args.beta or (None, None)
+        store = ResultStore(args.db, pool_size=1)
+        try:
+            rows = store.pairs(ticker=args.ticker, beta_min=beta_min, beta_max=beta_max, p_max=args.p_max,
+                               last_runs=args.last_runs, limit=args.limit)
+        finally:
+            store.close()
+        print(json.dumps(rows, ensure_ascii=False, indent=1))
+    elif args.command == 'serve':
+        from src.query_service import serve
+        serve(args.db, host=args.host, port=args.port)
+    elif args.command == 'report':
+        paths = report(results=args.results, plots_dir=args.plots_dir, n_jobs=args.n_jobs, top_n=args.top_n,
+                       tickers=args.tickers, start=args.start, end=args.end)
+        logger.info(f"Создано графиков: {len(paths)}")
+    elif args.command == 'sweep':
+        sweep(results=args.results, output=args.output, by=args.by, n_jobs=args.n_jobs,
+              tickers=args.tickers, start=args.start, end=args.end)
+    else:
+        full = args.command == 'run'
+        main(n_jobs=args.n_jobs, tickers=args.tickers, start=args.start, end=args.end,
+             use_cache=not args.no_cache, stream_dir=args.stream_dir, top_k=args.top_k,
+             max_basket_size=args.max_basket_size, dynamic_hedge=full and args.dynamic_hedge,
+             plots_dir=args.plots_dir if full else None, profile=args.profile, backtest=full, plots=full,
+             replicates=args.bootstrap, fdr_level=args.fdr, prefilter_top_k=args.prefilter_top_k)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
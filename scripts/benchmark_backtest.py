@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк векторного бэктеста: P пар за N лет
+
+Пример:
+    python scripts/benchmark_backtest.py --pairs 1000 --years 10
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.strategy import PairsBacktester, TRADING_DAYS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время бэктеста многих пар")
+    parser.add_argument('--pairs', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = np.random.default_rng(0)
+    n_days = args.years * TRADING_DAYS
+    x = 100 + rng.normal(size=(n_days, args.pairs)).cumsum(axis=0)
+    y = 10 + 0.9 * x + rng.normal(size=x.shape).cumsum(axis=0) * 0.1 + rng.normal(size=x.shape)
+    columns = [f'X{i}' for i in range(args.pairs)] + [f'Y{i}' for i in range(args.pairs)]
+    prices = pd.DataFrame(np.hstack([x, y]), index=pd.bdate_range('2010-01-01', periods=n_days),
+                          columns=columns)
+    pairs = [{'ticker_x': f'X{i}', 'ticker_y': f'Y{i}', 'alpha': 10.0, 'beta': 0.9}
+             for i in range(args.pairs)]
+
+    start = time.perf_counter()
+    result = PairsBacktester().run(prices, pairs)
+    elapsed = time.perf_counter() - start
+    print(f"{args.pairs} пар x {n_days} дней: {elapsed:.2f} с")
+    print(f"Сделок: {result['portfolio']['n_trades']}, Sharpe портфеля: {result['portfolio']['sharpe']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк времени запуска: импорт модулей и подкоманды main.py
+
+Каждая команда запускается в новом интерпретаторе (лучшее из --repeat
+запусков). Для модулей дополнительно выводится время импорта по
+python -X importtime и тяжелые пакеты, которые он подтягивает.
+
+Пример:
+    python scripts/benchmark_import.py --repeat 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('pandas', 'statsmodels', 'matplotlib', 'scipy', 'seaborn')
+
+COMMANDS = [
+    ('python -c pass', ['-c', 'pass']),
+    ('python main.py --help', ['main.py', '--help']),
+    ('python main.py demo', ['main.py', 'demo']),
+]
+MODULES = ['main', 'config', 'src.metrics', 'src.cointegration_tester', 'src.visualizer',
+           'src.live_monitor', 'src.strategy']
+
+
+def best_time(args, repeat):
+    """Лучшее время запуска интерпретатора с аргументами args"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def import_profile(module):
+    """Суммарное время импорта (с) по -X importtime и загруженные тяжелые пакеты"""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].rstrip() == ' ' + module:
+            total = int(parts[1])
+    return total / 1e6, result.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время импорта и запуска подкоманд")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print("Запуск команд:")
+    for name, command in COMMANDS:
+        print(f"  {name:<32} {best_time(command, args.repeat):8.3f} с")
+
+    print("\nИмпорт модулей (-X importtime):")
+    for module in MODULES:
+        seconds, heavy = import_profile(module)
+        print(f"  {module:<32} {seconds:8.3f} с  {heavy or '-'}")
+
+
+if __name__ == "__main__":
+    main()
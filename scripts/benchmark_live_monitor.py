@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк онлайн-мониторинга: задержка обработки одного тика при P парах
+
+Пример:
+    python scripts/benchmark_live_monitor.py --tickers 500 --pairs 5000 --ticks 100000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.live_monitor import ZScoreMonitor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка ZScoreMonitor на тик")
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--pairs', type=int, default=5000)
+    parser.add_argument('--ticks', type=int, default=100000)
+    parser.add_argument('--window', type=int, default=60)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = np.random.default_rng(0)
+    names = [f'S{i:04d}' for i in range(args.tickers)]
+    ix, iy = np.triu_indices(args.tickers, k=1)
+    chosen = rng.choice(len(ix), size=min(args.pairs, len(ix)), replace=False)
+    pairs = pd.DataFrame({
+        'ticker_x': [names[i] for i in ix[chosen]],
+        'ticker_y': [names[i] for i in iy[chosen]],
+        'alpha': rng.normal(size=len(chosen)),
+        'beta': rng.uniform(0.5, 1.5, size=len(chosen)),
+    })
+    monitor = ZScoreMonitor(pairs, window=args.window)
+
+    # Поток одиночных тиков: случайный тикер, цена - случайное блуждание
+    prices = 100 + np.zeros(args.tickers)
+    tickers = rng.integers(args.tickers, size=args.ticks)
+    steps = rng.normal(scale=0.1, size=args.ticks)
+    n_signals = 0
+    start = time.perf_counter()
+    for k in range(args.ticks):
+        t = tickers[k]
+        prices[t] += steps[k]
+        n_signals += len(monitor.update(k, {names[t]: prices[t]}))
+    elapsed = time.perf_counter() - start
+
+    per_ticker = len(chosen) * 2 / args.tickers
+    print(f"{len(chosen)} пар, {args.tickers} тикеров (~{per_ticker:.0f} пар на тикер), окно {args.window}")
+    print(f"{args.ticks} тиков за {elapsed:.2f} с: средняя задержка "
+          f"{monitor.latency_total / monitor.ticks * 1e6:.1f} мкс, "
+          f"максимальная {monitor.latency_max * 1e6:.1f} мкс, сигналов {n_signals}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк всего конвейера на синтетических данных с заложенными парами
+
+Замеряет load_from_csv, prepare_data, find_cointegrated_pairs и
+save_results для нескольких размеров панели, проверяет полноту поиска
+заложенных пар и сравнивает результат с сохраненной базовой линией.
+Код возврата 1 - есть регрессия времени или полноты.
+
+Пример:
+    python scripts/benchmark_pipeline.py --sizes 100x500 400x1000
+    python scripts/benchmark_pipeline.py --save-baseline
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import save_results
+from src.cointegration_tester import CointegrationTester
+from src.data_fetcher import DataFetcher
+from src.synthetic import synthetic_prices
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'pipeline.json')
+STAGES = ('load_from_csv', 'prepare_data', 'find_cointegrated_pairs', 'save_results')
+
+
+def timed(func, repeat):
+    """Лучшее время из repeat запусков и результат последнего"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_size(n_tickers, n_days, n_linked, repeat, seed):
+    """Время этапов и полнота для одной панели N x T"""
+    prices, planted = synthetic_prices(n_tickers, n_days, n_linked, seed=seed, late_start=0.05)
+    timings = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'stocks_prices.csv')
+        prices.to_csv(csv_path)
+        fetcher = DataFetcher()
+
+        timings['load_from_csv'], _ = timed(lambda: fetcher.load_from_csv(csv_path), repeat)
+        timings['prepare_data'], clean_data = timed(lambda: fetcher.prepare_data(min_data_points=50), repeat)
+        timings['find_cointegrated_pairs'], pairs = timed(
+            lambda: CointegrationTester().find_cointegrated_pairs(clean_data), repeat)
+        # save_results пишет в results/ текущего каталога
+        os.chdir(tmp)
+        try:
+            timings['save_results'], _ = timed(lambda: save_results(pairs, clean_data), repeat)
+        finally:
+            os.chdir(cwd)
+
+    found = {(p['ticker_x'], p['ticker_y']) for p in pairs}
+    return {
+        'timings': timings,
+        'n_pairs': len(pairs),
+        'recall': len(found & planted) / len(planted) if planted else 1.0,
+    }
+
+
+def compare(current, baseline, tolerance, min_seconds=0.02):
+    """Регрессии относительно базовой линии: медленнее в tolerance раз или ниже полнота"""
+    problems = []
+    for size, result in current.items():
+        if size not in baseline:
+            continue
+        base = baseline[size]
+        for stage, seconds in result['timings'].items():
+            before = base['timings'].get(stage)
+            if before is not None and seconds > before * tolerance and seconds - before > min_seconds:
+                problems.append(f"{size} {stage}: {seconds:.3f} с против {before:.3f} с")
+        if result['recall'] < base['recall']:
+            problems.append(f"{size} полнота: {result['recall']:.3f} против {base['recall']:.3f}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейера поиска пар")
+    parser.add_argument('--sizes', nargs='+', default=['100x500', '200x750'],
+                        help="Размеры панели: ТИКЕРЫxДНИ")
+    parser.add_argument('--linked', type=float, default=0.1, help="Доля коинтегрированных рядов")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE, help="JSON базовой линии")
+    parser.add_argument('--save-baseline', action='store_true', help="Записать результат как базовую линию")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="Допустимое замедление (раз)")
+    parser.add_argument('--output', default=None, help="Куда записать JSON текущего запуска")
+    args = parser.parse_args(argv)
+
+    # main при импорте включает INFO для корневого логгера
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {}
+    print(f"{'размер':<10} " + ' '.join(f"{stage:>24}" for stage in STAGES) + f" {'пар':>6} {'полнота':>8}")
+    for size in args.sizes:
+        n_tickers, n_days = (int(v) for v in size.lower().split('x'))
+        n_linked = max(1, int(n_tickers * args.linked))
+        results[size] = bench_size(n_tickers, n_days, n_linked, args.repeat, args.seed)
+        row = results[size]
+        print(f"{size:<10} " + ' '.join(f"{row['timings'][stage]:>22.3f} с" for stage in STAGES)
+              + f" {row['n_pairs']:>6} {row['recall']:>8.3f}")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                    'platform': platform.platform(), 'cpu_count': os.cpu_count()},
+        'settings': {'linked': args.linked, 'repeat': args.repeat, 'seed': args.seed},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Базовая линия записана в {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Базовой линии нет (запустите с --save-baseline)")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    problems = compare(results, baseline['results'], args.tolerance)
+    for problem in problems:
+        print(f"РЕГРЕССИЯ: {problem}")
+    if not problems:
+        print(f"Регрессий нет (базовая линия от {baseline['created']})")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
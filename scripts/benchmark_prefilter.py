@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк полноты предфильтра относительно полного перебора пар
+
+Пример:
+    python scripts/benchmark_prefilter.py --tickers 300 --days 500 --top-k 5 10 20
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cointegration_tester import CointegrationTester
+from src.prefilter import PairPrefilter
+from src.synthetic import synthetic_prices
+
+
+def run_scan(prices, prefilter):
+    tester = CointegrationTester(prefilter=prefilter)
+    start = time.perf_counter()
+    pairs = tester.find_cointegrated_pairs(prices)
+    elapsed = time.perf_counter() - start
+    return {(p['ticker_x'], p['ticker_y']) for p in pairs}, elapsed, tester.stage_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Полнота предфильтра пар")
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument('--days', type=int, default=500)
+    parser.add_argument('--linked', type=int, default=20, help="Число коинтегрированных рядов")
+    parser.add_argument('--top-k', type=int, nargs='+', default=[5, 10, 20])
+    parser.add_argument('--methods', nargs='+', default=['correlation', 'distance'])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    prices, planted = synthetic_prices(args.tickers, args.days, args.linked)
+
+    exhaustive, base_time, counts = run_scan(prices, None)
+    print(f"Полный перебор: {counts['i1']} пар, найдено {len(exhaustive)}, "
+          f"заложенных найдено {len(planted & exhaustive)}/{len(planted)}, {base_time:.2f} с")
+    print(f"{'метод':<12} {'top_k':>6} {'кандидатов':>11} {'полнота':>8} {'заложенные':>11} "
+          f"{'время, с':>9} {'ускорение':>10}")
+
+    for method in args.methods:
+        for top_k in args.top_k:
+            found, elapsed, counts = run_scan(prices, PairPrefilter(method=method, top_k=top_k))
+            recall = len(found & exhaustive) / len(exhaustive) if exhaustive else 1.0
+            planted_recall = len(found & planted) / len(planted) if planted else 1.0
+            print(f"{method:<12} {top_k:>6} {counts['prefilter']:>11} {recall:>8.3f} "
+                  f"{planted_recall:>11.3f} {elapsed:>9.2f} {base_time / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
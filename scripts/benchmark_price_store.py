@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк загрузки цен: CSV против бинарного хранилища
+
+Пример:
+    python scripts/benchmark_price_store.py --tickers 2000 --days 2500
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_fetcher import DataFetcher
+from src.price_store import PriceStore
+from src.synthetic import synthetic_prices
+
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время загрузки CSV и хранилища")
+    parser.add_argument('--tickers', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--subset', type=int, default=20, help="Тикеров в выборочной загрузке")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    prices, _ = synthetic_prices(args.tickers, args.days, n_linked=0)
+    index, columns = prices.index, prices.columns.tolist()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'prices.csv')
+        store_path = os.path.join(tmp, 'store')
+        prices.to_csv(csv_path)
+        PriceStore.from_csv(csv_path, store_path)
+
+        fetcher = DataFetcher()
+        subset = columns[:args.subset]
+        start = index[len(index) // 2]
+        results = [
+            ('CSV, вся панель', timed(lambda: fetcher.load_from_csv(csv_path), args.repeat)),
+            ('хранилище, вся панель', timed(lambda: fetcher.load_from_store(store_path), args.repeat)),
+            (f'хранилище, {args.subset} тикеров, полпериода',
+             timed(lambda: fetcher.load_from_store(store_path, tickers=subset, start=start), args.repeat)),
+        ]
+
+    print(f"Панель {args.tickers} акций x {args.days} дней")
+    base = results[0][1]
+    for name, elapsed in results:
+        print(f"{name:<40} {elapsed:>8.3f} с  x{base / elapsed:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
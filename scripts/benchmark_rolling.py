@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк скользящего анализа: инкрементальные суммы против пересчета окон
+
+Пример:
+    python scripts/benchmark_rolling.py --tickers 50 --days 1500 --window 252
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.batch_engine import engle_granger_adf, hedge_regressions
+from src.rolling_scan import RollingCointegrationScanner
+
+
+def naive_scan(values, ix, iy, scanner, with_p_values):
+    """Полный пересчет регрессии (и ADF) для каждого окна"""
+    W = scanner.window
+    betas, p_values = [], []
+    for end in scanner.window_ends(len(values)):
+        window = values[end - W:end]
+        fit = hedge_regressions(window, ix, iy)
+        betas.append(fit['beta'])
+        if with_p_values:
+            resid = window[:, iy] - fit['alpha'] - fit['beta'] * window[:, ix]
+            p_values.append(engle_granger_adf(resid.T)['p_value'])
+    return np.array(betas), np.array(p_values)
+
+
+def statsmodels_refit_time(values, ix, iy, scanner, sample_windows=3):
+    """Оценка времени попарного OLS statsmodels по всем окнам (по выборке окон)"""
+    from statsmodels.regression.linear_model import OLS
+    from statsmodels.tools.tools import add_constant
+
+    W = scanner.window
+    ends = scanner.window_ends(len(values))
+    start = time.perf_counter()
+    for end in ends[:sample_windows]:
+        window = values[end - W:end]
+        for i, j in zip(ix, iy):
+            OLS(window[:, j], add_constant(window[:, i])).fit()
+    elapsed = time.perf_counter() - start
+    return elapsed * len(ends) / min(sample_windows, len(ends))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скользящий анализ: инкрементально против пересчета")
+    parser.add_argument('--tickers', type=int, default=50)
+    parser.add_argument('--days', type=int, default=1500)
+    parser.add_argument('--window', type=int, default=252)
+    parser.add_argument('--step', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame(100 + rng.normal(size=(args.days, args.tickers)).cumsum(axis=0),
+                          index=pd.bdate_range('2015-01-01', periods=args.days))
+    values = prices.to_numpy()
+    ix, iy = np.triu_indices(args.tickers, k=1)
+    scanner = RollingCointegrationScanner(window=args.window, step=args.step)
+    n_windows = len(scanner.window_ends(len(values)))
+    print(f"{len(ix)} пар, {n_windows} окон по {args.window} дней")
+    print(f"Попарный OLS statsmodels по всем окнам (оценка): {statsmodels_refit_time(values, ix, iy, scanner):.1f} с")
+
+    for with_p_values in (False, True):
+        start = time.perf_counter()
+        result = scanner.scan(prices, with_p_values=with_p_values)
+        fast = time.perf_counter() - start
+        start = time.perf_counter()
+        betas, _ = naive_scan(values, ix, iy, scanner, with_p_values)
+        slow = time.perf_counter() - start
+        error = np.abs(result['beta'].to_numpy() - betas).max()
+        stage = 'регрессия + ADF' if with_p_values else 'только регрессия'
+        print(f"{stage:<18} инкрементально {fast:8.2f} с, векторный пересчет {slow:8.2f} с, "
+              f"x{slow / fast:6.1f}, макс. расхождение beta {error:.1e}")
+
+
+if __name__ == "__main__":
+    main()
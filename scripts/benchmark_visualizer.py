@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пакетной отрисовки графиков пар в файлы
+
+Сравнивает отрисовку с новой фигурой и tight_layout на каждый график
+с пакетным режимом Visualizer: переиспользуемые фигуры Agg,
+прореживание рядов, процессы.
+
+Пример:
+    python scripts/benchmark_visualizer.py --pairs 50 --days 5000 --n-jobs 4
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pair_result import PairResult
+from src.synthetic import synthetic_prices
+from src.visualizer import Visualizer
+
+
+class FreshFigureVisualizer(Visualizer):
+    """Те же графики, но новая фигура и tight_layout на каждый вызов"""
+
+    def _figure(self, kind, nrows, figsize):
+        self._figures.pop(kind, None)
+        self._laid_out.discard(kind)
+        return super()._figure(kind, nrows, figsize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость отрисовки графиков пар")
+    parser.add_argument('--pairs', type=int, default=50)
+    parser.add_argument('--days', type=int, default=5000)
+    parser.add_argument('--max-points', type=int, default=2000)
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    prices, _ = synthetic_prices(2 * args.pairs, args.days, 0)
+    pairs = [PairResult(f'S{2 * k:04d}', f'S{2 * k + 1:04d}', 0.01, 0.0, 1.0, 0.5, prices)
+             for k in range(args.pairs)]
+
+    variants = [
+        ('новая фигура на график', FreshFigureVisualizer, None, 1),
+        ('переиспользование фигур', Visualizer, None, 1),
+        (f'+ прореживание до {args.max_points} точек', Visualizer, args.max_points, 1),
+        (f'+ {args.n_jobs} процессов', Visualizer, args.max_points, args.n_jobs),
+    ]
+    print(f"{args.pairs} пар, {args.days} дней, {2 * args.pairs} графиков")
+    for name, cls, max_points, n_jobs in variants:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            cls(output_dir=tmp, max_points=max_points).render_pairs(prices, pairs, n_jobs=n_jobs)
+            elapsed = time.perf_counter() - start
+        print(f"  {name:<40} {elapsed:8.2f} с  ({elapsed / args.pairs * 1e3:7.1f} мс на пару)")
+
+
+if __name__ == "__main__":
+    main()
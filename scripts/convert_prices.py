@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Конвертация data/stocks_prices.csv в бинарное хранилище data/prices_store
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.price_store import PriceStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV -> бинарное хранилище цен")
+    parser.add_argument('--csv', default='data/stocks_prices.csv')
+    parser.add_argument('--store', default='data/prices_store')
+    args = parser.parse_args()
+
+    store = PriceStore.from_csv(args.csv, args.store)
+    print(f"Записано в {args.store}: {len(store.tickers)} акций, {len(store.dates)} дней")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Онлайн-мониторинг спредов пар, найденных main.py
+
+Пары берутся из последнего запуска results/pairs.sqlite (или CSV), тики -
+из CSV (timestamp, ticker, price) или таблицы цен как stocks_prices.csv.
+
+Пример:
+    python scripts/live_monitor.py --ticks data/ticks.csv --window 60 --speed 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.live_monitor import ReplaySource, ZScoreMonitor, load_pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Мониторинг z-score спредов по потоку цен")
+    parser.add_argument('--pairs', default='results', help="Хранилище запусков (*.sqlite), CSV save_results или каталог с ними")
+    parser.add_argument('--ticks', required=True, help="CSV тиков для воспроизведения")
+    parser.add_argument('--window', type=int, default=20, help="Окно z-score (в тиках)")
+    parser.add_argument('--entry-z', type=float, default=2.0)
+    parser.add_argument('--exit-z', type=float, default=0.5)
+    parser.add_argument('--speed', type=float, default=None,
+                        help="Ускорение воспроизведения пауз между тиками (по умолчанию без пауз)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    monitor = ZScoreMonitor(load_pairs(args.pairs), window=args.window,
+                            entry_z=args.entry_z, exit_z=args.exit_z)
+    asyncio.run(monitor.run(ReplaySource.from_csv(args.ticks, speed=args.speed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# basket_search.py
+# Поиск коинтегрированных корзин (3 и более акций) тестом Йохансена
+import numpy as np
+import pandas as pd
+import logging
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+
+from statsmodels.tsa.coint_tables import c_sjt, c_sja
+
+from src.prefilter import PairPrefilter, correlation_matrix
+from src.price_panel import PricePanel
+from src.rolling_scan import _pair_indices
+
+logger = logging.getLogger(__name__)
+
+# Столбец таблиц критических значений Йохансена для уровня значимости
+_CRIT_COLUMN = {0.10: 0, 0.05: 1, 0.01: 2}
+
+
+def _detrend(y: np.ndarray, order: int) -> np.ndarray:
+    """Остатки регрессии (B, n, k) на полином времени степени order (-1 - без изменений)"""
+    if order == -1:
+        return y
+    X = np.vander(np.linspace(-1, 1, y.shape[1]), order + 1)
+    return y - X @ (np.linalg.pinv(X) @ y)
+
+
+def _partial_out(y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """Остатки y после регрессии на z, стопкой по первой оси"""
+    if z.shape[2] == 0:
+        return y
+    zt = z.transpose(0, 2, 1)
+    coef = np.linalg.pinv(zt @ z) @ (zt @ y)
+    return y - z @ coef
+
+
+def batch_johansen(endog: np.ndarray, det_order: int = 0, k_ar_diff: int = 1) -> Dict[str, np.ndarray]:
+    """Тест Йохансена для стопки систем endog (B, T, k)
+
+    Повторяет statsmodels coint_johansen, но все B систем решаются
+    вместе: матрицы моментов (B, k, k) и симметричная задача на
+    собственные значения через разложение Холецкого (np.linalg.eigh).
+    Собственные значения упорядочены по убыванию, собственные векторы
+    (столбцы) нормированы так, что v' S_kk v = 1.
+    """
+    if det_order not in (-1, 0, 1):
+        raise ValueError("Критические значения есть только для det_order -1, 0, 1")
+    endog = np.asarray(endog, dtype=np.float64)
+    B, T, k = endog.shape
+    f = 0 if det_order > -1 else det_order
+
+    endog = _detrend(endog, det_order)
+    dx = np.diff(endog, axis=1)
+    # Лаги разностей: строка t - [dx(t-1), ..., dx(t-k_ar_diff)]
+    n = dx.shape[1] - k_ar_diff
+    z = np.concatenate([dx[:, k_ar_diff - lag:k_ar_diff - lag + n] for lag in range(1, k_ar_diff + 1)],
+                       axis=2) if k_ar_diff else np.empty((B, n, 0))
+    z = _detrend(z, f)
+    r0t = _partial_out(_detrend(dx[:, k_ar_diff:], f), z)
+    rkt = _partial_out(_detrend(endog[:, 1:T - k_ar_diff], f), z)
+
+    skk = rkt.transpose(0, 2, 1) @ rkt / n
+    sk0 = rkt.transpose(0, 2, 1) @ r0t / n
+    s00 = r0t.transpose(0, 2, 1) @ r0t / n
+    sig = sk0 @ np.linalg.solve(s00, sk0.transpose(0, 2, 1))
+
+    # S_kk^-1 sig v = a v  <=>  (L^-1 sig L^-T) u = a u,  v = L^-T u
+    L_inv = np.linalg.inv(np.linalg.cholesky(skk))
+    sym = L_inv @ sig @ L_inv.transpose(0, 2, 1)
+    eigenvalues, u = np.linalg.eigh((sym + sym.transpose(0, 2, 1)) / 2)
+    eigenvalues, u = eigenvalues[:, ::-1], u[:, :, ::-1]
+    eigenvectors = L_inv.transpose(0, 2, 1) @ u
+
+    log_one_minus = np.log(1 - np.clip(eigenvalues, 0.0, 1 - 1e-15))
+    trace = -n * np.cumsum(log_one_minus[:, ::-1], axis=1)[:, ::-1]
+    return {
+        'eigenvalues': eigenvalues,
+        'eigenvectors': eigenvectors,
+        'trace_stat': trace,
+        'max_eig_stat': -n * log_one_minus,
+        'trace_crit': np.array([c_sjt(k - i, det_order) for i in range(k)]),
+        'max_eig_crit': np.array([c_sja(k - i, det_order) for i in range(k)]),
+    }
+
+
+def candidate_baskets(ix: np.ndarray, iy: np.ndarray, size: int, min_links: int = 1,
+                      max_candidates: Optional[int] = None) -> np.ndarray:
+    """Корзины размера size, растущие из ребер графа пар
+
+    Ребра (ix, iy) идут в порядке убывания качества пары. Корзина
+    размера m + 1 получается из корзины размера m добавлением соседа,
+    связанного не менее чем с min_links ее членами. Полный перебор
+    сочетаний не выполняется: рассматриваются только связные группы.
+    Возвращает массив (число корзин, size) индексов столбцов.
+    """
+    neighbors = {}
+    for i, j in zip(ix.tolist(), iy.tolist()):
+        neighbors.setdefault(i, set()).add(j)
+        neighbors.setdefault(j, set()).add(i)
+
+    groups = list(dict.fromkeys(tuple(sorted(edge)) for edge in zip(ix.tolist(), iy.tolist())))
+    for m in range(2, size):
+        grown = {}
+        for group in groups:
+            members = set(group)
+            for c in sorted(set().union(*(neighbors[g] for g in group)) - members):
+                if len(neighbors[c] & members) >= min_links:
+                    grown.setdefault(tuple(sorted(members | {c})), None)
+                    if max_candidates and len(grown) >= max_candidates:
+                        break
+            if max_candidates and len(grown) >= max_candidates:
+                break
+        groups = list(grown)
+    return np.array(groups, dtype=np.int64).reshape(-1, size)
+
+
+class BasketResult(Mapping):
+    """Результат для коинтегрированной корзины
+
+    Веса заданы так же, как beta пары: ticker_y - последний тикер
+    корзины, спред - ticker_y - alpha - sum(weights[x] * x). Остатки
+    вычисляются по запросу из общей панели цен.
+    """
+
+    __slots__ = ('tickers', 'ticker_y', 'weights', 'alpha', 'trace_stat', 'critical_value',
+                 'eigenvalue', 'rank', 'price_data')
+
+    FIELDS = ('tickers', 'ticker_y', 'weights', 'alpha', 'trace_stat', 'critical_value',
+              'eigenvalue', 'rank')
+
+    def __init__(self, tickers: tuple, ticker_y: str, weights: Dict[str, float], alpha: float,
+                 trace_stat: float, critical_value: float, eigenvalue: float, rank: int,
+                 price_data: pd.DataFrame):
+        self.tickers = tickers
+        self.ticker_y = ticker_y
+        self.weights = weights
+        self.alpha = alpha
+        self.trace_stat = trace_stat
+        self.critical_value = critical_value
+        self.eigenvalue = eigenvalue
+        self.rank = rank
+        self.price_data = price_data
+
+    @property
+    def residuals(self) -> pd.Series:
+        """Спред корзины на общих наблюдениях"""
+        data = self.price_data[list(self.tickers)].dropna()
+        return data[self.ticker_y] - self.alpha - sum(w * data[x] for x, w in self.weights.items())
+
+    def __getitem__(self, key):
+        if key in self.FIELDS or key == 'residuals':
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.FIELDS + ('residuals',))
+
+    def __len__(self):
+        return len(self.FIELDS) + 1
+
+    def __repr__(self):
+        weights = ', '.join(f"{x}={w:.4g}" for x, w in self.weights.items())
+        return (f"BasketResult({'-'.join(self.tickers)}, y={self.ticker_y}, {weights}, "
+                f"trace={self.trace_stat:.2f}/{self.critical_value:.2f}, rank={self.rank})")
+
+
+class BasketSearch:
+    """Поиск коинтегрированных корзин из 3..max_size акций
+
+    Кандидаты строятся из графа пар: найденных коинтегрированных пар
+    или, если пары не заданы, графа корреляций (top_k соседей по
+    PairPrefilter). Тест Йохансена выполняется пакетами по batch_size
+    корзин одного размера и одного общего окна наблюдений; корзины с
+    окном короче min_data_points не тестируются.
+    """
+
+    def __init__(self, max_size: int = 3, significance_level: float = 0.05, det_order: int = 0,
+                 k_ar_diff: int = 1, min_links: int = 1, neighbors: int = 5,
+                 max_candidates: Optional[int] = 100_000, batch_size: int = 2048, min_data_points: int = 50):
+        if significance_level not in _CRIT_COLUMN:
+            raise ValueError("Уровень значимости теста Йохансена: 0.10, 0.05 или 0.01")
+        self.max_size = max_size
+        self.significance_level = significance_level
+        self.det_order = det_order
+        self.k_ar_diff = k_ar_diff
+        self.min_links = min_links
+        self.neighbors = neighbors
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.min_data_points = min_data_points
+
+    def pair_graph(self, price_data: pd.DataFrame, pairs: Optional[list] = None):
+        """Ребра графа (ix, iy): заданные пары или соседи по корреляции"""
+        if pairs is not None:
+            return _pair_indices(price_data.columns.tolist(), pairs)
+        ix, iy = PairPrefilter(method='correlation', top_k=self.neighbors).select(price_data)
+        # Сильные связи - первыми, чтобы ограничение max_candidates отсекало слабые
+        corr = np.abs(correlation_matrix(price_data.to_numpy(dtype=np.float64))[ix, iy])
+        order = np.argsort(-corr, kind='stable')
+        return ix[order], iy[order]
+
+    def test_baskets(self, values: np.ndarray, baskets: np.ndarray) -> Dict[str, np.ndarray]:
+        """Тест Йохансена для корзин одного размера (строки baskets)"""
+        size = baskets.shape[1]
+        column = _CRIT_COLUMN[self.significance_level]
+        parts = []
+        for start in range(0, len(baskets), self.batch_size):
+            chunk = baskets[start:start + self.batch_size]
+            endog = values[:, chunk].transpose(1, 0, 2)
+            result = batch_johansen(endog, self.det_order, self.k_ar_diff)
+            reject = result['trace_stat'] > result['trace_crit'][:, column]
+            # Ранг - число последовательно отвергнутых гипотез rank <= r
+            rank = np.cumprod(reject, axis=1).sum(axis=1)
+
+            # Первый вектор, нормированный на последний тикер (как y в паре)
+            vector = result['eigenvectors'][:, :, 0]
+            weights = -vector[:, :-1] / vector[:, -1:]
+            spread = endog[:, :, -1] - np.einsum('btk,bk->bt', endog[:, :, :-1], weights)
+            parts.append({
+                'rank': rank,
+                'trace_stat': result['trace_stat'][:, 0],
+                'critical_value': np.full(len(chunk), result['trace_crit'][0, column]),
+                'eigenvalue': result['eigenvalues'][:, 0],
+                'weights': weights,
+                'alpha': spread.mean(axis=1),
+            })
+            logger.debug(f"Корзины {start}-{start + len(chunk)} (размер {size}) обработаны")
+        return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+    def test_windows(self, panel: PricePanel, baskets: np.ndarray) -> Dict[str, np.ndarray]:
+        """test_baskets по общим окнам наблюдений корзин
+
+        Корзины с одинаковым окном [start, stop) тестируются вместе на
+        срезе панели; внутри окна отбрасываются только строки с
+        пропусками тикеров группы. Непротестированные корзины получают
+        ранг 0 и NaN.
+        """
+        size = baskets.shape[1]
+        out = {
+            'rank': np.zeros(len(baskets), dtype=np.int64),
+            'trace_stat': np.full(len(baskets), np.nan),
+            'critical_value': np.full(len(baskets), np.nan),
+            'eigenvalue': np.full(len(baskets), np.nan),
+            'weights': np.full((len(baskets), size - 1), np.nan),
+            'alpha': np.full(len(baskets), np.nan),
+        }
+        start = panel.first[baskets].max(axis=1)
+        stop = np.maximum(panel.last[baskets].min(axis=1), start)
+        bounds, group = np.unique(np.column_stack([start, stop]), axis=0, return_inverse=True)
+        group = group.ravel()
+        for g, (begin, end) in enumerate(bounds):
+            members = np.flatnonzero(group == g)
+            columns = np.unique(baskets[members])
+            rows = panel.mask[begin:end][:, columns].all(axis=1)
+            if rows.sum() < self.min_data_points:
+                logger.info(f"Пропущено {len(members)} корзин: общих наблюдений {int(rows.sum())}")
+                continue
+            values = panel.block(begin, end, columns)
+            if not rows.all():
+                values = values[rows]
+            result = self.test_baskets(np.asarray(values, dtype=np.float64),
+                                       np.searchsorted(columns, baskets[members]))
+            for key, value in result.items():
+                out[key][members] = value
+        return out
+
+    def search(self, price_data: pd.DataFrame, pairs: Optional[list] = None) -> List[BasketResult]:
+        """Коинтегрированные корзины, лучшие (trace / crit) первыми
+
+        Корзина отбирается, если ранг коинтеграции от 1 до size - 1.
+        Каждая корзина тестируется на общем окне своих тикеров, поэтому
+        акции с короткой историей не сокращают выборку остальных.
+        """
+        panel = PricePanel.from_frame(price_data)
+        tickers = panel.tickers
+        ix, iy = self.pair_graph(price_data, pairs)
+        logger.info(f"Граф пар: {len(ix)} ребер")
+
+        found = []
+        for size in range(3, self.max_size + 1):
+            baskets = candidate_baskets(ix, iy, size, self.min_links, self.max_candidates)
+            logger.info(f"Корзин размера {size}: {len(baskets)} кандидатов")
+            if not len(baskets):
+                break
+            result = self.test_windows(panel, baskets)
+            for b in np.flatnonzero((result['rank'] >= 1) & (result['rank'] < size)):
+                names = tuple(tickers[i] for i in baskets[b])
+                found.append(BasketResult(
+                    tickers=names,
+                    ticker_y=names[-1],
+                    weights=dict(zip(names[:-1], result['weights'][b].tolist())),
+                    alpha=float(result['alpha'][b]),
+                    trace_stat=float(result['trace_stat'][b]),
+                    critical_value=float(result['critical_value'][b]),
+                    eigenvalue=float(result['eigenvalue'][b]),
+                    rank=int(result['rank'][b]),
+                    price_data=price_data,
+                ))
+
+        found.sort(key=lambda r: (-r.trace_stat / r.critical_value, r.tickers))
+        logger.info(f"Найдено {len(found)} коинтегрированных корзин")
+        return found
@@ -0,0 +1,288 @@
+# batch_engine.py
+# Пакетный (векторизованный) тест Энгла-Грэнджера для множества пар
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from multiprocessing import shared_memory
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from src.mackinnon import mackinnon_crit, mackinnon_p
+
+logger = logging.getLogger(__name__)
+
+
+def adf_maxlag(nobs: int, regression: str = 'c') -> int:
+    """Максимальный лаг ADF по правилу Шверта (как в statsmodels.adfuller)"""
+    maxlag = int(np.ceil(12.0 * np.power(nobs / 100.0, 1 / 4.0)))
+    # -1 за разность и по одному на каждый детерминированный член
+    return min(nobs // 2 - len(regression.replace('n', '')) - 1, maxlag)
+
+
+def _lag_design(series: np.ndarray, lag: int, maxlag: int, const: bool = True) -> np.ndarray:
+    """Матрица [const, уровень, Δx(t-1..t-lag), Δx(t)] для всех строк сразу
+
+    Первые maxlag наблюдений отбрасываются, чтобы у всех лагов была
+    одинаковая выборка (так делает autolag в statsmodels). При
+    const=False столбца константы нет.
+    """
+    P, T = series.shape
+    dx = np.diff(series, axis=1)
+    n = T - 1 - maxlag
+    c = int(const)
+    Z = np.empty((P, n, lag + 2 + c))
+    if const:
+        Z[:, :, 0] = 1.0
+    Z[:, :, c] = series[:, maxlag:T - 1]
+    for k in range(1, lag + 1):
+        Z[:, :, c + k] = dx[:, maxlag - k:T - 1 - k]
+    Z[:, :, -1] = dx[:, maxlag:]
+    return Z
+
+
+def _solve(A: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Пакетное решение нормальных уравнений (pinv для вырожденных систем)"""
+    try:
+        return np.linalg.solve(A, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        return (np.linalg.pinv(A) @ b[..., None])[..., 0]
+
+
+def batch_adfuller(series: np.ndarray, maxlag: Optional[int] = None, regression: str = 'c',
+                   autolag: Optional[str] = 'AIC') -> Dict[str, np.ndarray]:
+    """ADF-тест для каждой строки матрицы (P, T)
+
+    Повторяет statsmodels.adfuller: при autolag='AIC' лаг выбирается по AIC
+    на общей выборке, затем регрессия пересчитывается на полной выборке
+    для выбранного лага; при autolag=None используется лаг maxlag.
+    Все регрессии решаются стопкой через матрицы перекрестных произведений.
+
+    regression - 'c' (константа) или 'n' (без константы, для остатков).
+    p-value и критические значения - по таблицам МакКиннона для N=1.
+    """
+    if regression not in ('c', 'n'):
+        raise ValueError(f"Неизвестный тип регрессии: {regression}")
+    if autolag not in ('AIC', None):
+        raise ValueError(f"Неизвестный критерий выбора лага: {autolag}")
+    series = np.atleast_2d(np.asarray(series, dtype=np.float64))
+    P, T = series.shape
+    if maxlag is None:
+        maxlag = adf_maxlag(T, regression)
+    if maxlag < 0:
+        raise ValueError("Слишком короткий ряд для ADF теста")
+    const = regression == 'c'
+    c = int(const)
+
+    stat = np.full(P, np.nan)
+    usedlag = np.full(P, maxlag, dtype=np.int64)
+    # Постоянные ряды statsmodels не тестирует
+    valid = np.ptp(series, axis=1) > 0
+    if not valid.any():
+        return {'adf_statistic': stat, 'p_value': np.ones(P), 'usedlag': usedlag,
+                'critical_values': np.full((P, 3), np.nan)}
+
+    valid_idx = np.flatnonzero(valid)
+    if autolag is None:
+        best = np.full(len(valid_idx), maxlag)
+    else:
+        # 1. Выбор лага по AIC на общей выборке
+        Z = _lag_design(series[valid], maxlag, maxlag, const)
+        n = Z.shape[1]
+        G = np.matmul(Z.transpose(0, 2, 1), Z)
+        yy = G[:, -1, -1]
+        aic = np.empty((Z.shape[0], maxlag + 1))
+        for lag in range(maxlag + 1):
+            k = lag + 1 + c
+            b = G[:, :k, -1]
+            coef = _solve(G[:, :k, :k], b)
+            ssr = np.maximum(yy - np.einsum('pk,pk->p', coef, b), np.finfo(float).tiny)
+            aic[:, lag] = n * np.log(ssr / n) + 2 * k
+        best = np.argmin(aic, axis=1)
+
+    # 2. Итоговая регрессия на полной выборке для каждого выбранного лага
+    for lag in np.unique(best):
+        rows = valid_idx[best == lag]
+        Z = _lag_design(series[rows], lag, lag, const)
+        n, k = Z.shape[1], lag + 1 + c
+        G = np.matmul(Z.transpose(0, 2, 1), Z)
+        A_inv = np.linalg.pinv(G[:, :k, :k])
+        b = G[:, :k, -1]
+        coef = (A_inv @ b[..., None])[..., 0]
+        ssr = np.maximum(G[:, -1, -1] - np.einsum('pk,pk->p', coef, b), 0.0)
+        sigma2 = ssr / (n - k)
+        stat[rows] = coef[:, c] / np.sqrt(sigma2 * A_inv[:, c, c])
+        usedlag[rows] = lag
+
+    p_value = np.ones(P)
+    p_value[valid_idx] = mackinnon_p(stat[valid_idx], regression, N=1)
+    return {'adf_statistic': stat, 'p_value': p_value, 'usedlag': usedlag,
+            'critical_values': mackinnon_crit(1, regression, T - 1 - usedlag)}
+
+
+def engle_granger_adf(resid: np.ndarray, r_squared: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """ADF остатков регрессии пары с таблицами Энгла-Грэнджера
+
+    resid - матрица (P, T) остатков y - alpha - beta * x. Повторяет
+    statsmodels.coint: ADF без константы с autolag='AIC', а p-value и
+    критические значения МакКиннона - для регрессии с константой и двух
+    рядов (N=2). Пары с R² ≈ 1 (почти совпадающие ряды) получают
+    статистику -inf и p = 0.
+    """
+    resid = np.atleast_2d(resid)
+    result = batch_adfuller(resid, regression='n')
+    stat = result['adf_statistic']
+    if r_squared is not None:
+        collinear = np.asarray(r_squared) >= 1 - 100 * np.sqrt(np.finfo(float).eps)
+        stat[collinear] = -np.inf
+    tested = ~np.isnan(stat)
+    result['p_value'][tested] = mackinnon_p(stat[tested], 'c', N=2)
+    # Как в statsmodels.coint (и egranger в Stata): выборка T - 1
+    result['critical_values'] = np.broadcast_to(mackinnon_crit(2, 'c', resid.shape[1] - 1),
+                                                (len(resid), 3)).copy()
+    return result
+
+
+def cross_products(values: np.ndarray):
+    """Средние и матрица центрированных перекрестных произведений панели (T, N)"""
+    mean = values.mean(axis=0)
+    centered = values - mean
+    return mean, centered.T @ centered
+
+
+def hedge_regressions(values: np.ndarray, ix: np.ndarray, iy: np.ndarray,
+                      moments=None) -> Dict[str, np.ndarray]:
+    """OLS y = alpha + beta * x для пар столбцов (ix, iy) из одной матрицы ковариаций"""
+    mean, cross = moments if moments is not None else cross_products(values)
+    sxx = cross[ix, ix]
+    sxy = cross[ix, iy]
+    syy = cross[iy, iy]
+    beta = sxy / sxx
+    return {
+        'alpha': mean[iy] - beta * mean[ix],
+        'beta': beta,
+        'r_squared': sxy ** 2 / (sxx * syy),
+    }
+
+
+class BatchEngleGranger:
+    """Тест Энгла-Грэнджера для многих пар одной ценовой матрицы
+
+    values — матрица цен (T, N) без пропусков, хранится по столбцам:
+    float64-срез PricePanel используется без копирования. Пары задаются массивами
+    индексов столбцов: ix — регрессор x, iy — зависимая переменная y.
+    metrics — RunMetrics для раздельного учета времени OLS и ADF
+    (в процессах windowed_test_pairs не используется).
+    """
+
+    def __init__(self, values: np.ndarray, chunk_size: int = 1024, metrics=None):
+        self.values = np.asfortranarray(values, dtype=np.float64)
+        self.chunk_size = chunk_size
+        self.metrics = metrics
+        self._moments = None
+
+    def _timer(self, name: str):
+        return self.metrics.timer(name) if self.metrics is not None else nullcontext()
+
+    @property
+    def moments(self):
+        """Средние и перекрестные произведения (считаются один раз)"""
+        if self._moments is None:
+            self._moments = cross_products(self.values)
+        return self._moments
+
+    def integration_test(self) -> Dict[str, np.ndarray]:
+        """ADF по первым разностям каждого тикера (проверка I(1))"""
+        return batch_adfuller(np.diff(self.values, axis=0).T)
+
+    def test_pairs(self, ix: np.ndarray, iy: np.ndarray) -> Dict[str, np.ndarray]:
+        """Регрессия хеджирования и тест остатков Энгла-Грэнджера для пар (ix, iy)"""
+        ix = np.asarray(ix, dtype=np.int64)
+        iy = np.asarray(iy, dtype=np.int64)
+        with self._timer('ols'):
+            result = hedge_regressions(self.values, ix, iy, self.moments)
+        p_value = np.ones(len(ix))
+        for start in range(0, len(ix), self.chunk_size):
+            sl = slice(start, start + self.chunk_size)
+            resid = (self.values[:, iy[sl]]
+                     - result['alpha'][sl]
+                     - result['beta'][sl] * self.values[:, ix[sl]])
+            with self._timer('adf'):
+                p_value[sl] = engle_granger_adf(resid.T, result['r_squared'][sl])['p_value']
+            logger.debug(f"Пакет пар {start}-{start + len(resid.T)} обработан")
+        result['p_value'] = p_value
+        return result
+
+    def residuals(self, ix: int, iy: int, alpha: float, beta: float) -> np.ndarray:
+        """Остатки (спред) одной пары"""
+        return self.values[:, iy] - alpha - beta * self.values[:, ix]
+
+
+def _window_block(values: np.ndarray, start: int, stop: int, columns: np.ndarray) -> np.ndarray:
+    """Строки [start, stop) столбцов columns; подряд идущие столбцы - срезом без копирования"""
+    if len(columns) and columns[-1] - columns[0] + 1 == len(columns):
+        return values[start:stop, columns[0]:columns[-1] + 1]
+    return values[start:stop, columns]
+
+
+def windowed_test_pairs(values: np.ndarray, windows: List[Tuple], n_jobs: int = 1, chunk_size: int = 1024,
+                        metrics=None) -> List[Dict[str, np.ndarray]]:
+    """Пакетный тест пар на нескольких окнах одной панели
+
+    windows - список (start, stop, columns, ix, iy): пары (ix, iy) -
+    номера в columns, тестируются на строках [start, stop) столбцов
+    columns (массив по возрастанию). Окна не больше chunk_size пар
+    считаются в текущем процессе; блоки всех больших окон идут в
+    один пул процессов, а панель values передается в общую память
+    один раз за вызов. Результаты - в порядке windows.
+    """
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    results, tasks = [None] * len(windows), []
+    for w, (start, stop, columns, ix, iy) in enumerate(windows):
+        if n_jobs <= 1 or len(ix) <= chunk_size:
+            engine = BatchEngleGranger(_window_block(values, start, stop, columns), chunk_size, metrics=metrics)
+            results[w] = engine.test_pairs(ix, iy)
+            continue
+        tasks += [(w, start, stop, columns, ix[s:s + chunk_size], iy[s:s + chunk_size])
+                  for s in range(0, len(ix), chunk_size)]
+    if not tasks:
+        return results
+
+    values = np.asfortranarray(values)
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        shared = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf, order='F')
+        shared[:] = values
+        logger.info(f"Запуск {n_jobs} процессов, окон {len({task[0] for task in tasks})}, блоков пар {len(tasks)}")
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_panel_worker,
+                                 initargs=(shm.name, values.shape, values.dtype.str, chunk_size)) as pool:
+            parts = list(pool.map(_test_window_chunk, tasks))
+    finally:
+        shm.close()
+        shm.unlink()
+    for w in {task[0] for task in tasks}:
+        window_parts = [part for task, part in zip(tasks, parts) if task[0] == w]
+        results[w] = {key: np.concatenate([part[key] for part in window_parts]) for key in window_parts[0]}
+    return results
+
+
+# Состояние процесса-исполнителя: движок поверх общей памяти
+_worker = {}
+
+
+def _init_panel_worker(shm_name: str, shape, dtype: str, chunk_size: int):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker['shm'] = shm
+    _worker['values'] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, order='F')
+    _worker['chunk_size'] = chunk_size
+    _worker['window'] = None
+
+
+def _test_window_chunk(task):
+    w, start, stop, columns, ix, iy = task
+    # Блоки одного окна приходят подряд: движок (и его моменты) окна переиспользуется
+    if _worker['window'] != w:
+        block = _window_block(_worker['values'], start, stop, columns)
+        _worker['engine'] = BatchEngleGranger(block, _worker['chunk_size'])
+        _worker['window'] = w
+    return _worker['engine'].test_pairs(ix, iy)
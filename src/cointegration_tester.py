@@ -2,23 +2,82 @@
 # Тестирование коинтеграции между парами акций
 import numpy as np
 import pandas as pd
-from statsmodels.tsa.stattools import adfuller
-from statsmodels.regression.linear_model import OLS
-from statsmodels.tools.tools import add_constant
 import logging
 from typing import List, Dict
 
+from src.batch_engine import BatchEngleGranger, windowed_test_pairs
+from src.metrics import RunMetrics
+from src.pair_result import PairResult
+from src.price_panel import PricePanel
+from src.result_cache import column_hashes
+from src.significance import benjamini_hochberg
+
 logger = logging.getLogger(__name__)
 
 class CointegrationTester:
     
-    def __init__(self, significance_level=0.05):
+    # Версия процедуры теста: входит в ключ кэша результатов
+    TEST_PARAMS = 'engle-granger:ols-const:adf-n-aic:mackinnon-n2'
+    
+    def __init__(self, significance_level=0.05, engine='batch', min_data_points=50, n_jobs=1,
+                 prefilter=None, cache=None, metrics=None, dtype=np.float64, significance=None,
+                 fdr_level=None):
+        # engine: 'batch' - векторизованный движок, 'loop' - попарный тест statsmodels
+        # n_jobs: число процессов для пакетного движка (-1 - все ядра)
+        # prefilter: PairPrefilter для отбора кандидатов (None - все пары)
+        # cache: PairResultCache для повторного использования результатов
+        # metrics: RunMetrics для таймеров и счетчиков этапов (None - свой)
+        # dtype: тип цен в PricePanel (np.float32 - вдвое меньше памяти)
+        # significance: SignificanceEngine - эмпирические p-value вместо асимптотических
+        # fdr_level: контроль FDR Бенджамини-Хохберга по всем тестам (None - без поправки)
+        if engine not in ('batch', 'loop'):
+            raise ValueError(f"Неизвестный движок: {engine}")
+        if np.dtype(dtype) not in (np.float32, np.float64):
+            raise ValueError(f"Неподдерживаемый тип цен: {dtype}")
         self.significance_level = significance_level
+        self.engine = engine
+        self.min_data_points = min_data_points
+        self.n_jobs = n_jobs
+        self.prefilter = prefilter
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.dtype = np.dtype(dtype)
+        self.significance = significance
+        self.fdr_level = fdr_level
+        self.stage_counts = {}
+        # p-value всех протестированных пар текущего поиска (для FDR)
+        self.tested_p_values = []
+    
+    @property
+    def test_params(self) -> str:
+        """Параметры теста для ключа кэша (float32 и реплики дают другие результаты)"""
+        params = self.TEST_PARAMS
+        if self.dtype != np.float64:
+            params += f":{self.dtype.name}"
+        if self.significance is not None:
+            params += f":empirical-{self.significance.params}"
+        return params
+    
+    @property
+    def cache_params(self) -> str:
+        """Параметры ключа кэша: при общем пуле реплик кэшируется асимптотический тест"""
+        if self.significance is not None and self.significance.pooled:
+            return self.test_params.split(':empirical-')[0]
+        return self.test_params
+    
+    @property
+    def selection_level(self) -> float:
+        """Порог p-value для отбора пар блока (при FDR отбор уточняется в конце)"""
+        return self.fdr_level if self.fdr_level is not None else self.significance_level
     
     def check_stationarity(self, series: pd.Series, name: str = "") -> Dict:
         """Проверка стационарности временного ряда"""
+        # statsmodels нужен только попарному движку: импорт при первом вызове
+        from statsmodels.tsa.stattools import adfuller
         try:
-            result = adfuller(series.dropna())
+            self.metrics.count('adf_tests')
+            with self.metrics.timer('adf'):
+                result = adfuller(series.dropna())
             return {
                 'adf_statistic': result[0],
                 'p_value': result[1],
@@ -29,32 +88,82 @@ class CointegrationTester:
             logger.error(f"Ошибка ADF теста для {name}: {e}")
             return {}
     
-    def engle_granger_test(self, x: pd.Series, y: pd.Series, x_name: str, y_name: str) -> Dict:
-        """Тест Энгла-Грэнджера на коинтеграцию"""
+    def prescreen_integration_order(self, price_data: pd.DataFrame, panel: PricePanel = None) -> Dict[str, bool]:
+        """Проверка I(1) для каждого тикера один раз на всю выборку
+        
+        Тикер проходит, если его первые разности стационарны. Ряд берется
+        только на диапазоне наблюдений тикера; тикеры с одинаковым
+        диапазоном без пропусков проверяются одним пакетом.
+        """
+        if panel is None:
+            panel = PricePanel.from_frame(price_data, self.dtype)
+        is_i1 = {}
+        if self.engine == 'batch':
+            columns = np.flatnonzero(panel.contiguous & (panel.last - panel.first >= self.min_data_points))
+            for start, stop, members in panel.windows(columns, columns):
+                group = columns[members]
+                engine = BatchEngleGranger(panel.block(start, stop, group))
+                self.metrics.count('adf_tests', len(group))
+                with self.metrics.timer('adf'):
+                    p_values = engine.integration_test()['p_value']
+                is_i1.update(zip([panel.tickers[k] for k in group], (p_values <= self.significance_level).tolist()))
+        
+        for k, ticker in enumerate(panel.tickers):
+            if ticker in is_i1:
+                continue
+            series = pd.Series(panel.values[panel.first[k]:panel.last[k], k], dtype=np.float64).dropna()
+            diff_test = self.check_stationarity(series.diff().dropna(), f"{ticker}_diff")
+            is_i1[ticker] = bool(diff_test.get('is_stationary', False))
+        self.metrics.count('tickers', len(is_i1))
+        self.metrics.count('tickers_not_i1', len(is_i1) - sum(is_i1.values()))
+        return is_i1
+    
+    def engle_granger_test(self, x: pd.Series, y: pd.Series, x_name: str, y_name: str,
+                           check_integration: bool = True) -> Dict:
+        """Тест Энгла-Грэнджера на коинтеграцию
+        
+        check_integration=False пропускает проверку I(1), если она уже
+        выполнена в prescreen_integration_order.
+        """
+        from statsmodels.regression.linear_model import OLS
+        from statsmodels.tools.tools import add_constant
+        from statsmodels.tsa.stattools import coint
         try:
             # Проверяем что ряды I(1)
-            x_diff_test = self.check_stationarity(x.diff().dropna(), f"{x_name}_diff")
-            y_diff_test = self.check_stationarity(y.diff().dropna(), f"{y_name}_diff")
-            
-            if not (x_diff_test.get('is_stationary', False) and 
-                    y_diff_test.get('is_stationary', False)):
-                return {'is_cointegrated': False, 'error': 'Ряды не I(1)'}
+            if check_integration:
+                x_diff_test = self.check_stationarity(x.diff().dropna(), f"{x_name}_diff")
+                y_diff_test = self.check_stationarity(y.diff().dropna(), f"{y_name}_diff")
+                
+                if not (x_diff_test.get('is_stationary', False) and 
+                        y_diff_test.get('is_stationary', False)):
+                    return {'is_cointegrated': False, 'error': 'Ряды не I(1)'}
             
             # Регрессия y на x
             X = add_constant(x)
-            model = OLS(y, X).fit()
+            self.metrics.count('ols_fits')
+            with self.metrics.timer('ols'):
+                model = OLS(y, X).fit()
             
-            # Проверяем остатки на стационарность
+            # Проверяем остатки на стационарность с критическими значениями
+            # Энгла-Грэнджера (N=2), а не обычного ADF
             residuals = model.resid
-            resid_test = self.check_stationarity(residuals, f"residuals_{x_name}_{y_name}")
+            self.metrics.count('adf_tests')
+            with self.metrics.timer('adf'):
+                adf_statistic, p_value, critical_values = coint(y, x, trend='c', autolag='aic')
+            resid_test = {
+                'adf_statistic': adf_statistic,
+                'p_value': p_value,
+                'is_stationary': p_value <= self.significance_level,
+                'critical_values': dict(zip(('1%', '5%', '10%'), critical_values))
+            }
             
-            is_cointegrated = resid_test.get('is_stationary', False)
+            is_cointegrated = resid_test['is_stationary']
             
             return {
                 'is_cointegrated': is_cointegrated,
-                'p_value': resid_test.get('p_value', 1),
-                'alpha': model.params[0],
-                'beta': model.params[1],
+                'p_value': p_value,
+                'alpha': model.params.iloc[0],
+                'beta': model.params.iloc[1],
                 'residuals': residuals,
                 'r_squared': model.rsquared,
                 'residuals_test': resid_test
@@ -64,56 +173,242 @@ class CointegrationTester:
             logger.error(f"Ошибка теста для {x_name}-{y_name}: {e}")
             return {'is_cointegrated': False, 'error': str(e)}
     
-    def find_cointegrated_pairs(self, price_data: pd.DataFrame) -> List[Dict]:
+    def find_cointegrated_pairs(self, price_data: pd.DataFrame) -> List[PairResult]:
         """Поиск всех коинтегрированных пар"""
-        tickers = price_data.columns.tolist()
         cointegrated_pairs = []
+        for _, pairs in self.iter_scan(price_data):
+            cointegrated_pairs.extend(pairs)
+        if self.fdr_level is not None:
+            cointegrated_pairs = self.apply_fdr(cointegrated_pairs)
         
-        logger.info(f"Анализируем {len(tickers)} акций...")
+        # Сортируем по p-value (лучшие первые), при равенстве - по тикерам
+        cointegrated_pairs.sort(key=lambda x: (x['p_value'], x['ticker_x'], x['ticker_y']))
+        logger.info(f"Найдено {len(cointegrated_pairs)} коинтегрированных пар")
+        
+        return cointegrated_pairs
+    
+    def apply_fdr(self, pairs: List[PairResult]) -> List[PairResult]:
+        """Поправка Бенджамини-Хохберга: q-value по всем тестам поиска, отбор q <= fdr_level
+        
+        Отобранные блоками пары - это наименьшие p-value поиска, поэтому
+        их q-value берутся из общего ряда отсортированных p-value.
+        """
+        tested = np.sort(np.concatenate(self.tested_p_values)) if self.tested_p_values else np.empty(0)
+        q_sorted = benjamini_hochberg(tested)
+        kept = []
+        for pair in pairs:
+            # У равных p-value одинаковые q-value: берем последнее вхождение
+            pair.q_value = float(q_sorted[np.searchsorted(tested, pair.p_value, side='right') - 1])
+            if pair.q_value <= self.fdr_level:
+                kept.append(pair)
+        self.stage_counts['fdr'] = len(kept)
+        logger.info(f"Контроль FDR {self.fdr_level}: {len(tested)} тестов, "
+                    f"отобрано {len(kept)} из {len(pairs)} пар")
+        return kept
+    
+    def iter_scan(self, price_data: pd.DataFrame, chunk_size: int = None, start: int = 0):
+        """Потоковый поиск пар: кандидаты тестируются блоками по chunk_size
         
-        total_pairs = len(tickers) * (len(tickers) - 1) // 2
+        После каждого блока выдает (позиция следующего кандидата, пары блока).
+        Порядок кандидатов детерминирован, поэтому start позволяет продолжить
+        прерванный поиск с сохраненной позиции. При fdr_level блоки
+        отбираются по p <= fdr_level, а поправку применяет find_cointegrated_pairs.
+        """
+        self.tested_p_values = []
+        price_data, panel, ix, iy = self._candidate_pairs(price_data)
+        hashes = column_hashes(price_data) if self.cache is not None else None
+        chunk_size = chunk_size or max(len(ix), 1)
+        
+        found = 0
+        for begin in range(start, len(ix), chunk_size):
+            end = min(begin + chunk_size, len(ix))
+            pairs = self._test_candidates(price_data, panel, ix[begin:end], iy[begin:end], hashes)
+            found += len(pairs)
+            yield end, pairs
+        
+        self.stage_counts['cointegrated'] = found
+        self._log_stage_counts()
+    
+    def _candidate_pairs(self, price_data: pd.DataFrame):
+        """Проверка I(1) и предфильтр: таблица и PricePanel I(1) тикеров, индексы пар-кандидатов"""
+        logger.info(f"Анализируем {price_data.shape[1]} акций...")
+        panel = PricePanel.from_frame(price_data, self.dtype)
+        if panel.ragged.any():
+            logger.info(f"Тикеров с неполной историей: {int(panel.ragged.sum())}, "
+                        f"пары тестируются на общих окнах")
+        
+        total_pairs = price_data.shape[1] * (price_data.shape[1] - 1) // 2
         logger.info(f"Всего возможных пар: {total_pairs}")
         
-        analyzed_pairs = 0
-        for i, ticker1 in enumerate(tickers):
-            for ticker2 in tickers[i+1:]:
-                try:
-                    analyzed_pairs += 1
-                    if analyzed_pairs % 10 == 0:
-                        logger.info(f"Проанализировано {analyzed_pairs}/{total_pairs} пар...")
-                    
-                    # Берем данные без пропусков
-                    pair_data = price_data[[ticker1, ticker2]].dropna()
-                    
-                    if len(pair_data) < 50:
-                        continue
-                    
-                    result = self.engle_granger_test(
-                        pair_data[ticker1], 
-                        pair_data[ticker2],
-                        ticker1, 
-                        ticker2
-                    )
-                    
-                    if result.get('is_cointegrated', False):
-                        pair_info = {
-                            'ticker_x': ticker1,
-                            'ticker_y': ticker2,
-                            'p_value': result['p_value'],
-                            'alpha': result['alpha'],
-                            'beta': result['beta'],
-                            'r_squared': result['r_squared'],
-                            'residuals': result['residuals']
-                        }
-                        cointegrated_pairs.append(pair_info)
-                        logger.info(f"Коинтегрированная пара: {ticker1}-{ticker2} (p-value: {result['p_value']:.4f})")
-                        
-                except Exception as e:
-                    logger.warning(f"Ошибка для пары {ticker1}-{ticker2}: {e}")
-                    continue
-        
-        # Сортируем по p-value (лучшие первые)
-        cointegrated_pairs.sort(key=lambda x: x['p_value'])
-        logger.info(f"Найдено {len(cointegrated_pairs)} коинтегрированных пар")
+        # Проверка I(1) один раз на тикер, не-I(1) тикеры исключаем до перебора пар
+        with self.metrics.timer('integration_test'):
+            is_i1 = self.prescreen_integration_order(price_data, panel)
+        keep = [k for k, t in enumerate(panel.tickers) if is_i1[t]]
+        tickers = [panel.tickers[k] for k in keep]
+        dropped = price_data.shape[1] - len(tickers)
+        if dropped:
+            logger.info(f"Исключено {dropped} тикеров, не прошедших проверку I(1)")
+            panel = PricePanel(panel.values[:, keep], tickers, panel.index)
+        price_data = price_data[tickers]
         
-        return cointegrated_pairs
\ No newline at end of file
+        ix, iy = np.triu_indices(len(tickers), k=1)
+        self.stage_counts = {'all': total_pairs, 'i1': len(ix)}
+        
+        # Быстрый отбор кандидатов перед дорогим тестом
+        if self.prefilter is not None:
+            with self.metrics.timer('prefilter'):
+                ix, iy = self.prefilter.select(price_data)
+        self.stage_counts['prefilter'] = len(ix)
+        return price_data, panel, ix, iy
+    
+    def _test_candidates(self, price_data: pd.DataFrame, panel: PricePanel, ix: np.ndarray, iy: np.ndarray,
+                         hashes: List[str] = None) -> List[PairResult]:
+        """Тест пар-кандидатов (ix, iy), возвращает коинтегрированные"""
+        tickers = panel.tickers
+        # Результаты теста по каждому кандидату (NaN - пара не тестировалась)
+        outcome = {key: np.full(len(ix), np.nan) for key in ('alpha', 'beta', 'r_squared', 'p_value')}
+        
+        # Сначала ищем готовые результаты в кэше
+        keys = None
+        if self.cache is not None:
+            with self.metrics.timer('cache'):
+                keys = self.cache.pair_keys(price_data, ix, iy, self.cache_params, hashes=hashes)
+                cached = self.cache.get_many(keys)
+            for k, key in enumerate(keys):
+                if key in cached:
+                    for name, value in zip(('alpha', 'beta', 'r_squared', 'p_value'), cached[key]):
+                        outcome[name][k] = value
+            self.metrics.count('pairs_cached', len(cached))
+        todo = np.isnan(outcome['p_value'])
+        
+        # Тикеры без внутренних пропусков считаем пакетно по общим окнам пар,
+        # тикеры с пропусками - попарно
+        if self.engine == 'batch':
+            in_batch = todo & panel.contiguous[ix] & panel.contiguous[iy]
+        else:
+            in_batch = np.zeros(len(ix), dtype=bool)
+        batch_idx = np.flatnonzero(in_batch)
+        with self.metrics.timer('batch_test'):
+            result = self._test_pairs_batch(panel, ix[batch_idx], iy[batch_idx])
+        for name in outcome:
+            outcome[name][batch_idx] = result[name]
+        
+        loop_idx = np.flatnonzero(todo & ~in_batch)
+        with self.metrics.timer('loop_test'):
+            for analyzed_pairs, k in enumerate(loop_idx, start=1):
+                if analyzed_pairs % 10 == 0:
+                    logger.info(f"Проанализировано {analyzed_pairs}/{len(loop_idx)} пар...")
+                result = self._test_pair_loop(panel, ix[k], iy[k])
+                for name, value in result.items():
+                    outcome[name][k] = value
+        self.metrics.count('pairs_loop', len(loop_idx))
+        
+        # Общий пул реплик делает эмпирическое p-value зависимым от всех пар
+        # поиска: в кэш идет только асимптотический результат, а реплики
+        # пересчитываются для всех протестированных пар при каждом поиске
+        pooled = self.significance is not None and self.significance.pooled
+        fresh = np.flatnonzero(todo & ~np.isnan(outcome['p_value']))
+        if self.cache is not None and (self.significance is None or pooled):
+            self._cache_results(keys, outcome, fresh)
+        
+        # Эмпирические p-value по репликам заменяют асимптотические
+        if self.significance is not None:
+            resampled = np.flatnonzero(~np.isnan(outcome['p_value'])) if pooled else fresh
+            asymptotic = outcome['p_value'][resampled]
+            with self.metrics.timer('significance'):
+                outcome['p_value'][resampled] = self.significance.p_values(panel, ix[resampled], iy[resampled],
+                                                                           asymptotic)
+            screen = self.significance.screen
+            self.metrics.count('pairs_resampled',
+                               len(resampled) if screen is None else int((asymptotic <= screen).sum()))
+            if self.cache is not None and not pooled:
+                self._cache_results(keys, outcome, fresh)
+        self.tested_p_values.append(outcome['p_value'][~np.isnan(outcome['p_value'])])
+        
+        pairs = []
+        for k in np.flatnonzero(outcome['p_value'] <= self.selection_level):
+            ticker1, ticker2 = tickers[ix[k]], tickers[iy[k]]
+            # Остатки не храним: PairResult вычисляет их по общей панели
+            pair_info = PairResult(ticker1, ticker2, float(outcome['p_value'][k]), float(outcome['alpha'][k]),
+                                   float(outcome['beta'][k]), float(outcome['r_squared'][k]), price_data)
+            pairs.append(pair_info)
+            logger.info(f"Коинтегрированная пара: {ticker1}-{ticker2} (p-value: {pair_info['p_value']:.4f})")
+        return pairs
+    
+    def _cache_results(self, keys: List[str], outcome: Dict, fresh: np.ndarray):
+        """Записать в кэш результаты пар fresh"""
+        with self.metrics.timer('cache'):
+            self.cache.put_many([(keys[k], outcome['alpha'][k], outcome['beta'][k],
+                                  outcome['r_squared'][k], outcome['p_value'][k]) for k in fresh])
+        logger.info(f"Кэш результатов: попаданий {self.cache.hits}, промахов {self.cache.misses}")
+    
+    def _log_stage_counts(self):
+        """Сколько пар отсеял каждый этап"""
+        counts = self.stage_counts
+        logger.info(f"Этапы отбора: всего {counts['all']}, "
+                    f"проверка I(1) -{counts['all'] - counts['i1']}, "
+                    f"предфильтр -{counts['i1'] - counts['prefilter']}, "
+                    f"тест Энгла-Грэнджера -{counts['prefilter'] - counts['cointegrated']}")
+    
+    def _test_pair_loop(self, panel: PricePanel, i: int, j: int) -> Dict:
+        """Попарный тест statsmodels; пустой словарь, если пару тестировать нельзя"""
+        ticker1, ticker2 = panel.tickers[i], panel.tickers[j]
+        try:
+            # Общие наблюдения пары - срезы панели без копирования
+            x, y = panel.pair_view(i, j)
+            
+            if len(x) < self.min_data_points:
+                self.metrics.count('pairs_too_short')
+                return {}
+            
+            result = self.engle_granger_test(
+                pd.Series(x, dtype=np.float64, copy=False),
+                pd.Series(y, dtype=np.float64, copy=False),
+                ticker1, 
+                ticker2,
+                check_integration=False
+            )
+            if 'error' in result:
+                self.metrics.count('pairs_failed')
+                return {}
+            return {name: result[name] for name in ('alpha', 'beta', 'r_squared', 'p_value')}
+            
+        except Exception as e:
+            logger.warning(f"Ошибка для пары {ticker1}-{ticker2}: {e}")
+            self.metrics.count('pairs_failed')
+            return {}
+    
+    def _test_pairs_batch(self, panel: PricePanel, ix: np.ndarray, iy: np.ndarray) -> Dict:
+        """Пакетный тест пар (ix, iy) по тикерам без внутренних пропусков
+        
+        Пары группируются по общему окну наблюдений; каждая группа
+        тестируется одним движком на срезе панели [start, stop). Пул
+        процессов и общая память создаются один раз на вызов (windowed_test_pairs).
+        """
+        result = {name: np.full(len(ix), np.nan) for name in ('alpha', 'beta', 'r_squared', 'p_value')}
+        if len(ix) == 0:
+            return result
+        logger.info(f"Пакетный тест {len(ix)} пар...")
+
+        windows, groups = [], []
+        for start, stop, members in panel.windows(ix, iy):
+            if stop - start < self.min_data_points:
+                self.metrics.count('pairs_too_short', len(members))
+                continue
+            # Движок окна получает только столбцы группы, индексы пар пересчитываем
+            columns = np.union1d(ix[members], iy[members])
+            windows.append((start, stop, columns, np.searchsorted(columns, ix[members]),
+                            np.searchsorted(columns, iy[members])))
+            groups.append(members)
+        n_tested = sum(len(members) for members in groups)
+        self.metrics.count('pairs_batch', n_tested)
+        self.metrics.count('ols_fits', n_tested)
+        self.metrics.count('adf_tests', n_tested)
+
+        # При n_jobs > 1 OLS и ADF больших окон идут в других процессах,
+        # и их время входит только в общий таймер batch_test
+        parts = windowed_test_pairs(panel.values, windows, self.n_jobs, metrics=self.metrics)
+        for members, part in zip(groups, parts):
+            for name in result:
+                result[name][members] = part[name]
+        return result
@@ -5,6 +5,8 @@ import pandas as pd
 import numpy as np
 import logging
 
+from src.price_store import PriceStore
+
 logger = logging.getLogger(__name__)
 
 class DataFetcher:
@@ -23,6 +25,16 @@ class DataFetcher:
             logger.error(f"Ошибка загрузки данных: {e}")
             return None
     
+    def load_from_store(self, path='data/prices_store', tickers=None, start=None, end=None):
+        #Загрузка данных из бинарного хранилища (только нужные тикеры и период)
+        try:
+            self.data = PriceStore(path).read(tickers=tickers, start=start, end=end)
+            logger.info(f"Данные загружены: {self.data.shape[1]} акций, {self.data.shape[0]} дней")
+            return self.data
+        except Exception as e:
+            logger.error(f"Ошибка загрузки данных: {e}")
+            return None
+    
     def prepare_data(self, min_data_points=50):
         #Подготовка данных для анализа
         if self.data is None:
@@ -32,10 +44,20 @@ class DataFetcher:
         # Удаляем акции с недостаточным количеством данных
         clean_data = self.data.dropna(axis=1, thresh=min_data_points)
         
-        # Заполняем оставшиеся пропуски
-        clean_data = clean_data.ffill().bfill()
+        # Заполняем пропуски только внутри периода торгов каждой акции:
+        # до первой цены (IPO) и после последней (делистинг) остаются NaN,
+        # пары тестируются на общем окне (см. PricePanel)
+        values = clean_data.to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        rows = np.arange(len(values))[:, None]
+        last_seen = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+        inside = (last_seen >= 0) & (rows <= len(values) - 1 - valid[::-1].argmax(axis=0))
+        filled = np.where(inside, np.take_along_axis(values, np.maximum(last_seen, 0), axis=0), np.nan)
+        clean_data = pd.DataFrame(filled, index=clean_data.index, columns=clean_data.columns)
         
-        logger.info(f"После очистки: {clean_data.shape[1]} акций")
+        ragged = int((~inside.all(axis=0)).sum())
+        logger.info(f"После очистки: {clean_data.shape[1]} акций"
+                    + (f", из них {ragged} с неполной историей" if ragged else ""))
         return clean_data
     
     def get_tickers(self):
@@ -0,0 +1,163 @@
+# kalman_hedge.py
+# Динамический коэффициент хеджирования: фильтр Калмана для многих пар сразу
+import numpy as np
+import pandas as pd
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class KalmanHedge:
+    """Фильтр Калмана для y = alpha + beta * x с блуждающими alpha, beta
+
+    Состояние каждой пары - вектор (alpha, beta) и его ковариация 2x2;
+    все пары хранятся массивами (P, 2) и (P, 2, 2) и обновляются одной
+    векторной операцией на бар. delta задает скорость изменения
+    коэффициентов (шум состояния delta / (1 - delta) * I), obs_var -
+    дисперсию шума наблюдения (скаляр или (P,)).
+    """
+
+    def __init__(self, theta: np.ndarray, cov: np.ndarray, obs_var, delta: float = 1e-4):
+        self.theta = np.array(theta, dtype=np.float64)
+        self.cov = np.broadcast_to(np.asarray(cov, dtype=np.float64), (len(self.theta), 2, 2)).copy()
+        self.obs_var = np.broadcast_to(np.asarray(obs_var, dtype=np.float64), len(self.theta)).copy()
+        self.state_var = delta / (1 - delta)
+
+    @classmethod
+    def from_warmup(cls, x: np.ndarray, y: np.ndarray, delta: float = 1e-4) -> 'KalmanHedge':
+        """Начальное состояние по OLS на разогревочных барах (T, P)
+
+        Ковариация коэффициентов и дисперсия наблюдения берутся из той же
+        регрессии, поэтому фильтр не использует будущих данных.
+        """
+        n = np.sum(~np.isnan(x) & ~np.isnan(y), axis=0)
+        if np.any(n < 3):
+            raise ValueError("Для разогрева нужно хотя бы 3 наблюдения каждой пары")
+        mx, my = np.nanmean(x, axis=0), np.nanmean(y, axis=0)
+        dx, dy = x - mx, y - my
+        sxx = np.nansum(dx * dx, axis=0)
+        beta = np.nansum(dx * dy, axis=0) / sxx
+        alpha = my - beta * mx
+        obs_var = np.nansum((dy - beta * dx) ** 2, axis=0) / (n - 2)
+        # Ковариация OLS: s^2 (X'X)^-1 для X = [1, x]
+        cov = np.empty((len(beta), 2, 2))
+        cov[:, 0, 0] = obs_var * (1 / n + mx ** 2 / sxx)
+        cov[:, 0, 1] = cov[:, 1, 0] = -obs_var * mx / sxx
+        cov[:, 1, 1] = obs_var / sxx
+        return cls(np.column_stack([alpha, beta]), cov, obs_var, delta)
+
+    def step(self, x: np.ndarray, y: np.ndarray, active: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Один бар для всех пар: векторы цен x, y (P,)
+
+        spread - ошибка прогноза y по коэффициентам до этого бара (без
+        заглядывания вперед), spread_var - ее дисперсия. alpha, beta -
+        оценки после бара. Пары с пропуском цены только накапливают
+        неопределенность. active (P,) - маска работающих пар: состояние
+        остальных (еще не разогретых) не меняется, результат для них NaN.
+        """
+        observed = ~np.isnan(x) & ~np.isnan(y)
+        if active is not None:
+            observed &= active
+            frozen = self.cov[~active]
+        R = self.cov + self.state_var * np.eye(2)
+        F = np.column_stack([np.ones_like(x), np.where(observed, x, 0.0)])
+        spread = np.where(observed, y, np.nan) - np.einsum('pk,pk->p', F, self.theta)
+        RF = np.einsum('pij,pj->pi', R, F)
+        spread_var = np.einsum('pk,pk->p', F, RF) + self.obs_var
+
+        gain = RF / spread_var[:, None]
+        gain[~observed] = 0.0
+        self.theta += gain * np.where(observed, spread, 0.0)[:, None]
+        self.cov = R - gain[:, :, None] * RF[:, None, :]
+        alpha, beta = self.theta[:, 0].copy(), self.theta[:, 1].copy()
+        if active is not None:
+            self.cov[~active] = frozen
+            alpha[~active] = beta[~active] = np.nan
+        return {
+            'alpha': alpha,
+            'beta': beta,
+            'spread': spread,
+            'spread_var': np.where(observed, spread_var, np.nan),
+        }
+
+    def filter(self, x: np.ndarray, y: np.ndarray, active: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Последовательность баров (T, P); состояние сохраняется для продолжения
+
+        active - маска (T, P) работающих пар (см. step), None - все пары.
+        """
+        steps = [self.step(x[t], y[t], None if active is None else active[t]) for t in range(len(x))]
+        return {name: np.array([s[name] for s in steps]).reshape(len(x), len(self.theta)) for name in
+                ('alpha', 'beta', 'spread', 'spread_var')}
+
+
+class DynamicHedge:
+    """Меняющиеся во времени alpha, beta и спред для пар из find_cointegrated_pairs
+
+    Первые warmup баров пары (считая от ее первого общего наблюдения,
+    у акций после IPO он позже начала панели) идут на начальную
+    OLS-оценку, для них результат NaN; дальше работает KalmanHedge.
+    Пара, у которой наблюдений меньше разогрева, остается NaN. update продолжает фильтр на новых
+    барах без пересчета истории. Результаты - таблицы (даты x пары) с
+    MultiIndex (ticker_x, ticker_y), как у RollingCointegrationScanner;
+    их принимают PairsBacktester.run(hedge=...) и Visualizer.plot_spread.
+    """
+
+    def __init__(self, delta: float = 1e-4, warmup: int = 60):
+        self.delta = delta
+        self.warmup = warmup
+        self.kalman: Optional[KalmanHedge] = None
+        self.pairs = None
+        self.ready = None
+        self.last_date = None
+
+    def _matrices(self, price_data: pd.DataFrame):
+        x = price_data[[x for x, _ in self.pairs]].to_numpy(dtype=np.float64)
+        y = price_data[[y for _, y in self.pairs]].to_numpy(dtype=np.float64)
+        return x, y
+
+    def _frames(self, index, result: Dict[str, np.ndarray]) -> Dict[str, pd.DataFrame]:
+        columns = pd.MultiIndex.from_tuples(self.pairs, names=['ticker_x', 'ticker_y'])
+        return {name: pd.DataFrame(values, index=index, columns=columns) for name, values in result.items()}
+
+    def fit(self, price_data: pd.DataFrame, pairs: List[Dict]) -> Dict[str, pd.DataFrame]:
+        """Фильтр по всей истории price_data"""
+        if len(price_data) <= self.warmup:
+            raise ValueError(f"Данных меньше разогрева: {len(price_data)} <= {self.warmup}")
+        self.pairs = [(p['ticker_x'], p['ticker_y']) for p in pairs]
+        x, y = self._matrices(price_data)
+        T, P = x.shape
+
+        # Разогрев каждой пары - ее первые warmup баров с обеими ценами
+        observed = ~np.isnan(x) & ~np.isnan(y)
+        start = np.where(observed.any(axis=0), observed.argmax(axis=0), T)
+        self.ready = start + self.warmup < T
+        if not self.ready.any():
+            raise ValueError(f"Ни у одной пары нет {self.warmup} баров для разогрева")
+        if not self.ready.all():
+            logger.warning(f"Пар без данных для разогрева: {int((~self.ready).sum())}, результат для них NaN")
+        rows = np.minimum(start[self.ready] + np.arange(self.warmup)[:, None], T - 1)
+        warm = KalmanHedge.from_warmup(np.take_along_axis(x[:, self.ready], rows, axis=0),
+                                       np.take_along_axis(y[:, self.ready], rows, axis=0), self.delta)
+        theta = np.full((P, 2), np.nan)
+        cov = np.broadcast_to(np.eye(2), (P, 2, 2)).copy()
+        obs_var = np.ones(P)
+        theta[self.ready], cov[self.ready], obs_var[self.ready] = warm.theta, warm.cov, warm.obs_var
+        self.kalman = KalmanHedge(theta, cov, obs_var, self.delta)
+
+        active = (np.arange(T)[:, None] >= start + self.warmup) & self.ready
+        result = self.kalman.filter(x, y, active)
+        self.last_date = price_data.index[-1]
+        logger.info(f"Динамический хедж для {len(self.pairs)} пар, {len(price_data)} баров")
+        return self._frames(price_data.index, result)
+
+    def update(self, price_data: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Обработать только бары после последнего учтенного"""
+        if self.kalman is None:
+            raise RuntimeError("Сначала вызовите fit")
+        new = price_data.loc[price_data.index > self.last_date]
+        if len(new):
+            self.last_date = new.index[-1]
+        x, y = self._matrices(new)
+        active = np.broadcast_to(self.ready, x.shape)
+        return self._frames(new.index, self.kalman.filter(x, y, active))
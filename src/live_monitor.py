@@ -0,0 +1,260 @@
+# live_monitor.py
+# Онлайн-мониторинг z-score спредов выбранных пар по потоку цен
+import asyncio
+import glob
+import os
+import time
+import numpy as np
+import pandas as pd
+import logging
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def load_pairs(path: str = 'results') -> pd.DataFrame:
+    """Пары (ticker_x, ticker_y, alpha, beta, p_value, r_squared, q_value) из результатов save_results
+
+    path - хранилище запусков (*.sqlite, берется последний запуск),
+    CSV-файл или каталог. В каталоге берется последний запуск из его
+    pairs.sqlite, а без хранилища - самый свежий cointegrated_pairs_*.csv
+    (время запуска входит в имя файла).
+    """
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, 'pairs.sqlite')):
+        path = os.path.join(path, 'pairs.sqlite')
+    if path.endswith('.sqlite'):
+        # ResultStore создает отсутствующий файл - проверяем заранее
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Хранилище запусков {path} не найдено")
+        from src.result_store import ResultStore
+        store = ResultStore(path, pool_size=1)
+        try:
+            latest = store.latest_run()
+            rows = store.run_pairs(latest['run_id']) if latest else []
+        finally:
+            store.close()
+        if latest is None:
+            raise FileNotFoundError(f"В {path} нет запусков")
+        logger.info(f"Загружено {len(rows)} пар запуска {latest['run_id']} из {path}")
+        columns = ['ticker_x', 'ticker_y', 'alpha', 'beta', 'p_value', 'r_squared', 'q_value']
+        table = pd.DataFrame(rows, columns=columns + ['run_id'])[columns]
+        table['q_value'] = table['q_value'].astype(float)
+        return table
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, 'cointegrated_pairs_*.csv')))
+        if not files:
+            raise FileNotFoundError(f"В {path} нет файлов cointegrated_pairs_*.csv")
+        path = files[-1]
+    table = pd.read_csv(path)
+    logger.info(f"Загружено {len(table)} пар из {path}")
+    return pd.DataFrame({
+        'ticker_x': table['Ticker_X'].astype(str),
+        'ticker_y': table['Ticker_Y'].astype(str),
+        'alpha': table['Alpha'].astype(float),
+        'beta': table['Beta'].astype(float),
+        'p_value': table['P_Value'].astype(float),
+        'r_squared': table['R_Squared'].astype(float),
+        # Q_Value есть только в результатах с поправкой FDR
+        'q_value': table['Q_Value'].astype(float) if 'Q_Value' in table else np.nan,
+    })
+
+
+class ReplaySource:
+    """Источник тиков из таблицы (timestamp, ticker, price) для тестов и разбора дня
+
+    Асинхронно выдает (timestamp, {ticker: price}) для каждого момента
+    времени. speed > 0 воспроизводит паузы между тиками, ускоренные в
+    speed раз; speed=None - без пауз.
+    """
+
+    def __init__(self, ticks: pd.DataFrame, speed: Optional[float] = None):
+        self.ticks = ticks.sort_values('timestamp', kind='stable')
+        self.speed = speed
+
+    @classmethod
+    def from_frame(cls, prices: pd.DataFrame, speed: Optional[float] = None) -> 'ReplaySource':
+        """Из широкой таблицы цен (даты x тикеры), как stocks_prices.csv"""
+        ticks = prices.rename_axis('timestamp').rename_axis('ticker', axis=1).stack().rename('price')
+        return cls(ticks.reset_index(), speed)
+
+    @classmethod
+    def from_csv(cls, path: str, speed: Optional[float] = None) -> 'ReplaySource':
+        """Из CSV тиков (timestamp, ticker, price) или широкой таблицы цен"""
+        table = pd.read_csv(path)
+        if {'timestamp', 'ticker', 'price'} <= set(table.columns):
+            table['timestamp'] = pd.to_datetime(table['timestamp'])
+            return cls(table, speed)
+        wide = table.set_index(table.columns[0])
+        wide.index = pd.to_datetime(wide.index)
+        return cls.from_frame(wide, speed)
+
+    async def __aiter__(self):
+        previous = None
+        for timestamp, group in self.ticks.groupby('timestamp', sort=False):
+            if self.speed and previous is not None:
+                await asyncio.sleep((timestamp - previous).total_seconds() / self.speed)
+            else:
+                await asyncio.sleep(0)
+            previous = timestamp
+            yield timestamp, dict(zip(group['ticker'], group['price']))
+
+
+class QueueSource:
+    """Источник тиков из asyncio.Queue (для живой ленты); None завершает поток"""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def __aiter__(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            yield item
+
+
+class ZScoreMonitor:
+    """Скользящий z-score спредов y - alpha - beta * x для многих пар
+
+    Для каждой пары хранится кольцевой буфер последних window значений
+    спреда и суммы значений и квадратов: новый тик обновляет только пары
+    с этим тикером, за O(1) на пару. Суммы раз в window обновлений
+    пересчитываются по буферу, чтобы не накапливалась ошибка округления.
+
+    z-score и сигналы считаются так же, как в PairsBacktester: окно
+    включает текущее значение, std с ddof=1; вход при |z| >= entry_z,
+    выход при |z| <= exit_z или смене знака z.
+    """
+
+    def __init__(self, pairs: pd.DataFrame, window: int = 20, entry_z: float = 2.0,
+                 exit_z: float = 0.5):
+        if window < 2:
+            raise ValueError("Окно должно быть не меньше 2")
+        self.window = window
+        self.entry_z = entry_z
+        self.exit_z = exit_z
+        self.ticker_x = pairs['ticker_x'].tolist()
+        self.ticker_y = pairs['ticker_y'].tolist()
+        self.tickers = list(dict.fromkeys(self.ticker_x + self.ticker_y))
+        self._position = {t: i for i, t in enumerate(self.tickers)}
+        self.ix = np.array([self._position[t] for t in self.ticker_x], dtype=np.int64)
+        self.iy = np.array([self._position[t] for t in self.ticker_y], dtype=np.int64)
+        self.alpha = pairs['alpha'].to_numpy(dtype=np.float64)
+        self.beta = pairs['beta'].to_numpy(dtype=np.float64)
+
+        # Пары, затронутые тиком каждого тикера
+        members = np.concatenate([self.ix, self.iy])
+        order = np.argsort(members, kind='stable')
+        bounds = np.searchsorted(members[order], np.arange(len(self.tickers) + 1))
+        pair_ids = order % len(self.ix)
+        self._by_ticker = {t: np.unique(pair_ids[bounds[i]:bounds[i + 1]])
+                           for t, i in self._position.items()}
+
+        P = len(self.ix)
+        self.prices = np.full(len(self.tickers), np.nan)
+        self._buffer = np.zeros((window, P))
+        self._slot = np.zeros(P, dtype=np.int64)
+        self._count = np.zeros(P, dtype=np.int64)
+        self._sum = np.zeros(P)
+        self._sumsq = np.zeros(P)
+        self.spread = np.full(P, np.nan)
+        self.zscore = np.full(P, np.nan)
+        self.state = np.zeros(P)
+
+        self.ticks = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _affected(self, tickers) -> np.ndarray:
+        groups = [self._by_ticker[t] for t in tickers]
+        if len(groups) == 1:
+            return groups[0]
+        return np.unique(np.concatenate(groups)) if groups else np.empty(0, dtype=np.int64)
+
+    def _push(self, pairs: np.ndarray, spread: np.ndarray):
+        """Добавить значения спреда в окна пар за O(1) на пару"""
+        slot = self._slot[pairs]
+        full = self._count[pairs] >= self.window
+        old = np.where(full, self._buffer[slot, pairs], 0.0)
+        self._buffer[slot, pairs] = spread
+        self._sum[pairs] += spread - old
+        self._sumsq[pairs] += spread ** 2 - old ** 2
+        self._slot[pairs] = (slot + 1) % self.window
+        self._count[pairs] = np.minimum(self._count[pairs] + 1, self.window)
+
+        # Окно прошло по кругу - пересчет сумм по буферу
+        wrapped = pairs[(self._slot[pairs] == 0) & (self._count[pairs] == self.window)]
+        if len(wrapped):
+            self._sum[wrapped] = self._buffer[:, wrapped].sum(axis=0)
+            self._sumsq[wrapped] = (self._buffer[:, wrapped] ** 2).sum(axis=0)
+
+    def update(self, timestamp, prices: Dict[str, float]) -> List[dict]:
+        """Обработать цены одного момента времени, вернуть сигналы"""
+        started = time.perf_counter()
+        # Пропуски не затирают последнюю известную цену
+        known = [t for t, price in prices.items() if t in self._position and price == price]
+        self.prices[[self._position[t] for t in known]] = [prices[t] for t in known]
+
+        pairs = self._affected(known)
+        spread = self.prices[self.iy[pairs]] - self.alpha[pairs] - self.beta[pairs] * self.prices[self.ix[pairs]]
+        pairs, spread = pairs[~np.isnan(spread)], spread[~np.isnan(spread)]
+        signals = []
+        if len(pairs):
+            self._push(pairs, spread)
+            self.spread[pairs] = spread
+            signals = self._signals(timestamp, pairs, spread)
+
+        elapsed = time.perf_counter() - started
+        self.ticks += 1
+        self.latency_total += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+        return signals
+
+    def _signals(self, timestamp, pairs: np.ndarray, spread: np.ndarray) -> List[dict]:
+        n = self._count[pairs]
+        mean = self._sum[pairs] / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = np.maximum(self._sumsq[pairs] - n * mean ** 2, 0.0) / (n - 1)
+            std = np.sqrt(var)
+            z = np.where((n >= self.window) & (std > 0), (spread - mean) / std, np.nan)
+
+        previous = self.zscore[pairs]
+        self.zscore[pairs] = z
+        crossed = np.sign(z) * np.sign(previous) < 0
+        old_state = self.state[pairs]
+        state = np.where((np.abs(z) <= self.exit_z) | crossed, 0.0, old_state)
+        state = np.where(z <= -self.entry_z, 1.0, state)
+        state = np.where(z >= self.entry_z, -1.0, state)
+        self.state[pairs] = state
+
+        signals = []
+        for k in np.flatnonzero(state != old_state):
+            p = pairs[k]
+            action = 'exit' if state[k] == 0 else ('enter_long' if state[k] > 0 else 'enter_short')
+            signals.append({
+                'timestamp': timestamp,
+                'ticker_x': self.ticker_x[p],
+                'ticker_y': self.ticker_y[p],
+                'signal': action,
+                'zscore': float(z[k]),
+                'spread': float(spread[k]),
+            })
+        return signals
+
+    async def run(self, source, on_signal: Optional[Callable[[dict], None]] = None):
+        """Обрабатывать тики источника до его завершения
+
+        on_signal вызывается для каждого сигнала; по умолчанию сигналы
+        пишутся в лог.
+        """
+        async for timestamp, prices in source:
+            for signal in self.update(timestamp, prices):
+                if on_signal is None:
+                    logger.info(f"{signal['timestamp']} {signal['ticker_x']}-{signal['ticker_y']}: "
+                                f"{signal['signal']} (z={signal['zscore']:.2f})")
+                else:
+                    on_signal(signal)
+        if self.ticks:
+            logger.info(f"Обработано тиков: {self.ticks}, задержка: средняя "
+                        f"{self.latency_total / self.ticks * 1e6:.0f} мкс, "
+                        f"максимальная {self.latency_max * 1e6:.0f} мкс")
@@ -0,0 +1,114 @@
+# mackinnon.py
+# Таблицы МакКиннона для p-value и критических значений ADF и Энгла-Грэнджера
+import numpy as np
+from scipy.special import ndtr
+
+# Поверхности p-value: MacKinnon (1994), таблицы 3-4.
+# Индекс строки - N - 1, где N - число I(1) рядов в тесте:
+# N = 1 - обычный ADF, N = 2 - тест Энгла-Грэнджера для пары
+# (остатки регрессии y на x и константу).
+# p = norm.cdf(полином от статистики) в левом (small) и правом (large)
+# хвосте; за пределами [tau_min, tau_max] p равно 0 или 1.
+_TAU_MIN = {
+    'n': np.array([-19.04, -19.62, -21.21, -23.25, -21.63, -25.74]),
+    'c': np.array([-18.83, -18.86, -23.48, -28.07, -25.96, -23.27]),
+}
+_TAU_MAX = {
+    'n': np.array([np.inf, 1.51, 0.86, 0.88, 1.05, 1.24]),
+    'c': np.array([2.74, 0.92, 0.55, 0.61, 0.79, 1.0]),
+}
+_TAU_STAR = {
+    'n': np.array([-1.04, -1.53, -2.68, -3.09, -3.07, -3.77]),
+    'c': np.array([-1.61, -2.62, -3.13, -3.47, -3.78, -3.93]),
+}
+_TAU_SMALLP = {
+    'n': np.array([
+        [0.6344, 1.2378, 3.2496],
+        [1.9129, 1.3857, 3.5322],
+        [2.7648, 1.4502, 3.4186],
+        [3.4336, 1.4835, 3.19],
+        [4.0999, 1.5533, 3.59],
+        [4.5388, 1.5344, 2.9807]]) * np.array([1, 1, 1e-2]),
+    'c': np.array([
+        [2.1659, 1.4412, 3.8269],
+        [2.92, 1.5012, 3.9796],
+        [3.4699, 1.4856, 3.164],
+        [3.9673, 1.4777, 2.6315],
+        [4.5509, 1.5338, 2.9545],
+        [5.1399, 1.6036, 3.4445]]) * np.array([1, 1, 1e-2]),
+}
+_TAU_LARGEP = {
+    'n': np.array([
+        [0.4797, 9.3557, -0.6999, 3.3066],
+        [1.5578, 8.558, -2.083, -3.3549],
+        [2.2268, 6.8093, -3.2362, -5.4448],
+        [2.7654, 6.4502, -3.0811, -4.4946],
+        [3.2684, 6.8051, -2.6778, -3.4972],
+        [3.7268, 7.167, -2.3648, -2.8288]]) * np.array([1, 1e-1, 1e-1, 1e-2]),
+    'c': np.array([
+        [1.7339, 9.3202, -1.2745, -1.0368],
+        [2.1945, 6.4695, -2.9198, -4.2377],
+        [2.5893, 4.5168, -3.6529, -5.0074],
+        [3.0387, 4.5452, -3.3666, -4.1921],
+        [3.5049, 5.2098, -2.9158, -3.3468],
+        [3.9489, 5.8933, -2.5359, -2.721]]) * np.array([1, 1e-1, 1e-1, 1e-2]),
+}
+
+# Критические значения 1%, 5%, 10%: MacKinnon (2010), для 'n' - (1996).
+# crit = b0 + b1 / T + b2 / T^2 + b3 / T^3; ось 0 - N - 1
+_TAU_CRIT = {
+    'n': np.array([
+        [[-2.56574, -2.2358, -3.627, 0.0],
+         [-1.94100, -0.2686, -3.365, 31.223],
+         [-1.61682, 0.2656, -2.714, 25.364]]]),
+    'c': np.array([
+        [[-3.43035, -6.5393, -16.786, -79.433],
+         [-2.86154, -2.8903, -4.234, -40.040],
+         [-2.56677, -1.5384, -2.809, 0.0]],
+        [[-3.89644, -10.9519, -33.527, 0.0],
+         [-3.33613, -6.1101, -6.823, 0.0],
+         [-3.04445, -4.2412, -2.720, 0.0]],
+        [[-4.29374, -14.4354, -33.195, 47.433],
+         [-3.74066, -8.5632, -10.852, 27.982],
+         [-3.45218, -6.2143, -3.718, 0.0]]]),
+}
+
+
+def _check(regression: str, N: int, table: dict):
+    if regression not in table:
+        raise ValueError(f"Неизвестный тип регрессии: {regression}")
+    if not 1 <= N <= len(table[regression]):
+        raise ValueError(f"Нет таблицы для N={N} (regression='{regression}')")
+
+
+def mackinnon_p(stat, regression: str = 'c', N: int = 1) -> np.ndarray:
+    """Асимптотические p-value МакКиннона для массива статистик
+
+    Векторный аналог statsmodels.tsa.adfvalues.mackinnonp.
+    """
+    _check(regression, N, _TAU_SMALLP)
+    stat = np.asarray(stat, dtype=np.float64)
+    small = _TAU_SMALLP[regression][N - 1]
+    large = _TAU_LARGEP[regression][N - 1]
+    # Полиномы - только по конечным статистикам: бесконечности дают
+    # переполнение, их p-value задают границы таблиц ниже
+    finite = np.where(np.isfinite(stat), stat, 0.0)
+    z = np.where(finite <= _TAU_STAR[regression][N - 1],
+                 np.polyval(small[::-1], finite), np.polyval(large[::-1], finite))
+    p = ndtr(z)  # norm.cdf без тяжелого импорта scipy.stats
+    # Вырожденные остатки (статистика -inf) - p = 0, как в statsmodels.coint
+    p = np.where(stat < _TAU_MIN[regression][N - 1], 0.0, p)
+    p = np.where(stat > _TAU_MAX[regression][N - 1], 1.0, p)
+    return np.where(np.isnan(stat), np.nan, p)
+
+
+def mackinnon_crit(N: int = 1, regression: str = 'c', nobs=np.inf) -> np.ndarray:
+    """Критические значения 1%, 5%, 10% для выборки nobs (скаляр или массив)
+
+    Для массива nobs возвращает матрицу (len(nobs), 3).
+    """
+    _check(regression, N, _TAU_CRIT)
+    coef = _TAU_CRIT[regression][N - 1]
+    nobs = np.asarray(nobs, dtype=np.float64)
+    inv = 1.0 / nobs[..., None]
+    return coef[:, 0] + inv * (coef[:, 1] + inv * (coef[:, 2] + inv * coef[:, 3]))
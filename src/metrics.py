@@ -0,0 +1,179 @@
+# metrics.py
+# Таймеры, счетчики и профилирование этапов запуска
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _peak_memory_mb() -> Optional[float]:
+    """Пиковый объем памяти процесса (нет модуля resource - None)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - килобайты, macOS - байты
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class RunMetrics:
+    """Накопительные таймеры и счетчики этапов
+
+    timer(name) суммирует время и число входов по имени этапа,
+    count(name, n) увеличивает счетчик. report() собирает все в
+    словарь для JSON-отчета.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def report(self, **extra) -> Dict:
+        """Отчет: общее время, этапы (секунды и вызовы), счетчики, память"""
+        report = {
+            'wall_time': time.perf_counter() - self._started,
+            'stages': {name: {'seconds': seconds, 'calls': self.calls[name]}
+                       for name, seconds in self.timings.items()},
+            'counters': dict(self.counters),
+            'peak_memory_mb': _peak_memory_mb(),
+        }
+        report.update(extra)
+        return report
+
+    def write(self, path: str, **extra) -> str:
+        """Записать отчет в JSON"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(**extra), f, indent=2, ensure_ascii=False, default=str)
+        return path
+
+    def log_summary(self):
+        """Этапы по убыванию времени"""
+        for name, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            logger.info(f"   {name}: {seconds:.3f} с ({self.calls[name]} вызовов)")
+        if self.counters:
+            logger.info("   " + ", ".join(f"{name}={value}" for name, value in sorted(self.counters.items())))
+
+
+class StackSampler:
+    """Выборочный профилировщик: раз в interval секунд снимает стек потока
+
+    Работает в отдельном потоке и почти не замедляет программу.
+    Для каждой функции считает, в скольких снимках она была на стеке
+    (inclusive) и на его вершине (self).
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.inclusive = Counter()
+        self.self_samples = Counter()
+        self.total = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _name(code) -> str:
+        return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}:{code.co_name}"
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.total += 1
+            self.self_samples[self._name(frame.f_code)] += 1
+            seen = set()
+            while frame is not None:
+                seen.add(self._name(frame.f_code))
+                frame = frame.f_back
+            self.inclusive.update(seen)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def top(self, n: int = 20) -> list:
+        """n функций с наибольшим inclusive-временем"""
+        total = max(self.total, 1)
+        return [{'function': name, 'share': count / total, 'self_share': self.self_samples[name] / total}
+                for name, count in self.inclusive.most_common(n)]
+
+
+@contextmanager
+def profiled(mode: Optional[str], path_prefix: str, top: int = 20):
+    """Профилирование блока: mode 'cprofile', 'sample' или None (выключено)
+
+    Выдает словарь, который после выхода из блока содержит сводку для
+    отчета. cProfile сохраняет статистику в path_prefix.prof (pstats,
+    snakeviz), выборочный профилировщик - в path_prefix_samples.json.
+    """
+    summary = {}
+    if mode is None:
+        yield summary
+        return
+    if mode not in ('cprofile', 'sample'):
+        raise ValueError(f"Неизвестный режим профилирования: {mode}")
+    if os.path.dirname(path_prefix):
+        os.makedirs(os.path.dirname(path_prefix), exist_ok=True)
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield summary
+        finally:
+            profiler.disable()
+            path = path_prefix + '.prof'
+            profiler.dump_stats(path)
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(top)
+            logger.info(f"Профиль cProfile сохранен в {path}\n{text.getvalue()}")
+            summary.update({'mode': mode, 'path': path})
+    else:
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            yield summary
+        finally:
+            sampler.stop()
+            path = path_prefix + '_samples.json'
+            hot = sampler.top(top)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'interval': sampler.interval, 'samples': sampler.total, 'top': hot}, f, indent=2)
+            logger.info(f"Выборочный профиль ({sampler.total} снимков) сохранен в {path}")
+            summary.update({'mode': mode, 'path': path, 'samples': sampler.total, 'top': hot[:10]})
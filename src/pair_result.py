@@ -0,0 +1,61 @@
+# pair_result.py
+# Компактная запись результата теста пары
+import numpy as np
+import pandas as pd
+from collections.abc import Mapping
+
+
+class PairResult(Mapping):
+    """Результат для коинтегрированной пары
+
+    Хранит только скалярные статистики и ссылку на общую панель цен.
+    Остатки (спред) не хранятся, а вычисляются по alpha и beta при
+    обращении. Запись ведет себя как словарь с ключами ticker_x,
+    ticker_y, p_value, alpha, beta, r_squared, q_value и residuals,
+    поэтому код, работавший со словарями пар, не меняется. q_value -
+    поправка Бенджамини-Хохберга на множественные сравнения (NaN, если
+    контроль FDR не применялся).
+    """
+
+    __slots__ = ('ticker_x', 'ticker_y', 'p_value', 'alpha', 'beta', 'r_squared', 'q_value', 'price_data')
+
+    FIELDS = ('ticker_x', 'ticker_y', 'p_value', 'alpha', 'beta', 'r_squared', 'q_value')
+
+    def __init__(self, ticker_x: str, ticker_y: str, p_value: float, alpha: float, beta: float,
+                 r_squared: float, price_data: pd.DataFrame, q_value: float = np.nan):
+        self.ticker_x = ticker_x
+        self.ticker_y = ticker_y
+        self.p_value = p_value
+        self.alpha = alpha
+        self.beta = beta
+        self.r_squared = r_squared
+        self.q_value = q_value
+        self.price_data = price_data
+
+    @property
+    def residuals(self) -> pd.Series:
+        """Спред y - alpha - beta * x на общих наблюдениях пары"""
+        pair_data = self.price_data[[self.ticker_x, self.ticker_y]].dropna()
+        return pair_data[self.ticker_y] - self.alpha - self.beta * pair_data[self.ticker_x]
+
+    def __getitem__(self, key):
+        if key in self.FIELDS or key == 'residuals':
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.FIELDS + ('residuals',))
+
+    def __len__(self):
+        return len(self.FIELDS) + 1
+
+    def to_dict(self, with_residuals: bool = False) -> dict:
+        """Обычный словарь (остатки - только по запросу)"""
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        if with_residuals:
+            data['residuals'] = self.residuals
+        return data
+
+    def __repr__(self):
+        return (f"PairResult({self.ticker_x}-{self.ticker_y}, p_value={self.p_value:.4g}, "
+                f"alpha={self.alpha:.4g}, beta={self.beta:.4g}, r_squared={self.r_squared:.3f})")
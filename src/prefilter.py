@@ -0,0 +1,93 @@
+# prefilter.py
+# Быстрый отбор пар-кандидатов перед тестом коинтеграции
+import numpy as np
+import pandas as pd
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _pairwise_sums(values: np.ndarray):
+    """Попарные суммы по общим (непропущенным) наблюдениям столбцов
+
+    Возвращает n[i, j], sx[i, j] = sum x_i, sxx[i, j] = sum x_i^2 по строкам,
+    где заданы оба столбца, и sxy[i, j] = sum x_i * x_j.
+    """
+    mask = (~np.isnan(values)).astype(np.float64)
+    filled = np.where(mask > 0, values, 0.0)
+    n = mask.T @ mask
+    sx = filled.T @ mask
+    sxx = (filled ** 2).T @ mask
+    sxy = filled.T @ filled
+    return n, sx, sxx, sxy
+
+
+def correlation_matrix(values: np.ndarray) -> np.ndarray:
+    """Корреляции столбцов по попарно общим наблюдениям"""
+    n, sx, sxx, sxy = _pairwise_sums(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sx.T / n
+        var_x = sxx - sx ** 2 / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+    return np.nan_to_num(corr)
+
+
+def distance_matrix(values: np.ndarray) -> np.ndarray:
+    """Средний квадрат разности нормированных цен (метод расстояний)
+
+    Каждый ряд делится на свое первое значение, как в Visualizer.
+    """
+    first = pd.DataFrame(values).bfill().to_numpy()[0]
+    n, sx, sxx, sxy = _pairwise_sums(values / first)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dist = (sxx + sxx.T - 2 * sxy) / n
+    return np.where(n > 0, dist, np.inf)
+
+
+class PairPrefilter:
+    """Отбор пар-кандидатов по корреляции цен или по расстоянию
+
+    method: 'correlation' (больше |corr| - лучше) или 'distance'
+    (меньше расстояние - лучше). top_k оставляет для каждого тикера
+    k лучших соседей, threshold - пары не хуже порога. Если заданы оба,
+    пара должна пройти оба отбора.
+    """
+
+    def __init__(self, method: str = 'correlation', top_k: Optional[int] = None,
+                 threshold: Optional[float] = None):
+        if method not in ('correlation', 'distance'):
+            raise ValueError(f"Неизвестный метод отбора: {method}")
+        if top_k is None and threshold is None:
+            raise ValueError("Нужно задать top_k или threshold")
+        self.method = method
+        self.top_k = top_k
+        self.threshold = threshold
+
+    def scores(self, values: np.ndarray) -> np.ndarray:
+        """Матрица оценок пар: чем больше, тем лучше кандидат"""
+        if self.method == 'correlation':
+            return np.abs(correlation_matrix(values))
+        return -distance_matrix(values)
+
+    def select(self, price_data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Индексы столбцов (ix, iy), ix < iy, для пар-кандидатов"""
+        values = price_data.to_numpy(dtype=np.float64)
+        N = values.shape[1]
+        score = self.scores(values)
+        np.fill_diagonal(score, -np.inf)
+
+        keep = np.ones((N, N), dtype=bool)
+        if self.threshold is not None:
+            limit = self.threshold if self.method == 'correlation' else -self.threshold
+            keep &= score >= limit
+        if self.top_k is not None and self.top_k < N - 1:
+            # Пара остается, если входит в top_k хотя бы одного из тикеров
+            top = np.argpartition(-score, self.top_k, axis=1)[:, :self.top_k]
+            in_top = np.zeros((N, N), dtype=bool)
+            np.put_along_axis(in_top, top, True, axis=1)
+            keep &= in_top | in_top.T
+
+        ix, iy = np.triu_indices(N, k=1)
+        mask = keep[ix, iy]
+        return ix[mask], iy[mask]
@@ -0,0 +1,98 @@
+# price_panel.py
+# Панель цен с диапазоном наблюдений каждого тикера для теста пар без копирования
+import numpy as np
+import pandas as pd
+from typing import Iterator, Tuple
+
+
+class PricePanel:
+    """Цены (T дней, N тикеров) одним массивом и индекс наблюдений тикеров
+
+    values хранится по столбцам (order='F'): ряд каждого тикера лежит в
+    памяти непрерывно, поэтому окно строк одного тикера - срез без
+    копирования. Для каждого тикера известны first и last - первая
+    строка с ценой и строка после последней (тикер без цен: first =
+    last = T), и contiguous - нет ли пропусков внутри [first, last).
+    Пропуски до начала торгов и после делистинга не заполняются:
+    пара тестируется только на общем окне двух тикеров.
+    dtype=np.float32 вдвое уменьшает память панели; тесты считаются
+    в float64 по окнам.
+    """
+
+    def __init__(self, values: np.ndarray, tickers, index=None):
+        self.values = np.asfortranarray(values)
+        if self.values.ndim != 2 or self.values.shape[1] != len(tickers):
+            raise ValueError(f"Форма цен {self.values.shape} не совпадает с числом тикеров {len(tickers)}")
+        self.tickers = list(tickers)
+        self.index = index
+        self._mask = None
+
+        T = self.values.shape[0]
+        valid = self.mask
+        has_data = valid.any(axis=0)
+        self.first = np.where(has_data, valid.argmax(axis=0), T)
+        self.last = np.where(has_data, T - valid[::-1].argmax(axis=0), T)
+        self.contiguous = valid.sum(axis=0) == self.last - self.first
+
+    @classmethod
+    def from_frame(cls, price_data: pd.DataFrame, dtype=np.float64) -> 'PricePanel':
+        """Панель из таблицы цен (столбцы - тикеры)"""
+        return cls(price_data.to_numpy(dtype=dtype), price_data.columns, price_data.index)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=self.index, columns=self.tickers)
+
+    @property
+    def mask(self) -> np.ndarray:
+        """Маска (T, N) наличия цены"""
+        if self._mask is None:
+            self._mask = ~np.isnan(self.values)
+        return self._mask
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    @property
+    def ragged(self) -> np.ndarray:
+        """Тикеры, торгующиеся не весь период или с пропусками"""
+        return (self.first > 0) | (self.last < len(self.values)) | ~self.contiguous
+
+    def overlap(self, ix: np.ndarray, iy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Общее окно строк [start, stop) для пар столбцов (ix, iy)"""
+        start = np.maximum(self.first[ix], self.first[iy])
+        stop = np.minimum(self.last[ix], self.last[iy])
+        return start, np.maximum(stop, start)
+
+    def windows(self, ix: np.ndarray, iy: np.ndarray) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """Группы пар с одинаковым общим окном: (start, stop, номера пар)"""
+        start, stop = self.overlap(ix, iy)
+        bounds, group = np.unique(np.column_stack([start, stop]), axis=0, return_inverse=True)
+        order = np.argsort(group.ravel(), kind='stable')
+        splits = np.cumsum(np.bincount(group.ravel(), minlength=len(bounds)))[:-1]
+        for (begin, end), members in zip(bounds, np.split(order, splits)):
+            yield int(begin), int(end), members
+
+    def block(self, start: int, stop: int, columns: np.ndarray) -> np.ndarray:
+        """Цены столбцов columns на строках [start, stop)
+
+        Подряд идущие столбцы отдаются срезом без копирования.
+        """
+        columns = np.asarray(columns)
+        if len(columns) and np.array_equal(columns, np.arange(columns[0], columns[0] + len(columns))):
+            return self.values[start:stop, columns[0]:columns[0] + len(columns)]
+        return self.values[start:stop, columns]
+
+    def pair_view(self, i: int, j: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Цены двух тикеров на общих наблюдениях
+
+        Для тикеров без внутренних пропусков это срезы общего окна,
+        разделяющие память с панелью; иначе - копии строк, где заданы обе цены.
+        """
+        start = max(self.first[i], self.first[j])
+        stop = max(min(self.last[i], self.last[j]), start)
+        x, y = self.values[start:stop, i], self.values[start:stop, j]
+        if self.contiguous[i] and self.contiguous[j]:
+            return x, y
+        both = self.mask[start:stop, i] & self.mask[start:stop, j]
+        return x[both], y[both]
@@ -0,0 +1,153 @@
+# price_store.py
+# Бинарное колоночное хранилище цен (memory-mapped NumPy)
+import json
+import os
+import numpy as np
+import pandas as pd
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PriceStore:
+    """Панель цен на диске: каталог с файлами
+
+    meta.json        - тикеры, имя индекса, форма панели и номер версии
+    dates-NNNN.npy   - даты (datetime64)
+    values-NNNN.npy  - цены формы (N тикеров, T дней), ряд каждого тикера
+                       лежит в файле непрерывно, поэтому чтение части
+                       тикеров и окна дат затрагивает только нужные байты
+
+    Запись создает файлы новой версии рядом со старыми и последним
+    шагом атомарно заменяет meta.json. Сбой до этого шага оставляет
+    хранилище в прежнем согласованном состоянии; файлы старой версии
+    удаляются после переключения. Хранилища прежнего формата (dates.npy,
+    values.npy без номера) читаются как есть.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._meta = None
+        self._dates = None
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, 'meta.json'))
+
+    @property
+    def meta(self) -> dict:
+        if self._meta is None:
+            with open(os.path.join(self.path, 'meta.json'), 'r', encoding='utf-8') as f:
+                self._meta = json.load(f)
+        return self._meta
+
+    @property
+    def tickers(self) -> List[str]:
+        return self.meta['tickers']
+
+    def _file(self, name: str) -> str:
+        """Путь к файлу данных текущей версии"""
+        version = self.meta.get('version')
+        return os.path.join(self.path, f'{name}.npy' if version is None else f'{name}-{version:04d}.npy')
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        if self._dates is None:
+            dates = np.load(self._file('dates'))
+            self._dates = pd.DatetimeIndex(dates, name=self.meta.get('index_name'))
+        return self._dates
+
+    def _values(self) -> np.ndarray:
+        """Цены (N, T) через memory map; форма сверяется с meta.json"""
+        values = np.load(self._file('values'), mmap_mode='r')
+        shape = self.meta.get('shape')
+        if shape is not None and list(values.shape) != shape:
+            raise ValueError(f"Хранилище {self.path} повреждено: форма цен {values.shape}, в meta.json {shape}")
+        return values
+
+    def write(self, prices: pd.DataFrame, dtype=np.float64):
+        """Записать панель целиком
+
+        Данные пишутся в файлы новой версии, затем атомарно заменяется
+        meta.json, поэтому читатель видит либо старую, либо новую панель.
+        """
+        prices = prices.sort_index()
+        os.makedirs(self.path, exist_ok=True)
+        old = self.meta if self.exists() else {}
+        version = old.get('version', 0) + 1
+        dates = pd.DatetimeIndex(prices.index).to_numpy()
+        values = np.ascontiguousarray(prices.to_numpy(dtype=dtype).T)
+        self._save(f'dates-{version:04d}.npy', dates)
+        self._save(f'values-{version:04d}.npy', values)
+        meta = {
+            'tickers': [str(t) for t in prices.columns],
+            'index_name': prices.index.name,
+            'dtype': np.dtype(dtype).str,
+            'shape': list(values.shape),
+            'version': version,
+        }
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+        self._meta, self._dates = None, None
+        # Файлы прежних версий и недописанные файлы прерванных записей
+        current = {f'dates-{version:04d}.npy', f'values-{version:04d}.npy'}
+        for name in os.listdir(self.path):
+            if name.endswith('.npy') and name.startswith(('dates', 'values')) and name not in current:
+                os.remove(os.path.join(self.path, name))
+        logger.info(f"Хранилище записано: {values.shape[0]} акций, {values.shape[1]} дней")
+
+    def _save(self, name: str, array: np.ndarray):
+        with open(os.path.join(self.path, name), 'wb') as f:
+            np.save(f, array)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self, tickers: Optional[List[str]] = None, start=None, end=None) -> pd.DataFrame:
+        """Прочитать выбранные тикеры за период [start, end]"""
+        dates = self.dates
+        lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side='right')
+
+        values = self._values()
+        if tickers is None:
+            tickers = self.tickers
+            block = values[:, lo:hi]
+        else:
+            position = {t: i for i, t in enumerate(self.tickers)}
+            missing = [t for t in tickers if t not in position]
+            if missing:
+                raise KeyError(f"Тикеры отсутствуют в хранилище: {missing}")
+            block = values[[position[t] for t in tickers], lo:hi]
+        return pd.DataFrame(np.array(block.T), index=dates[lo:hi], columns=list(tickers))
+
+    def last_dates(self) -> Dict[str, pd.Timestamp]:
+        """Последняя дата с ценой для каждого тикера (NaT, если цен нет)"""
+        values = self._values()
+        last = {}
+        for ticker, row in zip(self.tickers, values):
+            valid = np.flatnonzero(~np.isnan(row))
+            last[ticker] = self.dates[valid[-1]] if len(valid) else pd.NaT
+        return last
+
+    def append(self, prices: pd.DataFrame):
+        """Дописать новые дни и тикеры, не изменяя уже сохраненные цены"""
+        if not self.exists():
+            self.write(prices)
+            return
+        merged = self.read().combine_first(prices)
+        # combine_first сортирует столбцы - сохраняем исходный порядок тикеров
+        new_tickers = [t for t in prices.columns if t not in self.tickers]
+        merged = merged[self.tickers + new_tickers]
+        merged.index.name = self.meta.get('index_name')
+        self.write(merged, dtype=np.dtype(self.meta.get('dtype', '<f8')))
+
+    @classmethod
+    def from_csv(cls, csv_path: str, store_path: str) -> 'PriceStore':
+        """Конвертация CSV (формат data/stocks_prices.csv) в хранилище"""
+        store = cls(store_path)
+        store.write(pd.read_csv(csv_path, index_col=0, parse_dates=True))
+        return store
@@ -0,0 +1,96 @@
+# price_updater.py
+# Инкрементальная дозагрузка цен в хранилище
+import pandas as pd
+import logging
+from collections import defaultdict
+from typing import Dict, List
+
+from src.price_store import PriceStore
+
+logger = logging.getLogger(__name__)
+
+
+class YahooProvider:
+    """Источник цен Yahoo Finance (Adj Close, если есть, иначе Close)"""
+
+    def fetch(self, tickers: List[str], start, end) -> pd.DataFrame:
+        import yfinance as yf
+
+        # У yfinance конец периода не включается
+        data = yf.download(tickers, start=pd.Timestamp(start), end=pd.Timestamp(end) + pd.Timedelta(days=1),
+                           progress=False, auto_adjust=False, group_by='column')
+        if data.empty:
+            return pd.DataFrame(columns=tickers)
+        field = 'Adj Close' if 'Adj Close' in data.columns.get_level_values(0) else 'Close'
+        prices = data[field]
+        if isinstance(prices, pd.Series):
+            prices = prices.to_frame(tickers[0])
+        return prices
+
+
+class FrameProvider:
+    """Локальный источник из готовой таблицы цен (для тестов и офлайн-работы)
+
+    Запоминает запросы в self.requests: (тикеры, начало, конец).
+    """
+
+    def __init__(self, prices: pd.DataFrame):
+        self.prices = prices
+        self.requests = []
+
+    def fetch(self, tickers: List[str], start, end) -> pd.DataFrame:
+        self.requests.append((list(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        return self.prices.loc[pd.Timestamp(start):pd.Timestamp(end), list(tickers)]
+
+
+class IncrementalUpdater:
+    """Дозагрузка только недостающих дней для каждого тикера
+
+    Для каждого тикера берется последняя сохраненная дата, тикеры с
+    одинаковой датой начала запрашиваются пакетами по batch_size.
+    Новые данные дописываются в хранилище, сохраненные значения не
+    перезаписываются.
+    """
+
+    def __init__(self, store: PriceStore, provider=None, batch_size: int = 50):
+        self.store = store
+        self.provider = provider if provider is not None else YahooProvider()
+        self.batch_size = batch_size
+
+    def plan(self, tickers: List[str], start, end) -> Dict[pd.Timestamp, List[str]]:
+        """Группы тикеров по дате начала дозагрузки"""
+        last = self.store.last_dates() if self.store.exists() else {}
+        groups = defaultdict(list)
+        for ticker in tickers:
+            if ticker in last and not pd.isna(last[ticker]):
+                first_missing = last[ticker] + pd.Timedelta(days=1)
+            else:
+                first_missing = pd.Timestamp(start)
+            if first_missing <= pd.Timestamp(end):
+                groups[first_missing].append(ticker)
+        return dict(groups)
+
+    def update(self, tickers: List[str], start=None, end=None) -> int:
+        """Дозагрузить тикеры; start - начало истории для новых тикеров
+
+        Возвращает число добавленных значений цен.
+        """
+        end = pd.Timestamp.today().normalize() if end is None else pd.Timestamp(end)
+        start = end - pd.DateOffset(years=1) if start is None else pd.Timestamp(start)
+
+        frames = []
+        for group_start, group in sorted(self.plan(tickers, start, end).items()):
+            for i in range(0, len(group), self.batch_size):
+                batch = group[i:i + self.batch_size]
+                logger.info(f"Загрузка {len(batch)} тикеров с {group_start.date()} по {end.date()}")
+                frames.append(self.provider.fetch(batch, group_start, end))
+
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            logger.info("Новых данных нет")
+            return 0
+        new = pd.concat(frames, axis=1).dropna(how='all')
+        added = int(new.notna().sum().sum())
+        self.store.append(new)
+        logger.info(f"Добавлено {added} значений цен")
+        return added
@@ -0,0 +1,96 @@
+# query_service.py
+# Локальный HTTP/JSON сервис запросов к хранилищу результатов
+import json
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from src.result_store import ResultStore
+
+logger = logging.getLogger(__name__)
+
+# Параметры запроса /pairs и их типы
+PAIR_FILTERS = {'ticker': str, 'run_id': int, 'last_runs': int, 'beta_min': float, 'beta_max': float,
+                'p_max': float, 'q_max': float, 'limit': int}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """GET-запросы к ResultStore сервера (server.store)
+
+    /runs?limit=N           - запуски, начиная с последнего
+    /runs/latest            - последний запуск
+    /runs/<run_id>/pairs    - пары запуска по p-value
+    /pairs?ticker=XOM&beta_min=0.5&beta_max=2&last_runs=30
+                            - пары по условиям ResultStore.pairs
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            store = self.server.store
+            if parts == ['runs']:
+                body = store.runs(limit=_parse(query, {'limit': int}).get('limit'))
+            elif parts == ['runs', 'latest']:
+                body = store.latest_run()
+                if body is None:
+                    return self._send(404, {'error': 'Запусков нет'})
+            elif len(parts) == 3 and parts[0] == 'runs' and parts[2] == 'pairs':
+                body = store.pairs(run_id=int(parts[1]), **_parse(query, {'limit': int}))
+            elif parts == ['pairs']:
+                body = store.pairs(**_parse(query, PAIR_FILTERS))
+            else:
+                return self._send(404, {'error': f'Неизвестный путь: {url.path}'})
+        except ValueError as e:
+            return self._send(400, {'error': str(e)})
+        self._send(200, body)
+
+    def _send(self, status: int, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def _parse(query: dict, types: dict) -> dict:
+    unknown = set(query) - set(types)
+    if unknown:
+        raise ValueError(f"Неизвестные параметры: {', '.join(sorted(unknown))}")
+    try:
+        return {key: types[key](value) for key, value in query.items()}
+    except ValueError:
+        raise ValueError(f"Неверное значение параметра: {query}")
+
+
+def make_server(store: ResultStore, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """HTTP-сервер запросов; каждый запрос - в своем потоке с соединением из пула store"""
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.daemon_threads = True
+    server.store = store
+    return server
+
+
+def serve(path: str = 'results/pairs.sqlite', host: str = '127.0.0.1', port: int = 8765,
+          pool_size: int = 8, background: bool = False) -> Optional[ThreadingHTTPServer]:
+    """Запустить сервис; background=True - в фоновом потоке, возвращает сервер для shutdown()"""
+    server = make_server(ResultStore(path, pool_size=pool_size), host, port)
+    logger.info(f"Сервис запросов: http://{server.server_address[0]}:{server.server_address[1]}/ ({path})")
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.store.close()
+    return None
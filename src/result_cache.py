@@ -0,0 +1,105 @@
+# result_cache.py
+# Постоянный кэш результатов теста пар с адресацией по содержимому
+import hashlib
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def column_hashes(price_data: pd.DataFrame) -> List[str]:
+    """Хэш (даты + цены) каждого столбца панели"""
+    dates = pd.DatetimeIndex(price_data.index).as_unit('ns').asi8.tobytes()
+    values = price_data.to_numpy(dtype=np.float64)
+    hashes = []
+    for k in range(values.shape[1]):
+        h = hashlib.blake2b(dates, digest_size=16)
+        h.update(np.ascontiguousarray(values[:, k]).tobytes())
+        hashes.append(h.hexdigest())
+    return hashes
+
+
+class PairResultCache:
+    """Кэш результатов теста Энгла-Грэнджера в SQLite
+
+    Ключ - хэш от пары тикеров, содержимого обоих рядов и параметров
+    теста, поэтому любое изменение данных или параметров дает промах.
+    Хранится не более max_entries записей, лишние вытесняются по давности
+    последнего обращения (LRU).
+    """
+
+    def __init__(self, path: str = 'results/pair_cache.sqlite', max_entries: int = 1_000_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._clock = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS pair_results (
+            key TEXT PRIMARY KEY, alpha REAL, beta REAL, r_squared REAL,
+            p_value REAL, last_used INTEGER)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON pair_results(last_used)")
+        row = self.conn.execute("SELECT MAX(last_used) FROM pair_results").fetchone()
+        self._clock = row[0] or 0
+
+    def pair_keys(self, price_data: pd.DataFrame, ix: np.ndarray, iy: np.ndarray, params: str,
+                  hashes: List[str] = None) -> List[str]:
+        """Ключи кэша для пар столбцов (ix, iy); hashes - готовые column_hashes"""
+        tickers = [str(t) for t in price_data.columns]
+        if hashes is None:
+            hashes = column_hashes(price_data)
+        keys = []
+        for i, j in zip(ix, iy):
+            raw = '|'.join((tickers[i], tickers[j], hashes[i], hashes[j], params))
+            keys.append(hashlib.blake2b(raw.encode('utf-8'), digest_size=20).hexdigest())
+        return keys
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[float, float, float, float]]:
+        """(alpha, beta, r_squared, p_value) для найденных ключей"""
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, alpha, beta, r_squared, p_value FROM pair_results WHERE key IN ({marks})",
+                chunk).fetchall()
+            found.update((row[0], row[1:]) for row in rows)
+        if found:
+            self._clock += 1
+            self.conn.executemany("UPDATE pair_results SET last_used = ? WHERE key = ?",
+                                  [(self._clock, key) for key in found])
+            self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: List[Tuple[str, float, float, float, float]]):
+        """Сохранить записи (key, alpha, beta, r_squared, p_value)"""
+        if not items:
+            return
+        self._clock += 1
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO pair_results VALUES (?, ?, ?, ?, ?, ?)",
+            [(*item, self._clock) for item in items])
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM pair_results").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute("""DELETE FROM pair_results WHERE key IN (
+                SELECT key FROM pair_results ORDER BY last_used LIMIT ?)""", (excess,))
+            logger.info(f"Из кэша вытеснено {excess} записей")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM pair_results").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
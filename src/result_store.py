@@ -0,0 +1,176 @@
+# result_store.py
+# Индексированное хранилище запусков поиска и статистик пар в SQLite
+import json
+import os
+import queue
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PAIR_COLUMNS = ('ticker_x', 'ticker_y', 'p_value', 'q_value', 'alpha', 'beta', 'r_squared')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created TEXT NOT NULL,
+    data_start TEXT, data_end TEXT, n_tickers INTEGER,
+    n_pairs INTEGER NOT NULL,
+    results_file TEXT,
+    settings TEXT);
+CREATE TABLE IF NOT EXISTS pairs (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    ticker_x TEXT NOT NULL, ticker_y TEXT NOT NULL,
+    p_value REAL, q_value REAL, alpha REAL, beta REAL, r_squared REAL);
+CREATE INDEX IF NOT EXISTS idx_pairs_x ON pairs(ticker_x, run_id);
+CREATE INDEX IF NOT EXISTS idx_pairs_y ON pairs(ticker_y, run_id);
+CREATE INDEX IF NOT EXISTS idx_pairs_run ON pairs(run_id, p_value);
+"""
+
+
+class ResultStore:
+    """Запуски поиска пар и их статистики в одном файле SQLite
+
+    runs  - по записи на запуск: время, период данных, число пар,
+            CSV save_results и параметры запуска (JSON)
+    pairs - найденные пары запуска; индексы (ticker_x, run_id),
+            (ticker_y, run_id) и (run_id, p_value) покрывают выборки
+            по тикеру, по последним запускам и лучшие пары запуска
+
+    Соединения берутся из пула на pool_size соединений, поэтому объект
+    можно делить между потоками (HTTP-сервер src.query_service).
+    Журнал WAL позволяет читать во время записи нового запуска.
+    """
+
+    def __init__(self, path: str = 'results/pairs.sqlite', pool_size: int = 4):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self._pool.put(None)
+        with self.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Соединение из пула (ждет, если все заняты); открывается при первом обращении"""
+        conn = self._pool.get()
+        try:
+            if conn is None:
+                conn = self._connect()
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def add_run(self, pairs: Iterable, price_data=None, results_file: Optional[str] = None,
+                settings: Optional[dict] = None, created: Optional[str] = None) -> int:
+        """Записать запуск и его пары (словари или PairResult); возвращает run_id"""
+        rows = [tuple(_number(pair.get(name)) if name not in ('ticker_x', 'ticker_y') else str(pair[name])
+                      for name in PAIR_COLUMNS) for pair in pairs]
+        data = {}
+        if price_data is not None and len(price_data):
+            data = dict(data_start=price_data.index[0].strftime('%Y-%m-%d'),
+                        data_end=price_data.index[-1].strftime('%Y-%m-%d'), n_tickers=price_data.shape[1])
+        with self.connection() as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (created, data_start, data_end, n_tickers, n_pairs, results_file, settings) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (created or datetime.now().isoformat(timespec='seconds'), data.get('data_start'),
+                 data.get('data_end'), data.get('n_tickers'), len(rows), results_file,
+                 json.dumps(settings, default=str) if settings is not None else None))
+            run_id = cursor.lastrowid
+            conn.executemany(f"INSERT INTO pairs (run_id, {', '.join(PAIR_COLUMNS)}) VALUES (?{', ?' * 7})",
+                             [(run_id, *row) for row in rows])
+        logger.info(f"Запуск {run_id} записан в {self.path}: пар {len(rows)}")
+        return run_id
+
+    def runs(self, limit: Optional[int] = None) -> List[dict]:
+        """Запуски, начиная с последнего"""
+        with self.connection() as conn:
+            rows = conn.execute("SELECT * FROM runs ORDER BY run_id DESC LIMIT ?",
+                                (-1 if limit is None else limit,)).fetchall()
+        return [_run(row) for row in rows]
+
+    def latest_run(self) -> Optional[dict]:
+        """Последний запуск или None, если запусков нет"""
+        runs = self.runs(limit=1)
+        return runs[0] if runs else None
+
+    def pairs(self, ticker: Optional[str] = None, run_id: Optional[int] = None, last_runs: Optional[int] = None,
+              beta_min: Optional[float] = None, beta_max: Optional[float] = None,
+              p_max: Optional[float] = None, q_max: Optional[float] = None,
+              limit: Optional[int] = None) -> List[dict]:
+        """Пары по условиям, отсортированные по запуску (свежие первыми) и p-value
+
+        ticker - пары, где тикер стоит на любом месте; run_id - один
+        запуск; last_runs - только последние N запусков; остальные
+        условия - границы beta, p-value и q-value (включительно).
+        """
+        where, args = [], []
+        if ticker is not None:
+            # OR по двум индексам SQLite выполняет как объединение двух поисков
+            where.append("(ticker_x = ? OR ticker_y = ?)")
+            args += [ticker, ticker]
+        if run_id is not None:
+            where.append("run_id = ?")
+            args.append(run_id)
+        if last_runs is not None:
+            where.append("run_id >= (SELECT MIN(run_id) FROM "
+                         "(SELECT run_id FROM runs ORDER BY run_id DESC LIMIT ?))")
+            args.append(last_runs)
+        for condition, value in (("beta >= ?", beta_min), ("beta <= ?", beta_max),
+                                 ("p_value <= ?", p_max), ("q_value <= ?", q_max)):
+            if value is not None:
+                where.append(condition)
+                args.append(value)
+        sql = f"SELECT run_id, {', '.join(PAIR_COLUMNS)} FROM pairs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY run_id DESC, p_value LIMIT ?"
+        args.append(-1 if limit is None else limit)
+        with self.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, args).fetchall()]
+
+    def run_pairs(self, run_id: Optional[int] = None, limit: Optional[int] = None) -> List[dict]:
+        """Пары запуска (по умолчанию последнего) по возрастанию p-value"""
+        if run_id is None:
+            latest = self.latest_run()
+            if latest is None:
+                return []
+            run_id = latest['run_id']
+        return self.pairs(run_id=run_id, limit=limit)
+
+    def close(self):
+        """Закрыть свободные соединения пула (при следующем обращении откроются заново)"""
+        conns = []
+        while not self._pool.empty():
+            conns.append(self._pool.get_nowait())
+        for conn in conns:
+            if conn is not None:
+                conn.close()
+            self._pool.put(None)
+
+
+def _number(value) -> Optional[float]:
+    # NaN (нет q-value) хранится как NULL
+    if value is None:
+        return None
+    value = float(value)
+    return None if value != value else value
+
+
+def _run(row: sqlite3.Row) -> Dict:
+    run = dict(row)
+    run['settings'] = json.loads(run['settings']) if run['settings'] else None
+    return run
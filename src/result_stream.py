@@ -0,0 +1,165 @@
+# result_stream.py
+# Потоковая запись результатов поиска пар на диск с контрольными точками
+import glob
+import hashlib
+import heapq
+import json
+import os
+import numpy as np
+import pandas as pd
+import logging
+from typing import List
+
+from src.pair_result import PairResult
+from src.result_cache import column_hashes
+
+logger = logging.getLogger(__name__)
+
+
+class _Worst:
+    """Обертка для кучи: наверху - пара с наибольшим p-value"""
+
+    __slots__ = ('key', 'pair')
+
+    def __init__(self, pair):
+        self.key = (pair['p_value'], pair['ticker_x'], pair['ticker_y'])
+        self.pair = pair
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+
+class TopKPairs:
+    """k лучших пар по p-value в ограниченной куче (O(k) памяти)"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap = []
+
+    def push(self, pair):
+        item = _Worst(pair)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif self._heap and item.key < self._heap[0].key:
+            heapq.heapreplace(self._heap, item)
+
+    def extend(self, pairs):
+        for pair in pairs:
+            self.push(pair)
+
+    def sorted(self) -> list:
+        return [item.pair for item in sorted(self._heap, key=lambda item: item.key)]
+
+
+class PairResultWriter:
+    """Запись результатов частями в каталог
+
+    part-NNNNN.npz  - столбцы ticker_x, ticker_y, p_value, alpha, beta,
+                      r_squared, q_value для одного блока пар
+    checkpoint.json - отпечаток данных и параметров, позиция следующего
+                      кандидата и число записанных частей
+
+    Часть пишется до обновления контрольной точки, поэтому после сбоя
+    теряется не больше одного блока. Возобновление возможно только при
+    совпадении отпечатка.
+    """
+
+    def __init__(self, path: str, fingerprint: str, resume: bool = True):
+        self.path = path
+        self.fingerprint = fingerprint
+        os.makedirs(path, exist_ok=True)
+        checkpoint = self._load_checkpoint()
+        if resume and checkpoint.get('fingerprint') == fingerprint:
+            self.position = checkpoint['position']
+            self.parts = checkpoint['parts']
+            if self.position:
+                logger.info(f"Продолжаем с позиции {self.position}, записано частей: {self.parts}")
+        else:
+            if checkpoint:
+                logger.info("Контрольная точка не подходит к данным, поиск начинается заново")
+            self.position, self.parts = 0, 0
+        # Части, записанные после последней контрольной точки, недостоверны
+        for part in self._part_files()[self.parts:]:
+            os.remove(part)
+
+    def _checkpoint_path(self) -> str:
+        return os.path.join(self.path, 'checkpoint.json')
+
+    def _load_checkpoint(self) -> dict:
+        if not os.path.exists(self._checkpoint_path()):
+            return {}
+        with open(self._checkpoint_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _part_files(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.path, 'part-*.npz')))
+
+    def write(self, pairs: list, position: int):
+        """Записать пары блока и сдвинуть контрольную точку на position"""
+        if pairs:
+            columns = {name: np.array([p[name] for p in pairs]) for name in PairResult.FIELDS}
+            part = os.path.join(self.path, f'part-{self.parts:05d}.npz')
+            with open(part + '.tmp', 'wb') as f:
+                np.savez(f, **columns)
+            os.replace(part + '.tmp', part)
+            self.parts += 1
+        self.position = position
+
+        tmp = self._checkpoint_path() + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'position': position, 'parts': self.parts}, f)
+        os.replace(tmp, self._checkpoint_path())
+
+    def read(self) -> pd.DataFrame:
+        """Все записанные результаты одной таблицей"""
+        return read_pair_results(self.path)
+
+
+def read_pair_results(path: str) -> pd.DataFrame:
+    """Прочитать результаты потокового поиска, отсортированные по p-value"""
+    frames = []
+    for part in sorted(glob.glob(os.path.join(path, 'part-*.npz'))):
+        with np.load(part) as data:
+            # В частях прежних версий нет q_value
+            n = len(data['p_value'])
+            frames.append(pd.DataFrame({name: data[name] if name in data.files else np.full(n, np.nan)
+                                        for name in PairResult.FIELDS}))
+    if not frames:
+        return pd.DataFrame(columns=list(PairResult.FIELDS))
+    table = pd.concat(frames, ignore_index=True)
+    return table.sort_values(['p_value', 'ticker_x', 'ticker_y'], kind='stable').reset_index(drop=True)
+
+
+def scan_fingerprint(tester, price_data: pd.DataFrame) -> str:
+    """Отпечаток данных и параметров поиска для проверки контрольной точки"""
+    h = hashlib.blake2b(digest_size=20)
+    h.update('|'.join(map(str, price_data.columns)).encode('utf-8'))
+    h.update('|'.join(column_hashes(price_data)).encode('utf-8'))
+    prefilter = vars(tester.prefilter) if tester.prefilter is not None else None
+    # Блоки отбираются по selection_level (fdr_level, если задан)
+    h.update(repr((tester.test_params, tester.significance_level, tester.selection_level, tester.fdr_level,
+                   tester.min_data_points, prefilter)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def scan_to_disk(tester, price_data: pd.DataFrame, path: str, top_k: int = 100,
+                 chunk_size: int = 50000, resume: bool = True) -> List[PairResult]:
+    """Поиск пар с потоковой записью на диск
+
+    Пары пишутся частями после каждого блока кандидатов, в памяти
+    держатся только top_k лучших. Прерванный поиск продолжается с
+    последней контрольной точки. Возвращает top_k пар по p-value.
+    """
+    writer = PairResultWriter(path, scan_fingerprint(tester, price_data), resume=resume)
+
+    best = TopKPairs(top_k)
+    for row in writer.read().itertuples(index=False):
+        best.push(PairResult(row.ticker_x, row.ticker_y, float(row.p_value), float(row.alpha),
+                             float(row.beta), float(row.r_squared), price_data, float(row.q_value)))
+
+    for position, pairs in tester.iter_scan(price_data, chunk_size=chunk_size, start=writer.position):
+        writer.write(pairs, position)
+        best.extend(pairs)
+        logger.info(f"Обработано кандидатов: {position}, записано частей: {writer.parts}")
+
+    return best.sorted()
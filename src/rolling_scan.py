@@ -0,0 +1,151 @@
+# rolling_scan.py
+# Скользящий (walk-forward) анализ коинтеграции пар
+import numpy as np
+import pandas as pd
+import logging
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+
+from src.batch_engine import engle_granger_adf
+from src.price_panel import PricePanel
+
+logger = logging.getLogger(__name__)
+
+
+def _pair_indices(columns: List[str], pairs) -> tuple:
+    """Индексы (ix, iy) для списка пар: кортежи (x, y) или словари пар"""
+    position = {t: i for i, t in enumerate(columns)}
+    if pairs is None:
+        return np.triu_indices(len(columns), k=1)
+    names = [(p['ticker_x'], p['ticker_y']) if isinstance(p, Mapping) else tuple(p) for p in pairs]
+    ix = np.array([position[x] for x, _ in names], dtype=np.int64)
+    iy = np.array([position[y] for _, y in names], dtype=np.int64)
+    return ix, iy
+
+
+class RollingCointegrationScanner:
+    """Регрессия хеджирования и ADF остатков на скользящих окнах
+
+    Достаточные статистики регрессии (суммы x, y, x^2, y^2, xy) не
+    пересчитываются для каждого окна заново: сумма по окну k получается
+    из суммы по окну k-1 добавлением новых строк и вычитанием ушедших.
+    Для всех окон сразу это делается разностью накопленных сумм;
+    пары обрабатываются блоками по pair_chunk.
+    """
+
+    def __init__(self, window: int = 252, step: int = 1, pair_chunk: int = 4096, adf_rows: int = 256):
+        self.window = window
+        self.step = step
+        self.pair_chunk = pair_chunk
+        self.adf_rows = adf_rows
+
+    def window_ends(self, n_obs: int) -> np.ndarray:
+        """Концы окон (не включительно): окно k - строки [end - window, end)"""
+        return np.arange(self.window, n_obs + 1, self.step)
+
+    def _window_sums(self, values: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Суммы по всем окнам: накопленная сумма в конце минус в начале окна"""
+        cumulative = np.zeros((len(values) + 1, values.shape[1]))
+        np.cumsum(values, axis=0, out=cumulative[1:])
+        return cumulative[ends] - cumulative[ends - self.window]
+
+    def rolling_hedge(self, values: np.ndarray, ix: np.ndarray, iy: np.ndarray) -> Dict[str, np.ndarray]:
+        """alpha, beta, R² для каждого окна и пары: массивы (окна, пары)"""
+        W = self.window
+        # Сдвиг на среднее улучшает точность разностей сумм, OLS к нему инвариантен
+        ref = values.mean(axis=0)
+        shifted = values - ref
+        ends = self.window_ends(len(values))
+
+        mean = self._window_sums(shifted, ends) / W
+        var = self._window_sums(shifted ** 2, ends) - W * mean ** 2
+        out = {name: np.empty((len(ends), len(ix))) for name in ('alpha', 'beta', 'r_squared')}
+        for start in range(0, len(ix), self.pair_chunk):
+            sl = slice(start, start + self.pair_chunk)
+            cx, cy = ix[sl], iy[sl]
+            sxy = self._window_sums(shifted[:, cx] * shifted[:, cy], ends) - W * mean[:, cx] * mean[:, cy]
+            sxx, syy = var[:, cx], var[:, cy]
+            beta = sxy / sxx
+            out['beta'][:, sl] = beta
+            out['alpha'][:, sl] = (mean[:, cy] + ref[cy]) - beta * (mean[:, cx] + ref[cx])
+            out['r_squared'][:, sl] = sxy ** 2 / (sxx * syy)
+        return out
+
+    def rolling_p_values(self, values: np.ndarray, ix: np.ndarray, iy: np.ndarray,
+                         alpha: np.ndarray, beta: np.ndarray,
+                         r_squared: Optional[np.ndarray] = None) -> np.ndarray:
+        """p-value теста Энгла-Грэнджера для каждого окна и пары
+
+        Остатки нескольких окон складываются в одну матрицу и тестируются
+        одним вызовом engle_granger_adf. По r_squared окна с почти
+        совпадающими рядами получают p = 0, как в find_cointegrated_pairs.
+        """
+        W = self.window
+        ends = self.window_ends(len(values))
+        p_value = np.empty((len(ends), len(ix)))
+        per_call = max(1, self.adf_rows // max(len(ix), 1))
+        for start in range(0, len(ends), per_call):
+            block_ends = ends[start:start + per_call]
+            resid = np.stack([
+                (values[end - W:end, iy] - alpha[start + b] - beta[start + b] * values[end - W:end, ix]).T
+                for b, end in enumerate(block_ends)
+            ])
+            r2 = None if r_squared is None else r_squared[start:start + len(block_ends)].reshape(-1)
+            p = engle_granger_adf(resid.reshape(-1, W), r2)['p_value']
+            p_value[start:start + len(block_ends)] = p.reshape(len(block_ends), len(ix))
+        return p_value
+
+    def scan(self, price_data: pd.DataFrame, pairs: Optional[list] = None,
+             with_p_values: bool = True) -> Dict[str, pd.DataFrame]:
+        """Временные ряды alpha, beta, R² и p-value для пар
+
+        pairs - список (ticker_x, ticker_y) или словарей пар из
+        find_cointegrated_pairs; по умолчанию все пары столбцов.
+        Возвращает таблицы: индекс - последняя дата окна, столбцы -
+        MultiIndex (ticker_x, ticker_y). Окна пары строятся на общих
+        наблюдениях ее двух тикеров; где у пары нет окна - NaN.
+        """
+        panel = PricePanel.from_frame(price_data)
+        columns = panel.tickers
+        ix, iy = _pair_indices(panel.tickers, pairs)
+
+        # Каждая пара - на своем общем окне: поздний листинг или делистинг
+        # одного тикера не сокращает историю остальных пар
+        blocks = []
+        for start, stop, members in panel.windows(ix, iy):
+            whole = panel.contiguous[ix[members]] & panel.contiguous[iy[members]]
+            if whole.any():
+                blocks.append((members[whole], np.arange(start, stop)))
+            for k in members[~whole]:
+                # Внутренние пропуски: только строки, где заданы обе цены
+                rows = np.arange(start, stop)
+                blocks.append((np.array([k]), rows[panel.mask[rows, ix[k]] & panel.mask[rows, iy[k]]]))
+        blocks = [(members, rows) for members, rows in blocks if len(rows) >= self.window]
+        if not blocks:
+            raise ValueError(f"Данных меньше окна: ни у одной пары нет {self.window} общих наблюдений")
+        n_ends = sum(len(self.window_ends(len(rows))) for _, rows in blocks)
+        logger.info(f"Скользящий анализ {len(ix)} пар, групп окон: {len(blocks)}, окон: {n_ends}")
+
+        names = ('alpha', 'beta', 'r_squared') + (('p_value',) if with_p_values else ())
+        pieces = {name: [] for name in names}
+        for members, rows in blocks:
+            used, local = np.unique(np.concatenate([ix[members], iy[members]]), return_inverse=True)
+            bx, by = local[:len(members)], local[len(members):]
+            values = panel.values[np.ix_(rows, used)].astype(np.float64)
+            result = self.rolling_hedge(values, bx, by)
+            if with_p_values:
+                result['p_value'] = self.rolling_p_values(values, bx, by, result['alpha'], result['beta'],
+                                                          result['r_squared'])
+            index = price_data.index[rows[self.window_ends(len(rows)) - 1]]
+            for name in names:
+                pieces[name].append(pd.DataFrame(result[name], index=index, columns=members))
+
+        # Пары без полного окна остаются столбцами из NaN
+        labels = pd.MultiIndex.from_arrays([[columns[i] for i in ix], [columns[j] for j in iy]],
+                                           names=['ticker_x', 'ticker_y'])
+        out = {}
+        for name in names:
+            table = pd.concat(pieces[name], axis=1).sort_index().reindex(columns=range(len(ix)))
+            table.columns = labels
+            out[name] = table
+        return out
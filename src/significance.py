@@ -0,0 +1,236 @@
+# significance.py
+# Эмпирические p-value теста Энгла-Грэнджера по бутстрепу и контроль FDR
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from src.batch_engine import engle_granger_adf
+
+logger = logging.getLogger(__name__)
+
+
+def benjamini_hochberg(p_values: np.ndarray) -> np.ndarray:
+    """q-value Бенджамини-Хохберга для каждого p-value (NaN - пара не тестировалась)
+
+    Пара отвергает нулевую гипотезу при уровне FDR q, если ее
+    q-value <= q; это совпадает с процедурой step-up BH.
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    q_values = np.full(p_values.shape, np.nan)
+    tested = np.flatnonzero(~np.isnan(p_values))
+    m = len(tested)
+    if m == 0:
+        return q_values
+    order = tested[np.argsort(p_values[tested], kind='stable')]
+    ranked = p_values[order] * m / np.arange(1, m + 1)
+    # q_(k) = min по j >= k от p_(j) * m / j
+    q_values[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return q_values
+
+
+def eg_statistic(x: np.ndarray, y: np.ndarray) -> Dict[str, np.ndarray]:
+    """OLS y = alpha + beta * x и ADF-статистика остатков для строк (P, T)"""
+    mx, my = x.mean(axis=1, keepdims=True), y.mean(axis=1, keepdims=True)
+    dx, dy = x - mx, y - my
+    sxx = np.einsum('pt,pt->p', dx, dx)
+    sxy = np.einsum('pt,pt->p', dx, dy)
+    syy = np.einsum('pt,pt->p', dy, dy)
+    beta = sxy / sxx
+    alpha = my[:, 0] - beta * mx[:, 0]
+    resid = y - alpha[:, None] - beta[:, None] * x
+    stat = engle_granger_adf(resid, sxy ** 2 / (sxx * syy))['adf_statistic']
+    return {'alpha': alpha, 'beta': beta, 'resid': resid, 'statistic': stat}
+
+
+class SignificanceEngine:
+    """Эмпирические p-value теста Энгла-Грэнджера по репликам под H0
+
+    Реплики строятся по схеме residual-based block bootstrap (Paparoditis,
+    Politis): остатки пары u раскладываются как u_t = rho * u_(t-1) + e_t,
+    блоки (dx_t, e_t) перемешиваются, и u* = cumsum(e*) получает единичный
+    корень, то есть коинтеграции в реплике нет. Для каждой реплики заново
+    оцениваются регрессия и ADF остатков; p-value = (1 + число реплик со
+    статистикой не больше наблюдаемой) / (n_replicates + 1).
+
+    method: 'bootstrap' - блоки выбираются с возвращением (moving block),
+    'permutation' - перестановка непересекающихся блоков. Индексы реплик
+    зависят только от seed и длины ряда и общие для всех пар одного окна,
+    поэтому реплики всех пар считаются одним набором матриц. block_size
+    None - T^(1/3). screen - пересчитывать только пары с асимптотическим
+    p-value не выше screen (остальные заведомо незначимы), None - все.
+
+    pooled=True сравнивает статистику пары с репликами всех пар той же
+    длины ряда: статистика под H0 почти не зависит от пары (на этом
+    построены таблицы МакКиннона), а разрешение p-value становится
+    1 / (пары x реплики) вместо 1 / n_replicates - иначе поправка FDR
+    на тысячах пар не может отобрать ни одной. Если после screen пар
+    меньше pool_pairs, пул дополняется репликами отсеянных пар.
+    Поэтому при pooled=True CointegrationTester кэширует только
+    асимптотический результат и пересчитывает реплики при каждом поиске.
+    n_jobs > 1 считает блоки по pair_chunk пар в пуле процессов;
+    adf_rows ограничивает число рядов (пары x реплики) на вызов ADF.
+    """
+
+    def __init__(self, n_replicates: int = 199, method: str = 'bootstrap', block_size: Optional[int] = None,
+                 seed: int = 0, screen: Optional[float] = None, pooled: bool = True, pool_pairs: int = 100,
+                 n_jobs: int = 1, pair_chunk: int = 64, adf_rows: int = 512):
+        if method not in ('bootstrap', 'permutation'):
+            raise ValueError(f"Неизвестный метод реплик: {method}")
+        if n_replicates < 1:
+            raise ValueError("Нужна хотя бы одна реплика")
+        self.n_replicates = n_replicates
+        self.method = method
+        self.block_size = block_size
+        self.seed = seed
+        self.screen = screen
+        self.pooled = pooled
+        self.pool_pairs = pool_pairs
+        self.n_jobs = n_jobs
+        self.pair_chunk = pair_chunk
+        self.adf_rows = adf_rows
+        self._indices = {}
+
+    def __getstate__(self):
+        # Индексы реплик процесс-исполнитель строит сам
+        state = dict(self.__dict__)
+        state['_indices'] = {}
+        return state
+
+    @property
+    def params(self) -> str:
+        """Параметры реплик для ключа кэша и отпечатка поиска"""
+        return (f"{self.method}:r{self.n_replicates}:b{self.block_size or 'auto'}:"
+                f"seed{self.seed}:screen{self.screen}:{f'pool{self.pool_pairs}' if self.pooled else 'pair'}")
+
+    def indices(self, n_steps: int) -> np.ndarray:
+        """Номера приращений (n_replicates, n_steps) для рядов из n_steps + 1 точек"""
+        if n_steps not in self._indices:
+            rng = np.random.default_rng([self.seed, n_steps])
+            block = min(self.block_size or max(1, int(round(n_steps ** (1 / 3)))), n_steps)
+            n_blocks = -(-n_steps // block)
+            offsets = np.arange(block)
+            if self.method == 'bootstrap':
+                starts = rng.integers(0, n_steps - block + 1, size=(self.n_replicates, n_blocks))
+                positions = (starts[:, :, None] + offsets).reshape(self.n_replicates, -1)[:, :n_steps]
+            else:
+                # Каждый блок ровно один раз; неполный последний блок отбрасывает лишнее
+                order = np.argsort(rng.random((self.n_replicates, n_blocks)), axis=1)
+                positions = (order[:, :, None] * block + offsets).reshape(self.n_replicates, -1)
+                positions = positions[positions < n_steps].reshape(self.n_replicates, n_steps)
+            self._indices[n_steps] = positions
+        return self._indices[n_steps]
+
+    def statistics(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Наблюдаемая статистика (P,) и статистики реплик (P, n_replicates)
+
+        x, y - цены пар по столбцам (T, P) на общем окне без пропусков.
+        """
+        x, y = np.asarray(x, dtype=np.float64).T, np.asarray(y, dtype=np.float64).T
+        P, T = x.shape
+        R = self.n_replicates
+        fit = eg_statistic(x, y)
+        resid = fit['resid']
+        rho = (np.einsum('pt,pt->p', resid[:, 1:], resid[:, :-1])
+               / np.einsum('pt,pt->p', resid[:, :-1], resid[:, :-1]))
+        shocks = resid[:, 1:] - rho[:, None] * resid[:, :-1]
+        shocks -= shocks.mean(axis=1, keepdims=True)
+        steps = np.diff(x, axis=1)
+        steps -= steps.mean(axis=1, keepdims=True)
+
+        positions = self.indices(T - 1)
+        null = np.empty((P, R))
+        per_call = max(1, self.adf_rows // R)
+        for start in range(0, P, per_call):
+            sl = slice(start, start + per_call)
+            # Реплики (пары, реплики, T): уровни из перемешанных приращений
+            xs = np.empty((len(x[sl]), R, T))
+            us = np.empty_like(xs)
+            xs[:, :, 0] = x[sl, :1]
+            us[:, :, 0] = resid[sl, :1]
+            np.cumsum(steps[sl][:, positions], axis=2, out=xs[:, :, 1:])
+            np.cumsum(shocks[sl][:, positions], axis=2, out=us[:, :, 1:])
+            xs[:, :, 1:] += x[sl, :1, None]
+            us[:, :, 1:] += resid[sl, :1, None]
+            ys = fit['alpha'][sl, None, None] + fit['beta'][sl, None, None] * xs + us
+            stat = eg_statistic(xs.reshape(-1, T), ys.reshape(-1, T))['statistic']
+            null[sl] = stat.reshape(-1, R)
+        return fit['statistic'], null
+
+    def _p_from_null(self, observed: np.ndarray, null: np.ndarray) -> np.ndarray:
+        """p-value = (1 + число реплик не больше статистики) / (число реплик + 1)"""
+        if self.pooled:
+            pool = np.sort(null[~np.isnan(null)])
+            p_value = (1 + np.searchsorted(pool, observed, side='right')) / (len(pool) + 1)
+        else:
+            p_value = (1 + np.sum(null <= observed[:, None], axis=1)) / (self.n_replicates + 1)
+        # Постоянные ряды ADF не тестирует (как p = 1 в batch_adfuller)
+        return np.where(np.isnan(observed), 1.0, p_value)
+
+    def empirical_p_values(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Эмпирические p-value пар (столбцы x, y формы (T, P))"""
+        return self._p_from_null(*self.statistics(x, y))
+
+    def p_values(self, panel, ix: np.ndarray, iy: np.ndarray,
+                 asymptotic: Optional[np.ndarray] = None) -> np.ndarray:
+        """Эмпирические p-value пар (ix, iy) PricePanel на общих окнах
+
+        Пары с asymptotic > screen сохраняют асимптотическое p-value.
+        """
+        ix = np.asarray(ix, dtype=np.int64)
+        iy = np.asarray(iy, dtype=np.int64)
+        result = np.full(len(ix), np.nan) if asymptotic is None else np.array(asymptotic, dtype=np.float64)
+        todo = np.ones(len(ix), dtype=bool)
+        if asymptotic is not None and self.screen is not None:
+            todo = ~(result > self.screen)
+        selected = np.flatnonzero(todo)
+        if not len(selected):
+            return result
+        skipped = np.flatnonzero(~todo)
+        if self.pooled and len(selected) < self.pool_pairs and len(skipped):
+            # Реплики части отсеянных пар - только для пула, их p-value не меняются
+            extra = skipped[np.linspace(0, len(skipped) - 1, min(self.pool_pairs - len(selected), len(skipped)))
+                            .astype(np.int64)]
+            selected = np.union1d(selected, extra)
+
+        # Задачи: блоки пар одного окна, цены передаются только нужные
+        tasks, members = [], []
+        for start, stop, group in panel.windows(ix[selected], iy[selected]):
+            for begin in range(0, len(group), self.pair_chunk):
+                chunk = selected[group[begin:begin + self.pair_chunk]]
+                if (panel.contiguous[ix[chunk]] & panel.contiguous[iy[chunk]]).all():
+                    tasks.append((panel.values[start:stop, ix[chunk]], panel.values[start:stop, iy[chunk]]))
+                    members.append(chunk)
+                    continue
+                # Внутренние пропуски: каждая пара на своих общих наблюдениях
+                for k in chunk:
+                    x, y = panel.pair_view(ix[k], iy[k])
+                    tasks.append((x[:, None], y[:, None]))
+                    members.append(chunk[chunk == k])
+        tasks_members = [(task, chunk) for task, chunk in zip(tasks, members) if len(task[0]) >= 3]
+        logger.info(f"Реплики {self.method}: {int(todo.sum())} пар (пул {len(selected)}) x {self.n_replicates}, "
+                    f"блоков {len(tasks_members)}")
+
+        n_jobs = os.cpu_count() if self.n_jobs in (None, -1) else self.n_jobs
+        tasks = [task for task, _ in tasks_members]
+        if n_jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                parts = list(pool.map(_statistics_task, [self] * len(tasks), tasks))
+        else:
+            parts = [_statistics_task(self, task) for task in tasks]
+
+        # Общий пул реплик - по задачам с одной длиной ряда
+        lengths = np.array([len(task[0]) for task in tasks])
+        for length in np.unique(lengths):
+            group = np.flatnonzero(lengths == length)
+            observed = np.concatenate([parts[g][0] for g in group])
+            null = np.concatenate([parts[g][1] for g in group])
+            chunk = np.concatenate([tasks_members[g][1] for g in group])
+            keep = todo[chunk]
+            result[chunk[keep]] = self._p_from_null(observed, null)[keep]
+        return result
+
+
+def _statistics_task(engine: SignificanceEngine, task):
+    return engine.statistics(*task)
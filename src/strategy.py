@@ -1,2 +1,291 @@
 # strategy.py
-# Торговая стратегия на основе коинтеграции
\ No newline at end of file
+# Торговая стратегия на основе коинтеграции
+import numpy as np
+import pandas as pd
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+
+def forward_fill_state(state: np.ndarray) -> np.ndarray:
+    """Протягивание последнего заданного состояния вниз по оси 0 (NaN -> 0 до первого)"""
+    shape = state.shape
+    state = state.reshape(shape[0], -1)
+    T, P = state.shape
+    idx = np.where(~np.isnan(state), np.arange(T)[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = state[idx, np.arange(P)]
+    return np.nan_to_num(filled, nan=0.0).reshape(shape)
+
+
+def performance_metrics(returns: np.ndarray, positions: np.ndarray) -> Dict[str, np.ndarray]:
+    """Метрики по столбцам матрицы дневных доходностей (T, P)"""
+    mean = returns.mean(axis=0)
+    std = returns.std(axis=0, ddof=1) if len(returns) > 1 else np.zeros(returns.shape[1])
+    equity = returns.cumsum(axis=0)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0), axis=0) - equity
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), 0.0)
+    entries = (positions != 0) & (np.vstack([np.zeros((1, positions.shape[1])), positions[:-1]]) != positions)
+    return {
+        'total_return': equity[-1] if len(equity) else np.zeros(returns.shape[1]),
+        'annual_return': mean * TRADING_DAYS,
+        'annual_volatility': std * np.sqrt(TRADING_DAYS),
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.max(axis=0) if len(drawdown) else np.zeros(returns.shape[1]),
+        'n_trades': entries.sum(axis=0),
+        'time_in_market': (positions != 0).mean(axis=0),
+    }
+
+
+class PairsBacktester:
+    """Векторный бэктест стратегии возврата спреда к среднему для многих пар
+
+    Спред пары: y - alpha - beta * x. По скользящему z-score спреда:
+    z >= entry_z - продаем спред, z <= -entry_z - покупаем,
+    |z| <= exit_z или смена знака z - закрываем позицию. Сигнал по
+    закрытию дня t исполняется со следующего дня. Доходность считается
+    на валовую позицию |y| + |beta| * x, издержки - cost_bps от объема
+    сделки. Все пары обрабатываются одновременно как столбцы матриц.
+    """
+
+    def __init__(self, entry_z: float = 2.0, exit_z: float = 0.5, lookback: int = 20,
+                 cost_bps: float = 5.0):
+        if exit_z >= entry_z:
+            raise ValueError("Порог выхода должен быть меньше порога входа")
+        self.entry_z = entry_z
+        self.exit_z = exit_z
+        self.lookback = lookback
+        self.cost_bps = cost_bps
+
+    @staticmethod
+    def pair_matrices(price_data: pd.DataFrame, pairs: List[Dict]):
+        """Матрицы цен x, y (T, P) и параметры хеджирования alpha, beta (P,)"""
+        x = price_data[[p['ticker_x'] for p in pairs]].to_numpy(dtype=np.float64)
+        y = price_data[[p['ticker_y'] for p in pairs]].to_numpy(dtype=np.float64)
+        alpha = np.array([p['alpha'] for p in pairs], dtype=np.float64)
+        beta = np.array([p['beta'] for p in pairs], dtype=np.float64)
+        return x, y, alpha, beta
+
+    def zscores(self, spread: np.ndarray) -> np.ndarray:
+        """Скользящий z-score спреда по lookback дням"""
+        frame = pd.DataFrame(spread)
+        rolling = frame.rolling(self.lookback, min_periods=self.lookback)
+        mean = rolling.mean().to_numpy()
+        std = rolling.std().to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(std > 0, (spread - mean) / std, np.nan)
+
+    def positions(self, z: np.ndarray, entry_z=None, exit_z=None) -> np.ndarray:
+        """Позиции в спреде (+1 длинная, -1 короткая, 0 нет) по z-score
+
+        Пороги могут быть массивами, транслируемыми на форму z: так
+        одним проходом считаются позиции для многих наборов порогов.
+        """
+        entry_z = self.entry_z if entry_z is None else entry_z
+        exit_z = self.exit_z if exit_z is None else exit_z
+        shape = np.broadcast_shapes(z.shape, np.shape(entry_z), np.shape(exit_z))
+        z = np.broadcast_to(z, shape)
+        previous = np.concatenate([np.full((1,) + shape[1:], np.nan), z[:-1]])
+        crossed = np.sign(z) * np.sign(previous) < 0
+
+        state = np.full(shape, np.nan)
+        state[(np.abs(z) <= exit_z) | crossed] = 0.0
+        state[z <= -entry_z] = 1.0
+        state[z >= entry_z] = -1.0
+        return forward_fill_state(state)
+
+    @staticmethod
+    def unit_returns(x: np.ndarray, y: np.ndarray, beta: np.ndarray) -> np.ndarray:
+        """Дневная доходность длинной позиции в одну единицу спреда
+
+        Не зависит от порогов и окна, поэтому считается один раз.
+        beta - вектор (P,) или матрица (T, P) для меняющегося хеджа.
+        """
+        beta = np.broadcast_to(beta, x.shape)
+        prev_beta = np.vstack([beta[:1], beta[:-1]])
+        gross = np.vstack([np.full((1, x.shape[1]), np.nan),
+                           (np.abs(y) + np.abs(prev_beta) * np.abs(x))[:-1]])
+        spread_change = np.diff(y, axis=0, prepend=np.nan) - prev_beta * np.diff(x, axis=0, prepend=np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.nan_to_num(spread_change / gross)
+
+    def returns_from_positions(self, unit: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Доходности по позициям (ось 0 - время) с учетом издержек"""
+        held = np.concatenate([np.zeros((1,) + positions.shape[1:]), positions[:-1]])
+        turnover = np.abs(np.diff(positions, axis=0, prepend=0.0))
+        return held * unit - turnover * self.cost_bps / 1e4
+
+    def pair_returns(self, x: np.ndarray, y: np.ndarray, beta: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Дневные доходности пар с учетом издержек"""
+        return self.returns_from_positions(self.unit_returns(x, y, beta), positions)
+
+    def run(self, price_data: pd.DataFrame, pairs: List[Dict], hedge: Optional[Dict] = None) -> Dict:
+        """Бэктест пар из find_cointegrated_pairs
+
+        hedge - результат DynamicHedge.fit (таблицы 'spread' и 'beta' с
+        датами price_data и парами в порядке pairs): z-score считается по
+        динамическому спреду, позиция хеджируется меняющимся beta.
+        По умолчанию - статические alpha, beta пар.
+        Возвращает доходности, позиции и z-score (столбцы - пары),
+        метрики по парам и метрики равновзвешенного портфеля.
+        """
+        if not pairs:
+            raise ValueError("Нет пар для бэктеста")
+        x, y, alpha, beta = self.pair_matrices(price_data, pairs)
+        if hedge is None:
+            spread = y - alpha - beta * x
+        else:
+            spread = np.asarray(hedge['spread'], dtype=np.float64)
+            beta = np.asarray(hedge['beta'], dtype=np.float64)
+        z = self.zscores(spread)
+        positions = self.positions(z)
+        returns = self.pair_returns(x, y, beta, positions)
+        logger.info(f"Бэктест {len(pairs)} пар за {len(price_data)} дней")
+        return self._report(price_data.index, pairs, z, positions, returns)
+
+    @staticmethod
+    def _report(index, pairs: List[Dict], z: np.ndarray, positions: np.ndarray, returns: np.ndarray) -> Dict:
+        columns = pd.MultiIndex.from_arrays([[p['ticker_x'] for p in pairs], [p['ticker_y'] for p in pairs]],
+                                            names=['ticker_x', 'ticker_y'])
+        pair_metrics = pd.DataFrame(performance_metrics(returns, positions), index=columns)
+
+        portfolio_returns = returns.mean(axis=1)
+        in_market = (positions != 0).any(axis=1).astype(float)
+        portfolio = {name: float(value[0]) for name, value in
+                     performance_metrics(portfolio_returns[:, None], in_market[:, None]).items()}
+        portfolio['n_trades'] = int(pair_metrics['n_trades'].sum())
+
+        return {
+            'returns': pd.DataFrame(returns, index=index, columns=columns),
+            'positions': pd.DataFrame(positions, index=index, columns=columns),
+            'zscore': pd.DataFrame(z, index=index, columns=columns),
+            'pair_metrics': pair_metrics.sort_values('sharpe', ascending=False),
+            'portfolio_returns': pd.Series(portfolio_returns, index=index),
+            'portfolio': portfolio,
+        }
+
+
+def _sweep_lookback(task) -> Dict:
+    """Все наборы порогов для одного окна z-score (выполняется и в пуле процессов)"""
+    spread, unit, lookback, combos, level_masks, cost_bps, combo_chunk = task
+    backtester = PairsBacktester(lookback=lookback, cost_bps=cost_bps)
+    # z-score (скользящие среднее и std) считается один раз на окно
+    z = backtester.zscores(spread)
+    T, P = z.shape
+    empty = np.array([not mask.any() for mask in level_masks])
+
+    pair_rows, portfolio_rows = [], []
+    for start in range(0, len(combos), combo_chunk):
+        chunk = combos[start:start + combo_chunk]
+        entry = np.array([c[0] for c in chunk])[None, :, None]
+        exit_ = np.array([c[1] for c in chunk])[None, :, None]
+        # Оси: время, набор порогов, пара
+        positions = backtester.positions(z[:, None, :], entry, exit_)
+        returns = backtester.returns_from_positions(unit[:, None, :], positions)
+
+        metrics = performance_metrics(returns.reshape(T, -1), positions.reshape(T, -1))
+        pair_rows.append({name: value.reshape(len(chunk), P) for name, value in metrics.items()})
+
+        # Равновзвешенные портфели для каждого уровня значимости; уровень
+        # без пар не усредняется, его метрики - NaN
+        level_returns = np.stack([returns[:, :, mask].mean(axis=2) if mask.any() else np.zeros((T, len(chunk)))
+                                  for mask in level_masks], axis=1)
+        level_market = np.stack([(positions[:, :, mask] != 0).any(axis=2) for mask in level_masks], axis=1)
+        metrics = performance_metrics(level_returns.reshape(T, -1), level_market.reshape(T, -1).astype(float))
+        for name in metrics:
+            metrics[name] = np.where(np.repeat(empty, len(chunk)), np.nan, metrics[name])
+        metrics['n_trades'] = np.stack([
+            pair_rows[-1]['n_trades'][:, mask].sum(axis=1) for mask in level_masks])
+        portfolio_rows.append({name: value.reshape(len(level_masks), len(chunk))
+                               for name, value in metrics.items()})
+
+    return {
+        'pair': {name: np.concatenate([r[name] for r in pair_rows]) for name in pair_rows[0]},
+        'portfolio': {name: np.concatenate([r[name] for r in portfolio_rows], axis=1)
+                      for name in portfolio_rows[0]},
+    }
+
+
+class ParameterSweep:
+    """Перебор порогов входа/выхода, окна z-score и уровня значимости
+
+    Спред и доходность единицы спреда считаются один раз на пару,
+    скользящие среднее и std - один раз на (пару, окно), а все наборы
+    порогов оцениваются одним транслированным проходом по осям
+    (время, набор порогов, пара). Уровни значимости не требуют нового
+    поиска пар: пары из find_cointegrated_pairs, найденные на самом
+    мягком уровне, отбираются по p_value. Окна можно считать в пуле
+    процессов (n_jobs).
+    """
+
+    def __init__(self, entry_grid=(1.5, 2.0, 2.5), exit_grid=(0.0, 0.5, 1.0), lookbacks=(20, 60),
+                 significance_levels=(0.01, 0.05), cost_bps: float = 5.0, n_jobs: int = 1,
+                 combo_chunk: int = 8):
+        self.entry_grid = entry_grid
+        self.exit_grid = exit_grid
+        self.lookbacks = lookbacks
+        self.significance_levels = significance_levels
+        self.cost_bps = cost_bps
+        self.n_jobs = n_jobs
+        self.combo_chunk = combo_chunk
+
+    def threshold_combos(self) -> List[tuple]:
+        """Допустимые пары порогов (вход, выход): выход меньше входа"""
+        return [(entry, exit_) for entry in self.entry_grid for exit_ in self.exit_grid if exit_ < entry]
+
+    def run(self, price_data: pd.DataFrame, pairs: List[Dict], by: str = 'portfolio') -> pd.DataFrame:
+        """Таблица результатов, отсортированная по Sharpe
+
+        by='portfolio' - строка на (уровень значимости, окно, вход, выход)
+        для равновзвешенного портфеля пар с p_value <= уровня;
+        by='pair' - строка на (пару, окно, вход, выход).
+        """
+        if by not in ('portfolio', 'pair'):
+            raise ValueError(f"Неизвестная группировка: {by}")
+        if not pairs:
+            raise ValueError("Нет пар для перебора параметров")
+
+        x, y, alpha, beta = PairsBacktester.pair_matrices(price_data, pairs)
+        spread = y - alpha - beta * x
+        unit = PairsBacktester.unit_returns(x, y, beta)
+        p_values = np.array([p['p_value'] for p in pairs])
+        level_masks = [p_values <= level for level in self.significance_levels]
+        combos = self.threshold_combos()
+        logger.info(f"Перебор параметров: {len(pairs)} пар, {len(self.lookbacks)} окон, "
+                    f"{len(combos)} наборов порогов, {len(self.significance_levels)} уровней значимости")
+
+        tasks = [(spread, unit, lookback, combos, level_masks, self.cost_bps, self.combo_chunk)
+                 for lookback in self.lookbacks]
+        if self.n_jobs != 1 and len(tasks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            import os
+            workers = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                results = list(pool.map(_sweep_lookback, tasks))
+        else:
+            results = [_sweep_lookback(task) for task in tasks]
+
+        frames = []
+        for lookback, result in zip(self.lookbacks, results):
+            for c, (entry, exit_) in enumerate(combos):
+                if by == 'pair':
+                    frame = pd.DataFrame({name: value[c] for name, value in result['pair'].items()})
+                    frame.insert(0, 'ticker_x', [p['ticker_x'] for p in pairs])
+                    frame.insert(1, 'ticker_y', [p['ticker_y'] for p in pairs])
+                    frame.insert(2, 'p_value', p_values)
+                else:
+                    frame = pd.DataFrame({name: value[:, c] for name, value in result['portfolio'].items()})
+                    frame.insert(0, 'significance_level', self.significance_levels)
+                    frame.insert(1, 'n_pairs', [int(m.sum()) for m in level_masks])
+                    frame = frame[frame['n_pairs'] > 0]
+                frame.insert(frame.columns.get_loc('total_return'), 'lookback', lookback)
+                frame.insert(frame.columns.get_loc('total_return'), 'entry_z', entry)
+                frame.insert(frame.columns.get_loc('total_return'), 'exit_z', exit_)
+                frames.append(frame)
+
+        table = pd.concat(frames, ignore_index=True)
+        return table.sort_values('sharpe', ascending=False, kind='stable').reset_index(drop=True)
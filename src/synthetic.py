@@ -0,0 +1,35 @@
+# synthetic.py
+# Детерминированная синтетическая панель цен с заложенными коинтегрированными парами
+import numpy as np
+import pandas as pd
+from typing import Set, Tuple
+
+
+def synthetic_prices(n_tickers: int, n_days: int, n_linked: int, seed: int = 0,
+                     late_start: float = 0.0) -> Tuple[pd.DataFrame, Set[Tuple[str, str]]]:
+    """Случайные блуждания, часть из которых коинтегрирована с другими
+
+    Последние n_linked рядов - линейные комбинации одного из
+    остальных рядов с шумом: y = a + b * x + e. late_start - доля
+    тикеров, торгующихся не с начала периода (пропуски в начале до
+    половины выборки), как у акций после IPO.
+    Возвращает цены (индекс 'Date', тикеры S0000...) и множество
+    заложенных пар (ticker_x, ticker_y).
+    """
+    rng = np.random.default_rng(seed)
+    prices = 100 + rng.normal(size=(n_days, n_tickers)).cumsum(axis=0)
+    columns = [f'S{i:04d}' for i in range(n_tickers)]
+    planted = set()
+    for k in range(n_linked):
+        source = rng.integers(0, n_tickers - n_linked)
+        target = n_tickers - n_linked + k
+        prices[:, target] = (rng.uniform(5, 50) + rng.uniform(0.5, 2) * prices[:, source]
+                             + rng.normal(scale=2.0, size=n_days))
+        planted.add((columns[source], columns[target]))
+
+    n_late = int(round(late_start * n_tickers))
+    for column in rng.choice(n_tickers, size=n_late, replace=False):
+        prices[:rng.integers(1, n_days // 2), column] = np.nan
+
+    index = pd.bdate_range('2015-01-01', periods=n_days, name='Date')
+    return pd.DataFrame(prices, index=index, columns=columns), planted
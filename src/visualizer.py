@@ -1,92 +1,179 @@
 # visualizer.py
 # Визуализация цен и спреда для пар акций
-import matplotlib.pyplot as plt
+import matplotlib.style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import pandas as pd
 import numpy as np
-import seaborn as sns
-from typing import List, Dict
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional
 import logging
 
+from src.pair_result import PairResult
+
 logger = logging.getLogger(__name__)
 
+
+def downsample(series: pd.Series, max_points: Optional[int]) -> pd.Series:
+    """Прореживание длинного ряда до max_points точек
+
+    Ряд делится на max_points / 2 корзин, из каждой берутся минимум и
+    максимум, поэтому пики спреда на графике не пропадают. None или
+    короткий ряд - без изменений.
+    """
+    if not max_points or len(series) <= max_points:
+        return series
+    n_buckets = max(max_points // 2, 1)
+    size = -(-len(series) // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:len(series)] = series.to_numpy(dtype=np.float64)
+    rows = padded.reshape(n_buckets, size)
+    base = np.arange(n_buckets) * size
+    low = base + np.argmin(np.where(np.isnan(rows), np.inf, rows), axis=1)
+    high = base + np.argmax(np.where(np.isnan(rows), -np.inf, rows), axis=1)
+    keep = np.unique(np.concatenate([low, high]))
+    return series.iloc[keep[keep < len(series)]]
+
+
 class Visualizer:
-    
-    def __init__(self):
-        plt.style.use('seaborn-v0_8')
-        self.fig_size = (12, 8)
-    
-    def plot_price_comparison(self, price_data: pd.DataFrame, pair: Dict):
+    """Графики пар: на экран (по умолчанию) или в файлы
+
+    output_dir включает пакетный режим без экрана: графики рисуются
+    через Agg без pyplot, фигуры одного вида переиспользуются между
+    вызовами, методы plot_* возвращают путь к файлу. max_points -
+    предел точек ряда на графике (None - без прореживания). pyplot
+    импортируется только для показа на экране.
+    """
+
+    def __init__(self, output_dir: Optional[str] = None, max_points: Optional[int] = 2000,
+                 dpi: int = 100, fmt: str = 'png', fig_size=(12, 8), style: str = 'seaborn-v0_8'):
+        matplotlib.style.use(style)
+        self.fig_size = tuple(fig_size)
+        self.style = style
+        self.output_dir = output_dir
+        self.max_points = max_points
+        self.dpi = dpi
+        self.fmt = fmt
+        self._figures = {}
+        self._laid_out = set()
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def _figure(self, kind: str, nrows: int, figsize):
+        """Фигура и оси: новые для экрана, переиспользуемые для файлов"""
+        if not self.output_dir:
+            import matplotlib.pyplot as plt
+            fig, axes = plt.subplots(nrows, 1, figsize=figsize)
+            return fig, np.atleast_1d(axes)
+        if kind not in self._figures:
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            self._figures[kind] = (fig, np.atleast_1d(fig.subplots(nrows, 1)))
+        fig, axes = self._figures[kind]
+        for ax in axes:
+            ax.cla()
+        return fig, axes
+
+    def _finish(self, fig, kind: str, name: str) -> Optional[str]:
+        """Сохранить в файл (пакетный режим) или показать
+
+        Размещение осей (tight_layout - заметная доля времени отрисовки)
+        у переиспользуемой фигуры рассчитывается один раз.
+        """
+        if not self.output_dir:
+            import matplotlib.pyplot as plt
+            fig.tight_layout()
+            plt.show()
+            return None
+        if kind not in self._laid_out:
+            fig.tight_layout()
+            self._laid_out.add(kind)
+        path = os.path.join(self.output_dir, f"{name.replace(os.sep, '_')}.{self.fmt}")
+        # Быстрое сжатие PNG: файлы чуть больше, запись в несколько раз быстрее
+        options = {'pil_kwargs': {'compress_level': 1}} if self.fmt == 'png' else {}
+        fig.savefig(path, dpi=self.dpi, **options)
+        return path
+
+    def plot_price_comparison(self, price_data: pd.DataFrame, pair: Dict) -> Optional[str]:
         """График сравнения цен двух акций"""
         ticker_x = pair['ticker_x']
         ticker_y = pair['ticker_y']
-        
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=self.fig_size)
-        
-        # Нормализованные цены
-        norm_x = price_data[ticker_x] / price_data[ticker_x].iloc[0]
-        norm_y = price_data[ticker_y] / price_data[ticker_y].iloc[0]
-        
+
+        fig, (ax1, ax2) = self._figure('prices', 2, self.fig_size)
+
+        # Нормализованные цены (по первому известному значению)
+        price_x = downsample(price_data[ticker_x].dropna(), self.max_points)
+        price_y = downsample(price_data[ticker_y].dropna(), self.max_points)
+        norm_x = price_x / price_x.iloc[0]
+        norm_y = price_y / price_y.iloc[0]
+
         ax1.plot(norm_x.index, norm_x, label=ticker_x, linewidth=2)
         ax1.plot(norm_y.index, norm_y, label=ticker_y, linewidth=2)
         ax1.set_title(f'Нормализованные цены: {ticker_x} vs {ticker_y}')
         ax1.set_ylabel('Нормализованная цена')
         ax1.legend()
         ax1.grid(True, alpha=0.3)
-        
+
         # Исходные цены
-        ax2.plot(price_data.index, price_data[ticker_x], label=ticker_x, alpha=0.7)
-        ax2.plot(price_data.index, price_data[ticker_y], label=ticker_y, alpha=0.7)
+        ax2.plot(price_x.index, price_x, label=ticker_x, alpha=0.7)
+        ax2.plot(price_y.index, price_y, label=ticker_y, alpha=0.7)
         ax2.set_title(f'Исходные цены: {ticker_x} vs {ticker_y}')
         ax2.set_ylabel('Цена')
         ax2.set_xlabel('Дата')
         ax2.legend()
         ax2.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.show()
-    
-    def plot_spread(self, pair: Dict):
-        """График спреда коинтегрированной пары"""
-        spread = pair['residuals']
+
+        return self._finish(fig, 'prices', f'{ticker_x}-{ticker_y}_prices')
+
+    def plot_spread(self, pair: Dict, spread: Optional[pd.Series] = None) -> Optional[str]:
+        """График спреда коинтегрированной пары
+
+        spread - другой ряд спреда (например, динамический из DynamicHedge);
+        по умолчанию - остатки статической регрессии пары.
+        """
+        if spread is None:
+            spread = pair['residuals']
+        spread = spread.dropna()
         ticker_x = pair['ticker_x']
         ticker_y = pair['ticker_y']
-        
-        fig, ax = plt.subplots(figsize=self.fig_size)
-        
-        ax.plot(spread.index, spread.values, label='Спред', linewidth=2, color='blue')
+
+        fig, (ax,) = self._figure('spread', 1, self.fig_size)
+
+        shown = downsample(spread, self.max_points)
+        ax.plot(shown.index, shown.values, label='Спред', linewidth=2, color='blue')
         ax.axhline(y=0, color='red', linestyle='--', alpha=0.7, label='Среднее')
-        
-        # Полосы стандартных отклонений
+
+        # Полосы стандартных отклонений (по полному ряду)
         std = spread.std()
         ax.axhline(y=std, color='orange', linestyle=':', alpha=0.6, label='+1 std')
         ax.axhline(y=-std, color='orange', linestyle=':', alpha=0.6, label='-1 std')
         ax.axhline(y=2*std, color='red', linestyle=':', alpha=0.4, label='+2 std')
         ax.axhline(y=-2*std, color='red', linestyle=':', alpha=0.4, label='-2 std')
-        
+
         ax.set_title(f'Спред для пары {ticker_x}-{ticker_y}\n'
                     f'p-value: {pair["p_value"]:.4f}, R²: {pair["r_squared"]:.3f}')
         ax.set_ylabel('Значение спреда')
         ax.set_xlabel('Дата')
         ax.legend()
         ax.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.show()
-    
-    def plot_top_pairs(self, cointegrated_pairs: List[Dict], top_n: int = 10):
+
+        return self._finish(fig, 'spread', f'{ticker_x}-{ticker_y}_spread')
+
+    def plot_top_pairs(self, cointegrated_pairs: List[Dict], top_n: int = 10) -> Optional[str]:
         """Визуализация топ-N коинтегрированных пар"""
         if not cointegrated_pairs:
             logger.warning("Нет коинтегрированных пар для отображения")
-            return
-        
+            return None
+
         top_pairs = cointegrated_pairs[:top_n]
-        
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
-        
+
+        fig, (ax1, ax2) = self._figure('top_pairs', 2, (14, 10))
+
         # P-values
         pairs_names = [f"{p['ticker_x']}-{p['ticker_y']}" for p in top_pairs]
         p_values = [p['p_value'] for p in top_pairs]
-        
+
         bars = ax1.bar(pairs_names, p_values, color='lightblue', alpha=0.7)
         ax1.axhline(y=0.05, color='red', linestyle='--', label='Уровень значимости 0.05')
         ax1.set_title('P-value коинтегрированных пар')
@@ -94,20 +181,69 @@ class Visualizer:
         ax1.tick_params(axis='x', rotation=45)
         ax1.legend()
         ax1.grid(True, alpha=0.3)
-        
+
         # Подсвечиваем значимые пары
         for bar, p_val in zip(bars, p_values):
             if p_val <= 0.05:
                 bar.set_color('lightcoral')
-        
+
         # R-squared
         r_squared = [p['r_squared'] for p in top_pairs]
-        
+
         ax2.bar(pairs_names, r_squared, color='lightgreen', alpha=0.7)
         ax2.set_title('R² коинтегрированных пар')
         ax2.set_ylabel('R-squared')
         ax2.tick_params(axis='x', rotation=45)
         ax2.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.show()
\ No newline at end of file
+
+        return self._finish(fig, 'top_pairs', 'top_pairs')
+
+    def render_pairs(self, price_data: pd.DataFrame, pairs: List[Dict], spreads=None, n_jobs: int = 1,
+                     top_n: int = 10) -> List[str]:
+        """Графики цен и спреда всех пар и сводка топ-N в output_dir
+
+        spreads - спреды по (ticker_x, ticker_y): словарь или таблица с
+        MultiIndex столбцов, как DynamicHedge.fit()['spread']. n_jobs > 1
+        делит пары между процессами (-1 - все ядра). Возвращает пути файлов.
+        """
+        if not self.output_dir:
+            raise ValueError("render_pairs работает только с output_dir")
+        paths = [self.plot_top_pairs(pairs, top_n=top_n)] if pairs else []
+        jobs = [(pair, None if spreads is None else spreads[(pair['ticker_x'], pair['ticker_y'])])
+                for pair in pairs]
+
+        n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+        if n_jobs <= 1 or len(jobs) < 2 * n_jobs:
+            for pair, spread in jobs:
+                paths.append(self.plot_price_comparison(price_data, pair))
+                paths.append(self.plot_spread(pair, spread))
+        else:
+            # В процессы уходят только нужные столбцы и скаляры пар; остатки
+            # PairResult пересчитываются на месте
+            settings = dict(output_dir=self.output_dir, max_points=self.max_points, dpi=self.dpi, fmt=self.fmt,
+                            fig_size=self.fig_size, style=self.style)
+            chunks = []
+            for part in np.array_split(np.arange(len(jobs)), n_jobs * 4):
+                if len(part) == 0:
+                    continue
+                chunk = [jobs[k] for k in part]
+                columns = list(dict.fromkeys(t for pair, _ in chunk for t in (pair['ticker_x'], pair['ticker_y'])))
+                payload = [({name: pair[name] for name in PairResult.FIELDS}, spread) for pair, spread in chunk]
+                chunks.append((settings, price_data[columns], payload))
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                for part_paths in pool.map(_render_chunk, chunks):
+                    paths.extend(part_paths)
+        logger.info(f"Графики {len(jobs)} пар сохранены в {self.output_dir}")
+        return paths
+
+
+def _render_chunk(chunk) -> List[str]:
+    """Графики части пар в процессе-исполнителе"""
+    settings, price_data, payload = chunk
+    viz = Visualizer(**settings)
+    paths = []
+    for fields, spread in payload:
+        pair = PairResult(price_data=price_data, **fields)
+        paths.append(viz.plot_price_comparison(price_data, pair))
+        paths.append(viz.plot_spread(pair, spread))
+    return paths
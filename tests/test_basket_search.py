@@ -0,0 +1,92 @@
+#Тесты поиска коинтегрированных корзин
+
+
+import unittest
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.vector_ar.vecm import coint_johansen
+
+from src.basket_search import BasketSearch, batch_johansen, candidate_baskets
+
+
+def make_basket_prices(n_walks=6, n_days=400, seed=0):
+    #Независимые блуждания и корзина B = 10 + 0.5 * W0 + 1.2 * W1 + шум
+    rng = np.random.default_rng(seed)
+    walks = 100 + rng.normal(size=(n_days, n_walks)).cumsum(axis=0)
+    basket = 10 + 0.5 * walks[:, 0] + 1.2 * walks[:, 1] + rng.normal(scale=0.5, size=n_days)
+    index = pd.bdate_range('2020-01-01', periods=n_days)
+    columns = [f'W{i}' for i in range(n_walks)] + ['B']
+    return pd.DataFrame(np.column_stack([walks, basket]), index=index, columns=columns)
+
+
+class TestBatchJohansen(unittest.TestCase):
+
+    def test_matches_statsmodels(self):
+        #Собственные значения, статистики и векторы совпадают с coint_johansen
+        prices = make_basket_prices().to_numpy()
+        systems = np.stack([prices[:, [0, 1, 6]], prices[:, [2, 3, 4]]])
+        for det_order in (-1, 0, 1):
+            result = batch_johansen(systems, det_order=det_order, k_ar_diff=2)
+            for b, endog in enumerate(systems):
+                expected = coint_johansen(endog, det_order, 2)
+                np.testing.assert_allclose(result['eigenvalues'][b], expected.eig, rtol=1e-8)
+                np.testing.assert_allclose(result['trace_stat'][b], expected.lr1, rtol=1e-8)
+                np.testing.assert_allclose(result['max_eig_stat'][b], expected.lr2, rtol=1e-8)
+                np.testing.assert_allclose(result['trace_crit'], expected.cvt)
+                np.testing.assert_allclose(np.abs(result['eigenvectors'][b]), np.abs(expected.evec),
+                                           rtol=1e-6)
+
+
+class TestCandidateBaskets(unittest.TestCase):
+
+    def test_grows_connected_groups(self):
+        #Тройки только из связных групп графа, без полного перебора
+        ix, iy = np.array([0, 1, 3]), np.array([1, 2, 4])
+        self.assertEqual(candidate_baskets(ix, iy, 3).tolist(), [[0, 1, 2]])
+        self.assertEqual(candidate_baskets(ix, iy, 3, min_links=2).tolist(), [])
+
+    def test_limit(self):
+        #Ограничение числа кандидатов
+        ix, iy = np.triu_indices(10, k=1)
+        self.assertEqual(len(candidate_baskets(ix, iy, 3)), 120)
+        self.assertEqual(len(candidate_baskets(ix, iy, 3, max_candidates=7)), 7)
+
+
+class TestBasketSearch(unittest.TestCase):
+
+    def test_finds_planted_basket(self):
+        #Корзина находится по графу корреляций, веса - как beta пары
+        prices = make_basket_prices()
+        baskets = BasketSearch(max_size=3).search(prices)
+        best = baskets[0]
+        self.assertEqual(set(best['tickers']), {'W0', 'W1', 'B'})
+        self.assertEqual(best['ticker_y'], 'B')
+        self.assertAlmostEqual(best['weights']['W0'], 0.5, delta=0.05)
+        self.assertAlmostEqual(best['weights']['W1'], 1.2, delta=0.05)
+        self.assertAlmostEqual(best['residuals'].mean(), 0.0, places=8)
+        self.assertLess(best['residuals'].std(), 1.0)
+
+    def test_baskets_from_pairs(self):
+        #Кандидаты из заданных пар
+        prices = make_basket_prices()
+        baskets = BasketSearch(max_size=3).search(prices, pairs=[('W0', 'B'), ('W1', 'B')])
+        self.assertEqual([b['tickers'] for b in baskets], [('W0', 'W1', 'B')])
+
+    def test_late_ticker_keeps_full_window(self):
+        #Акция с короткой историей не сокращает выборку других корзин
+        prices = make_basket_prices()
+        pairs = [('W0', 'B'), ('W1', 'B')]
+        expected = BasketSearch(max_size=3).search(prices, pairs=pairs)[0]
+        prices['W5'] = prices['W5'].where(prices.index >= prices.index[300])
+        basket = BasketSearch(max_size=3).search(prices, pairs=pairs)[0]
+        self.assertEqual(basket['tickers'], expected['tickers'])
+        self.assertAlmostEqual(basket['trace_stat'], expected['trace_stat'], places=8)
+
+    def test_unsupported_significance(self):
+        #Для уровня значимости без таблиц - ошибка
+        with self.assertRaises(ValueError):
+            BasketSearch(significance_level=0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#Тесты пакетного движка Энгла-Грэнджера
+
+
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import adfuller
+
+from src.batch_engine import BatchEngleGranger, batch_adfuller, windowed_test_pairs
+from src.cointegration_tester import CointegrationTester
+
+
+def make_prices(n_tickers=8, n_days=300, seed=0):
+    #Случайные блуждания и несколько коинтегрированных с ними рядов
+    rng = np.random.default_rng(seed)
+    walks = 100 + rng.normal(size=(n_days, n_tickers // 2)).cumsum(axis=0)
+    linked = 20 + 0.8 * walks + rng.normal(scale=1.0, size=walks.shape)
+    data = np.hstack([walks, linked])
+    index = pd.bdate_range('2020-01-01', periods=n_days)
+    return pd.DataFrame(data, index=index, columns=[f'T{i}' for i in range(n_tickers)])
+
+
+class TestBatchAdfuller(unittest.TestCase):
+
+    def test_matches_statsmodels(self):
+        #Статистика, p-value и лаг совпадают с adfuller
+        rng = np.random.default_rng(1)
+        series = np.vstack([
+            rng.normal(size=250).cumsum(),
+            rng.normal(size=250),
+            np.convolve(rng.normal(size=260), [1, 0.6, 0.3], 'valid')[:250],
+        ])
+        result = batch_adfuller(series)
+        for i, row in enumerate(series):
+            expected = adfuller(row)
+            self.assertAlmostEqual(result['adf_statistic'][i], expected[0], places=8)
+            self.assertAlmostEqual(result['p_value'][i], expected[1], places=8)
+            self.assertEqual(result['usedlag'][i], expected[2])
+
+    def test_constant_series(self):
+        #Постоянный ряд не считается стационарным
+        result = batch_adfuller(np.ones((1, 100)))
+        self.assertEqual(result['p_value'][0], 1.0)
+
+
+class TestBatchParity(unittest.TestCase):
+
+    def test_same_pairs_as_loop(self):
+        #Пакетный движок возвращает те же пары, что и попарный
+        prices = make_prices()
+        loop = CointegrationTester(engine='loop').find_cointegrated_pairs(prices)
+        batch = CointegrationTester(engine='batch').find_cointegrated_pairs(prices)
+
+        self.assertGreater(len(loop), 0)
+        self.assertEqual([(p['ticker_x'], p['ticker_y']) for p in loop],
+                         [(p['ticker_x'], p['ticker_y']) for p in batch])
+        for a, b in zip(loop, batch):
+            for key in ('p_value', 'alpha', 'beta', 'r_squared'):
+                self.assertAlmostEqual(a[key], b[key], places=6)
+            np.testing.assert_allclose(a['residuals'].values, b['residuals'].values, atol=1e-8)
+            self.assertTrue(a['residuals'].index.equals(b['residuals'].index))
+
+    def test_missing_values_fall_back_to_loop(self):
+        #Столбцы с пропусками обрабатываются попарным путем
+        prices = make_prices()
+        prices.iloc[:20, 4] = np.nan
+        loop = CointegrationTester(engine='loop').find_cointegrated_pairs(prices)
+        batch = CointegrationTester(engine='batch').find_cointegrated_pairs(prices)
+        self.assertEqual(sorted((p['ticker_x'], p['ticker_y']) for p in loop),
+                         sorted((p['ticker_x'], p['ticker_y']) for p in batch))
+
+    def test_parallel_matches_serial(self):
+        #Пул процессов дает тот же результат и порядок, что и один процесс
+        values = make_prices(n_tickers=16).to_numpy()
+        ix, iy = np.triu_indices(values.shape[1], k=1)
+        serial = BatchEngleGranger(values, chunk_size=8).test_pairs(ix, iy)
+        [parallel] = windowed_test_pairs(values, [(0, len(values), np.arange(16), ix, iy)], n_jobs=2, chunk_size=8)
+        for key in serial:
+            np.testing.assert_array_equal(serial[key], parallel[key])
+
+    def test_windows_share_one_pool(self):
+        #Окна разной длины в одном пуле процессов дают то же, что и по одному
+        values = make_prices(n_tickers=16).to_numpy()
+        ix, iy = np.triu_indices(16, k=1)
+        columns = np.arange(2, 16)
+        windows = [(0, 300, np.arange(16), ix, iy), (40, 300, columns, np.array([0, 1]), np.array([5, 6])),
+                   (0, 250, columns[::2], *np.triu_indices(7, k=1))]
+        serial = windowed_test_pairs(values, windows, n_jobs=1, chunk_size=8)
+        with mock.patch('src.batch_engine.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            parallel = windowed_test_pairs(values, windows, n_jobs=2, chunk_size=8)
+        self.assertEqual(pool.call_count, 1)
+        for (start, stop, cols, wx, wy), a, b in zip(windows, serial, parallel):
+            expected = BatchEngleGranger(values[start:stop, cols]).test_pairs(wx, wy)
+            for key in a:
+                np.testing.assert_array_equal(a[key], b[key])
+                np.testing.assert_array_equal(a[key], expected[key])
+
+
+class TestIntegrationPrescreen(unittest.TestCase):
+
+    def test_prescreen_drops_i2_ticker(self):
+        #I(2) ряд не проходит проверку и не попадает в пары
+        prices = make_prices()
+        rng = np.random.default_rng(2)
+        prices['I2'] = 100 + rng.normal(size=len(prices)).cumsum().cumsum()
+        for engine in ('loop', 'batch'):
+            tester = CointegrationTester(engine=engine)
+            is_i1 = tester.prescreen_integration_order(prices)
+            self.assertFalse(is_i1['I2'])
+            self.assertTrue(is_i1['T0'])
+            pairs = tester.find_cointegrated_pairs(prices)
+            self.assertNotIn('I2', {p['ticker_x'] for p in pairs} | {p['ticker_y'] for p in pairs})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#Тесты командной строки main.py и ленивых импортов
+
+
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+import main
+from config import SWEEP_CONFIG
+from src.synthetic import synthetic_prices
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code, cwd):
+    #Код в новом интерпретаторе с корнем проекта в sys.path
+    script = f"import sys; sys.path.insert(0, {ROOT!r}); {code}"
+    return subprocess.run([sys.executable, '-c', script], cwd=cwd, capture_output=True, text=True, check=True)
+
+
+class TestParseArgs(unittest.TestCase):
+
+    def test_default_command_is_full_run(self):
+        #Без подкоманды работают прежние аргументы полного анализа
+        args = main.parse_args(['--n-jobs', '4', '--dynamic-hedge'])
+        self.assertEqual(args.command, 'run')
+        self.assertEqual(args.n_jobs, 4)
+        self.assertTrue(args.dynamic_hedge)
+
+    def test_subcommands(self):
+        args = main.parse_args(['scan', '--tickers', 'A', 'B', '--no-cache'])
+        self.assertEqual((args.command, args.tickers, args.no_cache), ('scan', ['A', 'B'], True))
+        args = main.parse_args(['report', '--top-n', '5'])
+        self.assertEqual((args.command, args.top_n, args.results), ('report', 5, 'results'))
+        args = main.parse_args(['scan', '--prefilter-top-k', '5'])
+        self.assertEqual((args.command, args.prefilter_top_k), ('scan', 5))
+        args = main.parse_args(['sweep', '--by', 'pair', '--output', 'out.csv'])
+        self.assertEqual((args.command, args.by, args.output, args.results), ('sweep', 'pair', 'out.csv', 'results'))
+        args = main.parse_args(['download', '--csv', ''])
+        self.assertEqual((args.command, args.tickers, args.csv), ('download', None, ''))
+        args = main.parse_args(['query', '--ticker', 'XOM', '--beta', '0.5', '2', '--last-runs', '30'])
+        self.assertEqual((args.command, args.ticker, args.beta, args.last_runs), ('query', 'XOM', [0.5, 2.0], 30))
+        with self.assertRaises(SystemExit):
+            main.parse_args(['scan', '--dynamic-hedge'])
+
+    def test_flags_before_subcommand_are_not_dropped(self):
+        #Флаг перед подкомандой - ошибка, а не молчаливое значение по умолчанию
+        for argv in (['--n-jobs', '4', 'run'], ['--fdr', '0.1', 'scan']):
+            with self.assertRaises(SystemExit):
+                main.parse_args(argv)
+        args = main.parse_args(['run', '--n-jobs', '4'])
+        self.assertEqual((args.command, args.n_jobs), ('run', 4))
+        args = main.parse_args([])
+        self.assertEqual((args.command, args.n_jobs), ('run', 1))
+
+    def test_fdr_with_stream_dir_is_rejected(self):
+        #Поправка FDR в потоковом режиме не применяется - сочетание запрещено
+        with self.assertRaises(SystemExit):
+            main.parse_args(['scan', '--stream-dir', 'out', '--fdr', '0.05'])
+        with self.assertRaises(ValueError):
+            main.main(stream_dir='out', fdr_level=0.05)
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_import_main_is_light(self):
+        #Импорт main и разбор аргументов не подтягивают тяжелые пакеты
+        out = run_python("import main; main.parse_args(['scan']); "
+                         "print(sorted(m for m in ('pandas', 'statsmodels', 'matplotlib', 'seaborn') "
+                         "if m in sys.modules))", ROOT)
+        self.assertEqual(out.stdout.strip(), '[]')
+
+    def test_scan_report_sweep(self):
+        #scan не импортирует matplotlib и statsmodels, report и sweep работают на сохраненных парах
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'data'))
+            prices, _ = synthetic_prices(10, 300, 3, seed=4)
+            prices.to_csv(os.path.join(tmp, 'data', 'stocks_prices.csv'))
+
+            out = run_python("import main; main.cli(['scan', '--no-cache', '--prefilter-top-k', '3']); "
+                             "print('matplotlib' in sys.modules, 'statsmodels' in sys.modules)", tmp)
+            self.assertEqual(out.stdout.strip(), 'False False')
+            self.assertEqual(len(glob.glob(os.path.join(tmp, 'results', 'cointegrated_pairs_*.csv'))), 1)
+            [run_report] = glob.glob(os.path.join(tmp, 'results', 'run_report_*.json'))
+            with open(run_report, encoding='utf-8') as f:
+                counts = json.load(f)['stage_counts']
+            # Предфильтр оставляет не больше 3 соседей на каждый из 10 тикеров
+            self.assertLessEqual(counts['prefilter'], 10 * 3)
+            self.assertLess(counts['prefilter'], counts['i1'])
+
+            run_python("import main; main.cli(['report', '--plots-dir', 'plots', '--top-n', '2'])", tmp)
+            self.assertEqual(len(os.listdir(os.path.join(tmp, 'plots'))), 2 * 2 + 1)
+
+            # sweep пишет таблицу перебора по сеткам SWEEP_CONFIG
+            run_python("import main; main.cli(['sweep', '--output', 'sweep.csv'])", tmp)
+            table = pd.read_csv(os.path.join(tmp, 'sweep.csv'))
+            self.assertGreater(len(table), 0)
+            self.assertTrue(set(table['lookback']) <= set(SWEEP_CONFIG['lookbacks']))
+            self.assertTrue(table['sharpe'].is_monotonic_decreasing)
+
+
+if __name__ == '__main__':
+    unittest.main()
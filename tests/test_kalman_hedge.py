@@ -0,0 +1,106 @@
+#Тесты динамического коэффициента хеджирования
+
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from src.kalman_hedge import DynamicHedge, KalmanHedge
+from src.strategy import PairsBacktester
+
+
+def make_drifting_pairs(n_days=600, seed=0):
+    #Пары с beta, плавно меняющимся от 0.5 до 1.5
+    rng = np.random.default_rng(seed)
+    x = 50 + rng.normal(size=(n_days, 3)).cumsum(axis=0)
+    beta = np.linspace(0.5, 1.5, n_days)[:, None]
+    y = 5 + beta * x + rng.normal(scale=0.5, size=x.shape)
+    index = pd.bdate_range('2020-01-01', periods=n_days)
+    prices = pd.DataFrame(np.hstack([x, y]), index=index, columns=['X0', 'X1', 'X2', 'Y0', 'Y1', 'Y2'])
+    pairs = [{'ticker_x': f'X{i}', 'ticker_y': f'Y{i}', 'alpha': 0.0, 'beta': 1.0} for i in range(3)]
+    return prices, pairs, beta[:, 0]
+
+
+def reference_filter(x, y, theta, cov, obs_var, delta):
+    #Фильтр Калмана для одной пары в матричной записи
+    W = delta / (1 - delta) * np.eye(2)
+    out = []
+    for xt, yt in zip(x, y):
+        R = cov + W
+        F = np.array([1.0, xt])
+        e = yt - F @ theta
+        Q = F @ R @ F + obs_var
+        K = R @ F / Q
+        theta = theta + K * e
+        cov = R - np.outer(K, F @ R)
+        out.append((theta[0], theta[1], e, Q))
+    return np.array(out)
+
+
+class TestKalmanHedge(unittest.TestCase):
+
+    def test_matches_reference(self):
+        #Векторный фильтр совпадает с попарным матричным
+        prices, _, _ = make_drifting_pairs(n_days=200)
+        x, y = prices.iloc[:, :3].to_numpy(), prices.iloc[:, 3:].to_numpy()
+        kalman = KalmanHedge.from_warmup(x[:50], y[:50], delta=1e-3)
+        theta, cov, obs_var = kalman.theta.copy(), kalman.cov.copy(), kalman.obs_var.copy()
+        result = kalman.filter(x[50:], y[50:])
+        for p in range(3):
+            expected = reference_filter(x[50:, p], y[50:, p], theta[p], cov[p], obs_var[p], 1e-3)
+            for k, name in enumerate(('alpha', 'beta', 'spread', 'spread_var')):
+                np.testing.assert_allclose(result[name][:, p], expected[:, k], rtol=1e-9, atol=1e-12)
+
+    def test_missing_price_keeps_state(self):
+        #Пропуск цены не меняет оценки, только увеличивает неопределенность
+        kalman = KalmanHedge(np.array([[0.0, 1.0]]), np.eye(2) * 0.1, 1.0)
+        result = kalman.step(np.array([np.nan]), np.array([10.0]))
+        self.assertEqual(result['beta'][0], 1.0)
+        self.assertTrue(np.isnan(result['spread'][0]))
+        np.testing.assert_allclose(kalman.cov[0], np.eye(2) * (0.1 + 1e-4 / (1 - 1e-4)))
+
+
+class TestDynamicHedge(unittest.TestCase):
+
+    def test_tracks_drifting_beta(self):
+        #Динамический хедж следует за меняющимся beta, спред остается узким
+        prices, pairs, beta = make_drifting_pairs()
+        result = DynamicHedge(delta=1e-4, warmup=60).fit(prices, pairs)
+        self.assertTrue(result['beta'].iloc[:60].isna().all().all())
+        x = prices[['X0', 'X1', 'X2']].to_numpy()
+        fitted = result['alpha'].to_numpy() + result['beta'].to_numpy() * x
+        truth = 5 + beta[:, None] * x
+        self.assertLess(np.abs(fitted - truth)[-100:].mean(), 0.5)
+        # Ошибки прогноза близки к шуму наблюдения (0.5), статический спред много шире
+        static_beta, static_alpha = np.polyfit(x[:, 0], prices['Y0'], 1)
+        static = prices['Y0'] - static_alpha - static_beta * x[:, 0]
+        self.assertLess(result['spread'].iloc[60:].std().max(), 1.0)
+        self.assertGreater(static.std(), 3.0)
+
+    def test_incremental_update(self):
+        #Новые бары дообрабатываются без пересчета истории
+        prices, pairs, _ = make_drifting_pairs(n_days=300)
+        full = DynamicHedge(warmup=60).fit(prices, pairs)
+        hedge = DynamicHedge(warmup=60)
+        hedge.fit(prices.iloc[:200], pairs)
+        tail = hedge.update(prices)
+        self.assertEqual(len(tail['beta']), 100)
+        for name in ('alpha', 'beta', 'spread'):
+            np.testing.assert_allclose(tail[name].to_numpy(), full[name].iloc[200:].to_numpy(), rtol=1e-12)
+        self.assertEqual(len(hedge.update(prices)['beta']), 0)
+
+    def test_backtest_with_dynamic_hedge(self):
+        #Бэктест принимает динамический спред и beta
+        prices, pairs, _ = make_drifting_pairs()
+        hedge = DynamicHedge(delta=1e-3).fit(prices, pairs)
+        backtester = PairsBacktester()
+        static = backtester.run(prices, pairs)
+        dynamic = backtester.run(prices, pairs, hedge=hedge)
+        self.assertEqual(dynamic['positions'].shape, static['positions'].shape)
+        self.assertTrue((dynamic['positions'].iloc[:60] == 0).all().all())
+        self.assertFalse(np.allclose(dynamic['zscore'].fillna(0), static['zscore'].fillna(0)))
+        self.assertTrue(np.isfinite(dynamic['returns'].to_numpy()).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#Тесты онлайн-мониторинга спредов
+
+
+import asyncio
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from main import save_results
+from src.cointegration_tester import CointegrationTester
+from src.live_monitor import QueueSource, ReplaySource, ZScoreMonitor, load_pairs
+from src.strategy import PairsBacktester
+from tests.test_batch_engine import make_prices
+
+
+class TestZScoreMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.prices = make_prices()
+        self.pairs = CointegrationTester().find_cointegrated_pairs(self.prices)
+        self.table = pd.DataFrame([p.to_dict() for p in self.pairs])
+
+    def test_matches_backtester(self):
+        #Потоковые z-score и позиции совпадают с векторным бэктестом
+        monitor = ZScoreMonitor(self.table, window=20)
+        zscores, states = [], []
+        for timestamp, row in self.prices.iterrows():
+            monitor.update(timestamp, row.to_dict())
+            zscores.append(monitor.zscore.copy())
+            states.append(monitor.state.copy())
+        expected = PairsBacktester(lookback=20).run(self.prices, self.pairs)
+        np.testing.assert_allclose(np.array(zscores), expected['zscore'].to_numpy(), atol=1e-9)
+        np.testing.assert_array_equal(np.array(states), expected['positions'].to_numpy())
+
+    def test_single_ticks_touch_only_their_pairs(self):
+        #Тик одного тикера обновляет только пары с ним
+        monitor = ZScoreMonitor(self.table, window=5)
+        monitor.update(0, self.prices.iloc[0].to_dict())
+        before = monitor.spread.copy()
+        ticker = self.table['ticker_x'].iloc[0]
+        monitor.update(1, {ticker: self.prices[ticker].iloc[1]})
+        touched = (self.table['ticker_x'] == ticker) | (self.table['ticker_y'] == ticker)
+        np.testing.assert_array_equal(monitor.spread[~touched.to_numpy()], before[~touched.to_numpy()])
+        self.assertTrue(np.all(monitor.spread[touched.to_numpy()] != before[touched.to_numpy()]))
+
+    def test_replay_emits_signals(self):
+        #Воспроизведение из CSV тиков: сигналы входа и выхода
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ticks.csv')
+            ticks = self.prices.stack().rename('price').rename_axis(['timestamp', 'ticker']).reset_index()
+            ticks.to_csv(path, index=False)
+            signals = []
+            monitor = ZScoreMonitor(self.table, window=20)
+            asyncio.run(monitor.run(ReplaySource.from_csv(path), on_signal=signals.append))
+        self.assertEqual(monitor.ticks, len(self.prices))
+        kinds = {s['signal'] for s in signals}
+        self.assertTrue({'enter_long', 'enter_short', 'exit'} <= kinds)
+
+    def test_queue_source(self):
+        #Живая лента через asyncio.Queue
+        async def feed(monitor):
+            queue = asyncio.Queue()
+            for timestamp, row in self.prices.iloc[:30].iterrows():
+                queue.put_nowait((timestamp, row.to_dict()))
+            queue.put_nowait(None)
+            await monitor.run(QueueSource(queue), on_signal=lambda s: None)
+
+        monitor = ZScoreMonitor(self.table, window=20)
+        asyncio.run(feed(monitor))
+        self.assertEqual(monitor.ticks, 30)
+        self.assertFalse(np.isnan(monitor.zscore).all())
+
+
+class TestLoadPairs(unittest.TestCase):
+
+    def test_reads_save_results_output(self):
+        #Пары читаются из последнего файла save_results
+        prices = make_prices()
+        pairs = CointegrationTester().find_cointegrated_pairs(prices)
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                save_results(pairs, prices)
+                table = load_pairs('results')
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(list(zip(table['ticker_x'], table['ticker_y'])),
+                         [(p['ticker_x'], p['ticker_y']) for p in pairs])
+        np.testing.assert_allclose(table['beta'], [p['beta'] for p in pairs])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#Сверка собственных ADF и Энгла-Грэнджера со statsmodels
+
+
+import unittest
+import warnings
+import numpy as np
+from statsmodels.tsa.adfvalues import mackinnoncrit, mackinnonp
+from statsmodels.tsa.stattools import adfuller, coint
+
+from src.batch_engine import batch_adfuller, engle_granger_adf, hedge_regressions
+from src.mackinnon import mackinnon_crit, mackinnon_p
+from tests.test_batch_engine import make_prices
+
+
+def sample_series(n=250, seed=1):
+    #Блуждание, белый шум, MA-процесс и AR(1) с сильной инерцией
+    rng = np.random.default_rng(seed)
+    ar = np.zeros(n)
+    for t in range(1, n):
+        ar[t] = 0.95 * ar[t - 1] + rng.normal()
+    return np.vstack([
+        rng.normal(size=n).cumsum(),
+        rng.normal(size=n),
+        np.convolve(rng.normal(size=n + 2), [1, 0.6, 0.3], 'valid'),
+        ar,
+    ])
+
+
+class TestMacKinnonTables(unittest.TestCase):
+
+    def test_p_values(self):
+        #p-value по всей оси статистики, включая хвосты и точку склейки
+        stats = np.concatenate([np.linspace(-30, 4, 341), [-2.62, -1.61, -np.inf]])
+        for regression in ('n', 'c'):
+            for N in range(1, 7):
+                expected = [mackinnonp(s, regression=regression, N=N) for s in stats]
+                np.testing.assert_allclose(mackinnon_p(stats, regression, N), expected,
+                                           rtol=1e-12, atol=1e-300)
+
+    def test_non_finite_stats(self):
+        #Бесконечные статистики дают границы 0 и 1 без предупреждений numpy, NaN остается NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            p = mackinnon_p(np.array([-np.inf, np.inf, np.nan]), 'c', 2)
+        np.testing.assert_array_equal(p, [0.0, 1.0, np.nan])
+
+    def test_critical_values(self):
+        #Критические значения для конечных выборок и асимптотические
+        for regression, max_n in (('n', 1), ('c', 3)):
+            for N in range(1, max_n + 1):
+                for nobs in (25, 100, 249, 1000):
+                    np.testing.assert_allclose(mackinnon_crit(N, regression, nobs),
+                                               mackinnoncrit(N, regression, nobs), rtol=1e-12)
+                np.testing.assert_allclose(mackinnon_crit(N, regression),
+                                           mackinnoncrit(N, regression), rtol=1e-12)
+
+    def test_unknown_table(self):
+        #Нет таблиц - ошибка, а не экстраполяция
+        with self.assertRaises(ValueError):
+            mackinnon_p(-3.0, 'ct')
+        with self.assertRaises(ValueError):
+            mackinnon_crit(2, 'n')
+
+
+class TestAdfAgreement(unittest.TestCase):
+
+    def check(self, result, series, **kwargs):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            for i, row in enumerate(series):
+                stat, p, lag, nobs, crit = adfuller(row, **kwargs)[:5]
+                self.assertAlmostEqual(result['adf_statistic'][i], stat, places=8)
+                self.assertAlmostEqual(result['p_value'][i], p, places=8)
+                self.assertEqual(result['usedlag'][i], lag)
+                np.testing.assert_allclose(result['critical_values'][i],
+                                           [crit['1%'], crit['5%'], crit['10%']], rtol=1e-12)
+
+    def test_autolag_without_constant(self):
+        #Выбор лага по AIC в регрессии без константы
+        series = sample_series()
+        self.check(batch_adfuller(series, regression='n'), series, regression='n')
+
+    def test_fixed_lag(self):
+        #Фиксированный лаг без перебора
+        series = sample_series(seed=2)
+        for regression in ('c', 'n'):
+            for lag in (0, 3):
+                result = batch_adfuller(series, maxlag=lag, regression=regression, autolag=None)
+                self.check(result, series, maxlag=lag, regression=regression, autolag=None)
+
+    def test_short_series(self):
+        #Короткие ряды: максимальный лаг ограничен длиной
+        series = sample_series(n=30, seed=3)
+        for regression in ('c', 'n'):
+            self.check(batch_adfuller(series, regression=regression), series, regression=regression)
+
+
+class TestEngleGrangerAgreement(unittest.TestCase):
+
+    def test_matches_coint(self):
+        #Статистика, p-value (N=2) и критические значения совпадают с coint
+        values = make_prices(n_tickers=8).to_numpy()
+        ix, iy = np.triu_indices(values.shape[1], k=1)
+        fit = hedge_regressions(values, ix, iy)
+        resid = values[:, iy] - fit['alpha'] - fit['beta'] * values[:, ix]
+        result = engle_granger_adf(resid.T, fit['r_squared'])
+        for k in range(len(ix)):
+            stat, p, crit = coint(values[:, iy[k]], values[:, ix[k]])
+            self.assertAlmostEqual(result['adf_statistic'][k], stat, places=7)
+            self.assertAlmostEqual(result['p_value'][k], p, places=8)
+            np.testing.assert_allclose(result['critical_values'][k], crit, rtol=1e-12)
+
+    def test_stricter_than_plain_adf(self):
+        #Таблицы Энгла-Грэнджера дают p-value не меньше обычного ADF
+        series = sample_series()
+        eg = engle_granger_adf(series)['p_value']
+        plain = batch_adfuller(series, regression='n')['p_value']
+        self.assertTrue(np.all(eg >= plain))
+
+    def test_collinear_pair(self):
+        #Почти совпадающие ряды: статистика -inf и p = 0, как в coint
+        resid = np.random.default_rng(0).normal(size=(1, 200))
+        result = engle_granger_adf(resid, np.array([1.0]))
+        self.assertEqual(result['adf_statistic'][0], -np.inf)
+        self.assertEqual(result['p_value'][0], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#Тесты таймеров, счетчиков и отчета о запуске
+
+
+import json
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+
+from src.cointegration_tester import CointegrationTester
+from src.metrics import RunMetrics, StackSampler, profiled
+from src.synthetic import synthetic_prices
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def test_timers_and_counters_accumulate(self):
+        #Повторные входы в этап суммируются
+        metrics = RunMetrics()
+        for _ in range(3):
+            with metrics.timer('stage'):
+                time.sleep(0.002)
+        metrics.count('items', 2)
+        metrics.count('items')
+        self.assertEqual(metrics.calls['stage'], 3)
+        self.assertGreaterEqual(metrics.timings['stage'], 0.006)
+        self.assertEqual(metrics.counters['items'], 3)
+
+    def test_timer_records_on_error(self):
+        #Время этапа учитывается и при исключении
+        metrics = RunMetrics()
+        with self.assertRaises(ValueError):
+            with metrics.timer('failing'):
+                raise ValueError()
+        self.assertEqual(metrics.calls['failing'], 1)
+
+    def test_write_report(self):
+        #Отчет - JSON с этапами, счетчиками и дополнительными полями
+        metrics = RunMetrics()
+        with metrics.timer('load'):
+            pass
+        metrics.count('pairs', 5)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = metrics.write(os.path.join(tmp, 'sub', 'report.json'), status='ok')
+            with open(path, encoding='utf-8') as f:
+                report = json.load(f)
+        self.assertEqual(report['status'], 'ok')
+        self.assertEqual(report['counters'], {'pairs': 5})
+        self.assertEqual(report['stages']['load']['calls'], 1)
+        self.assertGreater(report['wall_time'], 0)
+
+    def test_stack_sampler(self):
+        #Выборочный профилировщик видит функцию, в которой идет работа
+        def busy():
+            end = time.perf_counter() + 0.1
+            while time.perf_counter() < end:
+                pass
+
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        busy()
+        sampler.stop()
+        self.assertGreater(sampler.total, 0)
+        self.assertTrue(any(row['function'].endswith(':busy') for row in sampler.top(50)))
+
+    def test_profiled_cprofile(self):
+        #cProfile сохраняет статистику рядом с отчетом
+        with tempfile.TemporaryDirectory() as tmp:
+            with profiled('cprofile', os.path.join(tmp, 'profile')) as summary:
+                sum(range(1000))
+            self.assertTrue(os.path.exists(summary['path']))
+        with self.assertRaises(ValueError):
+            with profiled('unknown', 'profile'):
+                pass
+
+
+class TestTesterMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.prices, _ = synthetic_prices(8, 300, 2, seed=1)
+
+    def test_batch_counters(self):
+        #Пакетный движок: все пары проходят через OLS и ADF
+        tester = CointegrationTester()
+        tester.find_cointegrated_pairs(self.prices)
+        counters = tester.metrics.counters
+        tested = tester.stage_counts['prefilter']
+        self.assertEqual(counters['pairs_batch'], tested)
+        self.assertEqual(counters['ols_fits'], tested)
+        self.assertEqual(counters['adf_tests'], tested + counters['tickers'])
+        self.assertEqual(counters['tickers'], 8)
+        not_i1 = [t for t, ok in CointegrationTester().prescreen_integration_order(self.prices).items() if not ok]
+        self.assertEqual(counters['tickers_not_i1'], len(not_i1))
+        for stage in ('integration_test', 'batch_test', 'ols', 'adf'):
+            self.assertIn(stage, tester.metrics.timings)
+
+    def test_loop_counts_short_pairs(self):
+        #Пары с недостатком общих данных считаются отдельно
+        prices = self.prices.iloc[:, :4].copy()
+        prices.iloc[:260, 3] = np.nan
+        tester = CointegrationTester(engine='loop', min_data_points=50)
+        tester.find_cointegrated_pairs(prices)
+        counters = tester.metrics.counters
+        self.assertEqual(counters['pairs_too_short'], 3)
+        self.assertEqual(counters['ols_fits'], counters['pairs_loop'] - 3)
+
+    def test_shared_metrics(self):
+        #Переданный объект RunMetrics накапливает данные нескольких запусков
+        metrics = RunMetrics()
+        for _ in range(2):
+            CointegrationTester(metrics=metrics).find_cointegrated_pairs(self.prices)
+        self.assertEqual(metrics.calls['integration_test'], 2)
+        self.assertEqual(metrics.counters['tickers'], 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
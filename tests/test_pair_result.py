@@ -0,0 +1,60 @@
+#Тесты компактной записи результата пары
+
+
+import unittest
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+
+from src.cointegration_tester import CointegrationTester
+from src.pair_result import PairResult
+from tests.test_batch_engine import make_prices
+
+
+class TestPairResult(unittest.TestCase):
+
+    def setUp(self):
+        self.prices = make_prices()
+        self.pairs = CointegrationTester().find_cointegrated_pairs(self.prices)
+
+    def test_no_residuals_stored(self):
+        #Запись хранит только скаляры и ссылку на общую панель
+        pair = self.pairs[0]
+        self.assertIsInstance(pair, PairResult)
+        self.assertFalse(hasattr(pair, '__dict__'))
+        self.assertIs(pair.price_data, self.pairs[-1].price_data)
+
+    def test_dict_access_and_lazy_residuals(self):
+        #Доступ как к словарю, остатки считаются по alpha и beta
+        pair = self.pairs[0]
+        x, y = self.prices[pair['ticker_x']], self.prices[pair['ticker_y']]
+        np.testing.assert_allclose(pair['residuals'].to_numpy(),
+                                   (y - pair['alpha'] - pair['beta'] * x).to_numpy())
+        self.assertTrue(pair['residuals'].index.equals(self.prices.index))
+        self.assertEqual(pair.get('missing', 1), 1)
+        self.assertEqual(set(pair.to_dict()), set(PairResult.FIELDS))
+
+    def test_visualizer_and_save_results(self):
+        #plot_spread и save_results работают через ленивые остатки
+        import os
+        import tempfile
+        import matplotlib.pyplot as plt
+        from src.visualizer import Visualizer
+        import main
+
+        Visualizer().plot_spread(self.pairs[0])
+        plt.close('all')
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                main.save_results(self.pairs, self.prices)
+                # CSV, best_pair и хранилище запусков
+                self.assertEqual(len(os.listdir('results')), 3)
+                self.assertIn('pairs.sqlite', os.listdir('results'))
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+#Тесты предварительного отбора пар
+
+
+import unittest
+import numpy as np
+
+from src.prefilter import PairPrefilter, correlation_matrix, distance_matrix
+from src.cointegration_tester import CointegrationTester
+from tests.test_batch_engine import make_prices
+
+
+class TestPrefilterMatrices(unittest.TestCase):
+
+    def test_correlation_matches_pandas(self):
+        #Корреляции по общим наблюдениям совпадают с DataFrame.corr
+        prices = make_prices()
+        prices.iloc[:30, 2] = np.nan
+        np.testing.assert_allclose(correlation_matrix(prices.to_numpy()),
+                                   prices.corr().to_numpy(), atol=1e-8)
+
+    def test_distance_is_symmetric(self):
+        #Расстояние симметрично и равно нулю на диагонали
+        dist = distance_matrix(make_prices().to_numpy())
+        np.testing.assert_allclose(dist, dist.T, atol=1e-10)
+        np.testing.assert_allclose(np.diag(dist), 0, atol=1e-10)
+
+
+class TestPairPrefilter(unittest.TestCase):
+
+    def test_top_k_keeps_best_neighbours(self):
+        #Для каждого тикера остаются k лучших соседей
+        prices = make_prices()
+        ix, iy = PairPrefilter(top_k=1).select(prices)
+        pairs = set(zip(ix.tolist(), iy.tolist()))
+        # T0..T3 связаны с T4..T7
+        for i in range(4):
+            self.assertIn((i, i + 4), pairs)
+        self.assertLess(len(pairs), 8 * 7 // 2)
+
+    def test_threshold(self):
+        #Порог по расстоянию пропускает только близкие пары
+        prices = make_prices()
+        ix, iy = PairPrefilter(method='distance', threshold=0.0).select(prices)
+        self.assertEqual(len(ix), 0)
+
+    def test_stage_counts(self):
+        #Тестер учитывает, сколько пар отсеял каждый этап
+        prices = make_prices()
+        tester = CointegrationTester(prefilter=PairPrefilter(top_k=1))
+        pairs = tester.find_cointegrated_pairs(prices)
+        counts = tester.stage_counts
+        self.assertEqual(counts['all'], 28)
+        self.assertLess(counts['prefilter'], counts['i1'])
+        self.assertEqual(counts['cointegrated'], len(pairs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#Тесты панели цен с неполной историей тикеров
+
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from src.cointegration_tester import CointegrationTester
+from src.data_fetcher import DataFetcher
+from src.kalman_hedge import DynamicHedge
+from src.price_panel import PricePanel
+from src.synthetic import synthetic_prices
+
+
+def make_ragged_prices(n_days=300, seed=0):
+    #A и B - полная история, C начинает торговаться позже, D делистингована, E - с пропуском
+    rng = np.random.default_rng(seed)
+    walks = 100 + rng.normal(size=(n_days, 2)).cumsum(axis=0)
+    late = 5 + 1.5 * walks[:, 0] + rng.normal(scale=1.0, size=n_days)
+    late[:120] = np.nan
+    delisted = 100 + rng.normal(size=n_days).cumsum()
+    delisted[250:] = np.nan
+    gapped = 20 + 0.7 * walks[:, 1] + rng.normal(scale=1.0, size=n_days)
+    gapped[100:110] = np.nan
+    index = pd.bdate_range('2020-01-01', periods=n_days)
+    return pd.DataFrame(np.column_stack([walks, late, delisted, gapped]), index=index,
+                        columns=['A', 'B', 'C', 'D', 'E'])
+
+
+class TestPricePanel(unittest.TestCase):
+
+    def setUp(self):
+        self.prices = make_ragged_prices()
+        self.panel = PricePanel.from_frame(self.prices)
+
+    def test_valid_ranges(self):
+        #Диапазон наблюдений и непрерывность каждого тикера
+        self.assertEqual(self.panel.first.tolist(), [0, 0, 120, 0, 0])
+        self.assertEqual(self.panel.last.tolist(), [300, 300, 300, 250, 300])
+        self.assertEqual(self.panel.contiguous.tolist(), [True, True, True, True, False])
+        self.assertEqual(self.panel.ragged.tolist(), [False, False, True, True, True])
+        start, stop = self.panel.overlap(np.array([0, 2]), np.array([2, 3]))
+        self.assertEqual((start.tolist(), stop.tolist()), ([120, 120], [300, 250]))
+
+    def test_pair_view_is_zero_copy(self):
+        #Общее окно пары - срезы панели без копирования и без заполнения
+        x, y = self.panel.pair_view(0, 2)
+        self.assertTrue(np.shares_memory(x, self.panel.values))
+        self.assertTrue(np.shares_memory(y, self.panel.values))
+        expected = self.prices[['A', 'C']].dropna()
+        np.testing.assert_array_equal(x, expected['A'].to_numpy())
+        np.testing.assert_array_equal(y, expected['C'].to_numpy())
+        # С внутренними пропусками - только строки, где заданы обе цены
+        x, y = self.panel.pair_view(1, 4)
+        self.assertEqual(len(x), 290)
+        self.assertFalse(np.isnan(y).any())
+
+    def test_windows_and_float32(self):
+        #Пары группируются по общему окну; float32 вдвое меньше
+        ix, iy = np.array([0, 0, 1, 2]), np.array([1, 2, 2, 3])
+        groups = [(start, stop, members.tolist()) for start, stop, members in self.panel.windows(ix, iy)]
+        self.assertEqual(groups, [(0, 300, [0]), (120, 250, [3]), (120, 300, [1, 2])])
+        small = PricePanel.from_frame(self.prices, dtype=np.float32)
+        self.assertEqual(small.values.dtype, np.float32)
+        self.assertEqual(small.values.nbytes * 2, self.panel.values.nbytes)
+        self.assertEqual(small.first.tolist(), self.panel.first.tolist())
+
+
+class TestRaggedHistories(unittest.TestCase):
+
+    def test_prepare_data_keeps_history_bounds(self):
+        #Без заполнения назад и после делистинга, пропуски внутри - ffill
+        fetcher = DataFetcher()
+        fetcher.data = make_ragged_prices()
+        clean = fetcher.prepare_data()
+        self.assertTrue(clean['C'].iloc[:120].isna().all())
+        self.assertTrue(clean['D'].iloc[250:].isna().all())
+        self.assertFalse(clean['E'].isna().any())
+        self.assertEqual(clean['E'].iloc[105], fetcher.data['E'].iloc[99])
+
+    def test_batch_matches_loop_on_overlap(self):
+        #Пакетный тест по общим окнам совпадает с попарным statsmodels
+        prices, planted = synthetic_prices(12, 400, 3, seed=3, late_start=0.4)
+        loop = CointegrationTester(engine='loop').find_cointegrated_pairs(prices)
+        tester = CointegrationTester(engine='batch')
+        batch = tester.find_cointegrated_pairs(prices)
+        self.assertEqual(tester.metrics.counters.get('pairs_loop', 0), 0)
+        self.assertEqual([(p['ticker_x'], p['ticker_y']) for p in loop],
+                         [(p['ticker_x'], p['ticker_y']) for p in batch])
+        for a, b in zip(loop, batch):
+            for key in ('p_value', 'alpha', 'beta', 'r_squared'):
+                self.assertAlmostEqual(a[key], b[key], places=6)
+        self.assertTrue(planted <= {(p['ticker_x'], p['ticker_y']) for p in batch})
+
+    def test_float32_panel(self):
+        #float32 дает те же пары с близкими p-value
+        prices, _ = synthetic_prices(12, 400, 3, seed=3, late_start=0.4)
+        full = CointegrationTester().find_cointegrated_pairs(prices)
+        tester = CointegrationTester(dtype=np.float32)
+        small = tester.find_cointegrated_pairs(prices)
+        self.assertNotEqual(tester.test_params, CointegrationTester.TEST_PARAMS)
+        self.assertEqual([(p['ticker_x'], p['ticker_y']) for p in full],
+                         [(p['ticker_x'], p['ticker_y']) for p in small])
+        np.testing.assert_allclose([p['p_value'] for p in full], [p['p_value'] for p in small], atol=1e-4)
+
+    def test_dynamic_hedge_late_start(self):
+        #Пара после IPO разогревается на своих первых барах
+        prices = make_ragged_prices()
+        pairs = [{'ticker_x': 'A', 'ticker_y': 'C'}, {'ticker_x': 'A', 'ticker_y': 'B'}]
+        result = DynamicHedge(warmup=60).fit(prices, pairs)
+        beta = result['beta']
+        self.assertTrue(beta[('A', 'C')].iloc[:180].isna().all())
+        self.assertFalse(beta[('A', 'C')].iloc[180:].isna().any())
+        self.assertAlmostEqual(beta[('A', 'C')].iloc[-1], 1.5, delta=0.2)
+        self.assertFalse(beta[('A', 'B')].iloc[60:].isna().any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#Тесты бинарного хранилища цен
+
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+from src.data_fetcher import DataFetcher
+from src.price_store import PriceStore
+from tests.test_batch_engine import make_prices
+
+
+class TestPriceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.prices = make_prices()
+        self.prices.index.name = 'Date'
+        self.prices.iloc[:5, 1] = np.nan
+        self.csv_path = os.path.join(self.tmp.name, 'prices.csv')
+        self.store_path = os.path.join(self.tmp.name, 'store')
+        self.prices.to_csv(self.csv_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_from_csv(self):
+        #Конвертация из CSV сохраняет данные, даты и пропуски
+        store = PriceStore.from_csv(self.csv_path, self.store_path)
+        expected = DataFetcher().load_from_csv(self.csv_path)
+        pd.testing.assert_frame_equal(store.read(), expected, check_freq=False)
+
+    def test_select_tickers_and_dates(self):
+        #Чтение части тикеров за период
+        PriceStore(self.store_path).write(self.prices)
+        start, end = self.prices.index[10], self.prices.index[19]
+        data = DataFetcher().load_from_store(self.store_path, tickers=['T3', 'T1'], start=start, end=end)
+        pd.testing.assert_frame_equal(data, self.prices.loc[start:end, ['T3', 'T1']], check_freq=False)
+
+    def test_unknown_ticker(self):
+        #Неизвестный тикер - ошибка
+        PriceStore(self.store_path).write(self.prices)
+        with self.assertRaises(KeyError):
+            PriceStore(self.store_path).read(tickers=['XXX'])
+
+    def test_interrupted_append_keeps_old_panel(self):
+        #Сбой при записи новой версии не портит хранилище
+        PriceStore(self.store_path).write(self.prices.iloc[:200])
+        store = PriceStore(self.store_path)
+        real_save = np.save
+
+        def failing_save(f, array):
+            if array.ndim == 2:
+                raise OSError("диск заполнен")
+            real_save(f, array)
+
+        with mock.patch('src.price_store.np.save', side_effect=failing_save):
+            with self.assertRaises(OSError):
+                store.append(self.prices.iloc[200:])
+        pd.testing.assert_frame_equal(PriceStore(self.store_path).read(), self.prices.iloc[:200], check_freq=False)
+
+        # Следующая запись завершается и убирает файлы прерванной и старой версий
+        PriceStore(self.store_path).append(self.prices.iloc[200:])
+        pd.testing.assert_frame_equal(PriceStore(self.store_path).read(), self.prices, check_freq=False)
+        self.assertEqual(sorted(os.listdir(self.store_path)), ['dates-0002.npy', 'meta.json', 'values-0002.npy'])
+
+    def test_shape_mismatch_is_detected(self):
+        #Файл цен другой формы, чем в meta.json, - ошибка, а не сдвинутые данные
+        store = PriceStore(self.store_path)
+        store.write(self.prices)
+        np.save(store._file('values'), np.zeros((3, 10)))
+        with self.assertRaises(ValueError):
+            PriceStore(self.store_path).read()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#Тесты инкрементальной дозагрузки цен
+
+
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+from src.price_store import PriceStore
+from src.price_updater import FrameProvider, IncrementalUpdater
+from tests.test_batch_engine import make_prices
+
+
+class TestIncrementalUpdater(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PriceStore(os.path.join(self.tmp.name, 'store'))
+        self.prices = make_prices()
+        self.start = self.prices.index[0]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fetches_only_missing_days(self):
+        #Повторный запуск запрашивает только дни после последней сохраненной даты
+        tickers = ['T0', 'T1', 'T2']
+        first_end = self.prices.index[199]
+        provider = FrameProvider(self.prices)
+        updater = IncrementalUpdater(self.store, provider, batch_size=2)
+        updater.update(tickers, start=self.start, end=first_end)
+        self.assertEqual(len(provider.requests), 2)
+
+        provider.requests.clear()
+        end = self.prices.index[-1]
+        added = updater.update(tickers, start=self.start, end=end)
+        self.assertEqual(added, 100 * 3)
+        for _, req_start, _ in provider.requests:
+            self.assertEqual(req_start, first_end + pd.Timedelta(days=1))
+        pd.testing.assert_frame_equal(self.store.read(), self.prices[tickers], check_freq=False,
+                                      check_names=False)
+
+    def test_new_ticker_does_not_refetch_universe(self):
+        #Новый тикер загружается отдельно, остальные только дозагружаются
+        provider = FrameProvider(self.prices)
+        updater = IncrementalUpdater(self.store, provider)
+        end = self.prices.index[-1]
+        updater.update(['T0', 'T1'], start=self.start, end=end)
+
+        provider.requests.clear()
+        updater.update(['T0', 'T1', 'T5'], start=self.start, end=end)
+        self.assertEqual(provider.requests, [(['T5'], self.start, end)])
+        self.assertEqual(self.store.tickers, ['T0', 'T1', 'T5'])
+
+    def test_up_to_date_store(self):
+        #Если данные актуальны, запросов нет
+        provider = FrameProvider(self.prices)
+        updater = IncrementalUpdater(self.store, provider)
+        end = self.prices.index[-1]
+        updater.update(['T0'], start=self.start, end=end)
+        provider.requests.clear()
+        self.assertEqual(updater.update(['T0'], start=self.start, end=end), 0)
+        self.assertEqual(provider.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
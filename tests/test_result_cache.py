@@ -0,0 +1,61 @@
+#Тесты кэша результатов теста пар
+
+
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from src.cointegration_tester import CointegrationTester
+from src.result_cache import PairResultCache
+from tests.test_batch_engine import make_prices
+
+
+class TestPairResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def scan(self, prices, engine='batch', **kwargs):
+        cache = PairResultCache(self.path, **kwargs)
+        tester = CointegrationTester(engine=engine, cache=cache)
+        pairs = tester.find_cointegrated_pairs(prices)
+        cache.close()
+        return pairs, cache
+
+    def test_repeated_scan_hits_cache(self):
+        #Повторный поиск на тех же данных берет все результаты из кэша
+        prices = make_prices()
+        first, cache = self.scan(prices)
+        self.assertEqual(cache.hits, 0)
+        second, cache = self.scan(prices, engine='loop')
+        self.assertEqual(cache.misses, 0)
+        self.assertGreater(cache.hits, 0)
+        self.assertEqual([(p['ticker_x'], p['ticker_y'], p['p_value']) for p in first],
+                         [(p['ticker_x'], p['ticker_y'], p['p_value']) for p in second])
+        np.testing.assert_allclose(first[0]['residuals'], second[0]['residuals'])
+
+    def test_changed_data_misses(self):
+        #Изменение данных одного тикера дает промахи только для его пар
+        prices = make_prices()
+        _, cache = self.scan(prices)
+        tested = cache.misses
+        prices.iloc[-1, 0] += 1.0
+        _, cache = self.scan(prices)
+        self.assertEqual(cache.misses, prices.shape[1] - 1)
+        self.assertEqual(cache.hits, tested - cache.misses)
+
+    def test_size_cap(self):
+        #Число записей не превышает max_entries
+        _, cache = self.scan(make_prices(), max_entries=5)
+        cache = PairResultCache(self.path, max_entries=5)
+        self.assertEqual(len(cache), 5)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#Тесты хранилища запусков и сервиса запросов
+
+
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import numpy as np
+
+from main import save_results
+from src.cointegration_tester import CointegrationTester
+from src.live_monitor import load_pairs
+from src.query_service import make_server
+from src.result_store import ResultStore
+from tests.test_batch_engine import make_prices
+
+
+def make_pairs(run):
+    #Пары запуска: XOM с beta от 0.25 до 2.5, q-value только у части
+    return [{'ticker_x': 'XOM', 'ticker_y': f'Y{k}', 'p_value': 0.001 * (k + 1), 'alpha': 1.0,
+             'beta': 0.25 * (k + 1) + 0.01 * run, 'r_squared': 0.9, 'q_value': np.nan if k % 2 else 0.01}
+            for k in range(10)] + [{'ticker_x': 'CVX', 'ticker_y': 'XOM', 'p_value': 0.02, 'alpha': 0.0,
+                                    'beta': 1.0, 'r_squared': 0.8}]
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ResultStore(os.path.join(self.tmp.name, 'pairs.sqlite'))
+        for run in range(40):
+            self.store.add_run(make_pairs(run), settings={'run': run})
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_runs(self):
+        #Запуски с последнего, параметры восстанавливаются из JSON
+        latest = self.store.latest_run()
+        self.assertEqual((latest['run_id'], latest['n_pairs'], latest['settings']), (40, 11, {'run': 39}))
+        self.assertEqual([r['run_id'] for r in self.store.runs(limit=3)], [40, 39, 38])
+
+    def test_ticker_beta_last_runs(self):
+        #Пары с XOM на любом месте, beta в [0.5, 2] за последние 30 запусков
+        rows = self.store.pairs(ticker='XOM', beta_min=0.5, beta_max=2, last_runs=30)
+        self.assertEqual({r['run_id'] for r in rows}, set(range(11, 41)))
+        self.assertTrue(all(0.5 <= r['beta'] <= 2 for r in rows))
+        self.assertIn(('CVX', 'XOM'), {(r['ticker_x'], r['ticker_y']) for r in rows})
+        expected = sum(0.5 <= p['beta'] <= 2 for run in range(10, 40) for p in make_pairs(run))
+        self.assertEqual(len(rows), expected)
+        # Свежие запуски первыми, внутри запуска - по p-value
+        self.assertEqual(rows[0]['run_id'], 40)
+        self.assertEqual([r['p_value'] for r in rows if r['run_id'] == 40],
+                         sorted(r['p_value'] for r in rows if r['run_id'] == 40))
+
+    def test_queries_use_indexes(self):
+        #Выборка по тикеру и запуску идет по индексам, а не полным просмотром
+        with self.store.connection() as conn:
+            plan = ' '.join(row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM pairs WHERE (ticker_x = 'XOM' OR ticker_y = 'XOM') "
+                "AND run_id >= 10"))
+        self.assertIn('idx_pairs_x', plan)
+        self.assertIn('idx_pairs_y', plan)
+
+    def test_missing_q_value_is_null(self):
+        #NaN q-value хранится как NULL, фильтр q_max их не берет
+        rows = self.store.run_pairs(limit=2)
+        self.assertEqual([r['q_value'] for r in rows], [0.01, None])
+        self.assertEqual(len(self.store.pairs(run_id=1, q_max=0.05)), 5)
+
+
+class TestQueryService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        store = ResultStore(os.path.join(cls.tmp.name, 'pairs.sqlite'), pool_size=2)
+        for run in range(3):
+            store.add_run(make_pairs(run))
+        cls.server = make_server(store, port=0)
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        cls.executor = ThreadPoolExecutor(1)
+        cls.executor.submit(cls.server.serve_forever)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.executor.shutdown()
+        cls.server.store.close()
+        cls.tmp.cleanup()
+
+    def get(self, path):
+        with urlopen(self.url + path) as response:
+            return json.loads(response.read())
+
+    def test_endpoints(self):
+        #Запросы /runs и /pairs возвращают JSON как методы ResultStore
+        self.assertEqual(self.get('/runs/latest')['run_id'], 3)
+        self.assertEqual(len(self.get('/runs?limit=2')), 2)
+        self.assertEqual(len(self.get('/runs/2/pairs?limit=4')), 4)
+        rows = self.get('/pairs?ticker=XOM&beta_min=0.5&beta_max=2&last_runs=2')
+        self.assertEqual(rows, self.server.store.pairs(ticker='XOM', beta_min=0.5, beta_max=2, last_runs=2))
+
+    def test_concurrent_requests(self):
+        #Параллельные запросы делят пул из двух соединений
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: len(self.get('/pairs?ticker=CVX')), range(32)))
+        self.assertEqual(results, [3] * 32)
+
+    def test_bad_requests(self):
+        #Неизвестный параметр или путь - ошибка с JSON-описанием
+        for path, status in (('/pairs?beta=1', 400), ('/pairs?limit=x', 400), ('/nothing', 404)):
+            with self.assertRaises(HTTPError) as error:
+                self.get(path)
+            self.assertEqual(error.exception.code, status)
+            self.assertIn('error', json.loads(error.exception.read()))
+
+
+class TestSaveResults(unittest.TestCase):
+
+    def test_save_results_feeds_store(self):
+        #save_results пишет запуск в results/pairs.sqlite, load_pairs берет последний запуск
+        prices = make_prices()
+        pairs = CointegrationTester().find_cointegrated_pairs(prices)
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                save_results(pairs, prices, settings={'note': 'first'})
+                save_results(pairs[:1], prices)
+                store = ResultStore('results/pairs.sqlite')
+                runs = store.runs()
+                first = store.run_pairs(1)
+                store.close()
+                table = load_pairs('results')
+            finally:
+                os.chdir(cwd)
+        self.assertEqual([r['n_pairs'] for r in runs], [1, len(pairs)])
+        self.assertEqual(runs[1]['settings'], {'note': 'first'})
+        self.assertEqual(runs[1]['data_end'], prices.index[-1].strftime('%Y-%m-%d'))
+        self.assertEqual([(r['ticker_x'], r['ticker_y']) for r in first],
+                         [(p['ticker_x'], p['ticker_y']) for p in pairs])
+        self.assertEqual(len(table), 1)
+        self.assertAlmostEqual(table['beta'][0], pairs[0]['beta'])
+
+    def test_missing_store_is_not_created(self):
+        #Отсутствующее хранилище - ошибка без создания файла и каталога
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'results', 'pairs.sqlite')
+            with self.assertRaises(FileNotFoundError):
+                load_pairs(path)
+            self.assertFalse(os.path.exists(os.path.dirname(path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#Тесты потоковой записи результатов поиска
+
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.cointegration_tester import CointegrationTester
+from src.result_stream import TopKPairs, read_pair_results, scan_fingerprint, scan_to_disk
+from tests.test_batch_engine import make_prices
+
+
+class TestResultStream(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'scan')
+        self.prices = make_prices(n_tickers=12)
+        self.expected = CointegrationTester().find_cointegrated_pairs(self.prices)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def names(self, pairs):
+        return [(p['ticker_x'], p['ticker_y']) for p in pairs]
+
+    def test_stream_matches_full_scan(self):
+        #Потоковый поиск пишет все пары и возвращает top-k
+        top = scan_to_disk(CointegrationTester(), self.prices, self.path, top_k=3, chunk_size=10)
+        self.assertEqual(self.names(top), self.names(self.expected[:3]))
+        table = read_pair_results(self.path)
+        self.assertEqual(list(zip(table['ticker_x'], table['ticker_y'])), self.names(self.expected))
+
+    def test_resume_after_crash(self):
+        #После сбоя поиск продолжается с контрольной точки
+        tester = CointegrationTester()
+        original = tester._test_candidates
+        calls = []
+
+        def failing(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                raise RuntimeError("сбой")
+            return original(*args, **kwargs)
+
+        with mock.patch.object(tester, '_test_candidates', side_effect=failing):
+            with self.assertRaises(RuntimeError):
+                scan_to_disk(tester, self.prices, self.path, chunk_size=10)
+
+        resumed = CointegrationTester()
+        with mock.patch.object(resumed, '_test_candidates', wraps=resumed._test_candidates) as spy:
+            top = scan_to_disk(resumed, self.prices, self.path, top_k=1000, chunk_size=10)
+        total = resumed.stage_counts['prefilter']
+        self.assertEqual(spy.call_count, -(-(total - 20) // 10))
+        self.assertEqual(self.names(top), self.names(self.expected))
+
+    def test_changed_data_restarts(self):
+        #Контрольная точка от других данных не используется
+        scan_to_disk(CointegrationTester(), self.prices, self.path, chunk_size=10)
+        prices = self.prices.copy()
+        prices.iloc[-1, 0] += 1.0
+        tester = CointegrationTester()
+        with mock.patch.object(tester, '_test_candidates', wraps=tester._test_candidates) as spy:
+            scan_to_disk(tester, prices, self.path, chunk_size=100)
+        self.assertEqual(spy.call_count, 1)
+
+    def test_selection_level_in_fingerprint(self):
+        #Порог отбора блоков входит в отпечаток контрольной точки
+        fingerprints = {scan_fingerprint(CointegrationTester(fdr_level=level), self.prices)
+                        for level in (None, 0.01, 0.2)}
+        self.assertEqual(len(fingerprints), 3)
+
+
+class TestTopKPairs(unittest.TestCase):
+
+    def test_keeps_smallest_p_values(self):
+        #Куча хранит k пар с наименьшим p-value
+        top = TopKPairs(2)
+        top.extend({'ticker_x': f'X{i}', 'ticker_y': 'Y', 'p_value': p}
+                   for i, p in enumerate([0.04, 0.01, 0.03, 0.02]))
+        self.assertEqual([p['p_value'] for p in top.sorted()], [0.01, 0.02])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#Тесты скользящего анализа коинтеграции
+
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from src.batch_engine import engle_granger_adf, hedge_regressions
+from src.rolling_scan import RollingCointegrationScanner
+from tests.test_batch_engine import make_prices
+
+
+class TestRollingScan(unittest.TestCase):
+
+    def test_matches_refit_per_window(self):
+        #Инкрементальные статистики совпадают с пересчетом каждого окна
+        prices = make_prices(n_days=200)
+        scanner = RollingCointegrationScanner(window=120, step=7, pair_chunk=1)
+        result = scanner.scan(prices, pairs=[('T0', 'T4'), ('T1', 'T2')])
+        values = prices.to_numpy()
+        ix, iy = np.array([0, 1]), np.array([4, 2])
+
+        ends = scanner.window_ends(len(values))
+        self.assertEqual(len(result['beta']), len(ends))
+        self.assertEqual(result['beta'].index[-1], prices.index[ends[-1] - 1])
+        for k, end in enumerate(ends):
+            window = values[end - 120:end]
+            expected = hedge_regressions(window, ix, iy)
+            for name in ('alpha', 'beta', 'r_squared'):
+                np.testing.assert_allclose(result[name].iloc[k].to_numpy(), expected[name], rtol=1e-9)
+            resid = window[:, iy] - expected['alpha'] - expected['beta'] * window[:, ix]
+            np.testing.assert_allclose(result['p_value'].iloc[k].to_numpy(),
+                                       engle_granger_adf(resid.T, expected['r_squared'])['p_value'], rtol=1e-6)
+
+    def test_collinear_window(self):
+        #Окна почти совпадающих рядов получают p = 0, как в find_cointegrated_pairs
+        prices = make_prices(n_days=150)
+        prices['COPY'] = 1 + 2 * prices['T0']
+        result = RollingCointegrationScanner(window=100, step=10).scan(prices, pairs=[('T0', 'COPY'), ('T0', 'T4')])
+        self.assertTrue((result['p_value'][('T0', 'COPY')] == 0).all())
+        self.assertTrue((result['p_value'][('T0', 'T4')] > 0).all())
+
+    def test_accepts_pair_dicts(self):
+        #Пары можно передать словарями из find_cointegrated_pairs
+        prices = make_prices(n_days=150)
+        scanner = RollingCointegrationScanner(window=100, step=10)
+        result = scanner.scan(prices, pairs=[{'ticker_x': 'T0', 'ticker_y': 'T4'}], with_p_values=False)
+        self.assertEqual(list(result['beta'].columns), [('T0', 'T4')])
+        self.assertNotIn('p_value', result)
+
+    def test_late_ticker_keeps_other_pairs(self):
+        #Акция с короткой историей не сокращает окна других пар
+        prices = make_prices(n_days=200)
+        scanner = RollingCointegrationScanner(window=100, step=5)
+        expected = scanner.scan(prices, pairs=[('T0', 'T4')])
+        prices['T3'] = prices['T3'].where(prices.index >= prices.index[150])
+        prices.loc[prices.index[20:25], 'T2'] = np.nan
+        result = scanner.scan(prices, pairs=[('T0', 'T4'), ('T1', 'T3'), ('T1', 'T2')])
+        for name in ('beta', 'p_value'):
+            pd.testing.assert_series_equal(result[name][('T0', 'T4')].dropna(), expected[name][('T0', 'T4')],
+                                           rtol=1e-9, check_freq=False)
+        # У пары с поздним тикером окон нет, у пары с пропуском - окна на общих днях
+        self.assertTrue(result['beta'][('T1', 'T3')].isna().all())
+        self.assertEqual(result['beta'][('T1', 'T2')].notna().sum(), len(scanner.window_ends(195)))
+
+    def test_window_longer_than_data(self):
+        #Окно длиннее данных - ошибка
+        with self.assertRaises(ValueError):
+            RollingCointegrationScanner(window=500).scan(make_prices(n_days=100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#Тесты эмпирических p-value и контроля FDR
+
+
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from statsmodels.stats.multitest import multipletests
+
+from src.cointegration_tester import CointegrationTester
+from src.price_panel import PricePanel
+from src.result_cache import PairResultCache
+from src.significance import SignificanceEngine, benjamini_hochberg
+from src.synthetic import synthetic_prices
+
+
+class TestBenjaminiHochberg(unittest.TestCase):
+
+    def test_matches_statsmodels(self):
+        #q-value совпадают с multipletests(fdr_bh), непротестированные - NaN
+        rng = np.random.default_rng(0)
+        p = np.concatenate([rng.uniform(size=200), rng.uniform(0, 1e-3, size=20), [0.01, 0.01]])
+        _, expected, _, _ = multipletests(p, method='fdr_bh')
+        np.testing.assert_allclose(benjamini_hochberg(p), expected, rtol=1e-12)
+        q = benjamini_hochberg(np.array([0.01, np.nan, 0.04]))
+        np.testing.assert_allclose(q, [0.02, np.nan, 0.04])
+
+
+class TestSignificanceEngine(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.prices, cls.planted = synthetic_prices(10, 300, 2, seed=5)
+        cls.panel = PricePanel.from_frame(cls.prices)
+        cls.ix, cls.iy = np.triu_indices(10, k=1)
+        names = [(cls.prices.columns[i], cls.prices.columns[j]) for i, j in zip(cls.ix, cls.iy)]
+        cls.is_planted = np.array([name in cls.planted for name in names])
+
+    def test_replicate_indices(self):
+        #Индексы общие для пар, детерминированы; перестановка берет каждый шаг один раз
+        boot = SignificanceEngine(20, block_size=7).indices(100)
+        self.assertEqual(boot.shape, (20, 100))
+        self.assertTrue(((boot >= 0) & (boot < 100)).all())
+        np.testing.assert_array_equal(boot, SignificanceEngine(20, block_size=7).indices(100))
+        perm = SignificanceEngine(20, method='permutation', block_size=7).indices(100)
+        np.testing.assert_array_equal(np.sort(perm, axis=1), np.tile(np.arange(100), (20, 1)))
+
+    def test_empirical_p_values(self):
+        #Заложенные пары значимы, p-value остальных близки к равномерным
+        engine = SignificanceEngine(49)
+        p = engine.p_values(self.panel, self.ix, self.iy)
+        self.assertLess(p[self.is_planted].max(), 1e-3)
+        self.assertGreater(np.median(p[~self.is_planted]), 0.2)
+        # Без общего пула разрешение p-value - 1 / (реплики + 1)
+        single = SignificanceEngine(49, pooled=False).p_values(self.panel, self.ix, self.iy)
+        np.testing.assert_allclose(single[self.is_planted], 1 / 50)
+        # Пул процессов дает тот же результат
+        parallel = SignificanceEngine(49, n_jobs=2, pair_chunk=8).p_values(self.panel, self.ix, self.iy)
+        np.testing.assert_array_equal(parallel, p)
+
+    def test_screen_keeps_asymptotic(self):
+        #Пары с большим асимптотическим p-value не пересчитываются
+        asymptotic = np.where(self.is_planted, 1e-6, 0.9)
+        p = SignificanceEngine(49, screen=0.5).p_values(self.panel, self.ix, self.iy, asymptotic)
+        np.testing.assert_array_equal(p[~self.is_planted], 0.9)
+        self.assertLess(p[self.is_planted].max(), 1e-3)
+
+
+class TestTesterFdr(unittest.TestCase):
+
+    def test_fdr_selection_and_save(self):
+        #Отбор по q-value по всем тестам, q-value попадает в save_results
+        import main
+        prices, planted = synthetic_prices(16, 300, 3, seed=0)
+        tester = CointegrationTester(significance=SignificanceEngine(49, screen=0.2), fdr_level=0.05)
+        pairs = tester.find_cointegrated_pairs(prices)
+        self.assertTrue(planted <= {(p['ticker_x'], p['ticker_y']) for p in pairs})
+        self.assertEqual(tester.stage_counts['fdr'], len(pairs))
+
+        all_p = np.concatenate(tester.tested_p_values)
+        self.assertEqual(len(all_p), 120)
+        q = benjamini_hochberg(all_p)
+        self.assertEqual(len(pairs), int((q <= 0.05).sum()))
+        for pair in pairs:
+            self.assertLessEqual(pair['q_value'], 0.05)
+            self.assertGreaterEqual(pair['q_value'], pair['p_value'])
+
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                main.save_results(pairs, prices)
+                [name] = [f for f in os.listdir('results') if f.endswith('.csv')]
+                table = pd.read_csv(os.path.join('results', name))
+            finally:
+                os.chdir(cwd)
+        np.testing.assert_allclose(table['Q_Value'], [p['q_value'] for p in pairs])
+
+    def test_cache_does_not_leak_pooled_p_values(self):
+        #Общий пул зависит от всех пар поиска: кэш поиска по части тикеров не меняет полный поиск
+        prices, _ = synthetic_prices(20, 300, 4, seed=1)
+
+        def scan(data, cache=None):
+            tester = CointegrationTester(significance=SignificanceEngine(19), significance_level=1.0, cache=cache)
+            return {(p['ticker_x'], p['ticker_y']): p['p_value'] for p in tester.find_cointegrated_pairs(data)}
+
+        expected = scan(prices)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PairResultCache(os.path.join(tmp, 'cache.sqlite'))
+            scan(prices.iloc[:, :10], cache)
+            cached = scan(prices, cache)
+            self.assertGreater(cache.hits, 0)
+            cache.close()
+        self.assertEqual(cached, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
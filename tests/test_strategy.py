@@ -0,0 +1,114 @@
+#Тесты бэктеста парной стратегии
+
+
+import unittest
+import warnings
+import numpy as np
+import pandas as pd
+
+from src.cointegration_tester import CointegrationTester
+from src.strategy import PairsBacktester, ParameterSweep, _sweep_lookback
+from tests.test_batch_engine import make_prices
+
+
+def reference_positions(z, entry_z, exit_z):
+    #Пошаговый автомат состояний для одной пары
+    pos, out, prev = 0.0, [], np.nan
+    for value in z:
+        if value >= entry_z:
+            pos = -1.0
+        elif value <= -entry_z:
+            pos = 1.0
+        elif abs(value) <= exit_z or np.sign(value) * np.sign(prev) < 0:
+            pos = 0.0
+        out.append(pos)
+        prev = value
+    return np.array(out)
+
+
+class TestPairsBacktester(unittest.TestCase):
+
+    def test_positions_match_state_machine(self):
+        #Векторные позиции совпадают с пошаговым автоматом
+        rng = np.random.default_rng(3)
+        z = rng.normal(scale=1.5, size=(500, 6))
+        z[:10] = np.nan
+        bt = PairsBacktester(entry_z=2.0, exit_z=0.5)
+        positions = bt.positions(z)
+        for p in range(z.shape[1]):
+            np.testing.assert_array_equal(positions[:, p], reference_positions(z[:, p], 2.0, 0.5))
+
+    def test_returns_and_costs(self):
+        #Доходность считается по позиции предыдущего дня, издержки - по обороту
+        bt = PairsBacktester(cost_bps=10.0)
+        x = np.array([[10.0], [10.0], [10.0], [10.0]])
+        y = np.array([[20.0], [21.0], [22.0], [22.0]])
+        positions = np.array([[1.0], [1.0], [0.0], [0.0]])
+        returns = bt.pair_returns(x, y, np.array([1.0]), positions)
+        np.testing.assert_allclose(returns[:, 0], [-0.001, 1 / 30, 1 / 31 - 0.001, 0.0])
+
+    def test_run_on_found_pairs(self):
+        #Бэктест принимает пары из find_cointegrated_pairs
+        prices = make_prices()
+        pairs = CointegrationTester().find_cointegrated_pairs(prices)
+        result = PairsBacktester().run(prices, pairs)
+        self.assertEqual(result['returns'].shape, (len(prices), len(pairs)))
+        self.assertEqual(len(result['pair_metrics']), len(pairs))
+        self.assertIn('sharpe', result['portfolio'])
+        self.assertGreater(result['portfolio']['n_trades'], 0)
+
+
+class TestParameterSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.prices = make_prices(n_tickers=12)
+        self.pairs = CointegrationTester(significance_level=0.1).find_cointegrated_pairs(self.prices)
+
+    def test_pair_rows_match_single_backtest(self):
+        #Строки перебора совпадают с отдельными прогонами бэктеста
+        sweep = ParameterSweep(entry_grid=(1.5, 2.0), exit_grid=(0.0, 0.5), lookbacks=(10, 30), combo_chunk=3)
+        table = sweep.run(self.prices, self.pairs, by='pair')
+        self.assertEqual(len(table), len(self.pairs) * 2 * 4)
+        self.assertTrue(table['sharpe'].is_monotonic_decreasing)
+
+        row = table[(table['lookback'] == 30) & (table['entry_z'] == 1.5) & (table['exit_z'] == 0.5)]
+        single = PairsBacktester(entry_z=1.5, exit_z=0.5, lookback=30).run(self.prices, self.pairs)
+        expected = single['pair_metrics']['sharpe']
+        for _, r in row.iterrows():
+            self.assertAlmostEqual(r['sharpe'], expected[(r['ticker_x'], r['ticker_y'])], places=10)
+
+    def test_portfolio_by_significance(self):
+        #Портфель на каждом уровне значимости строится из пар с p_value не выше уровня
+        sweep = ParameterSweep(entry_grid=(2.0,), exit_grid=(0.5,), lookbacks=(20,),
+                               significance_levels=(0.1,))
+        table = sweep.run(self.prices, self.pairs)
+        single = PairsBacktester(entry_z=2.0, exit_z=0.5, lookback=20).run(self.prices, self.pairs)
+        self.assertEqual(table.loc[0, 'n_pairs'], len(self.pairs))
+        self.assertAlmostEqual(table.loc[0, 'sharpe'], single['portfolio']['sharpe'], places=10)
+        self.assertEqual(table.loc[0, 'n_trades'], single['portfolio']['n_trades'])
+
+    def test_process_pool(self):
+        #Пул процессов дает ту же таблицу
+        sweep = ParameterSweep(entry_grid=(2.0,), exit_grid=(0.5,), lookbacks=(10, 20))
+        serial = sweep.run(self.prices, self.pairs)
+        sweep.n_jobs = 2
+        pd.testing.assert_frame_equal(serial, sweep.run(self.prices, self.pairs))
+
+    def test_empty_significance_level(self):
+        #Уровень значимости без пар дает NaN-метрики без предупреждений и не попадает в таблицу
+        x, y, alpha, beta = PairsBacktester.pair_matrices(self.prices, self.pairs)
+        masks = [np.zeros(len(self.pairs), dtype=bool), np.ones(len(self.pairs), dtype=bool)]
+        task = (y - alpha - beta * x, PairsBacktester.unit_returns(x, y, beta), 20, [(2.0, 0.5)], masks, 5.0, 8)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            portfolio = _sweep_lookback(task)['portfolio']
+            table = ParameterSweep(entry_grid=(2.0,), exit_grid=(0.5,), lookbacks=(20,),
+                                   significance_levels=(0.0, 0.1)).run(self.prices, self.pairs)
+        self.assertTrue(np.isnan(portfolio['sharpe'][0, 0]))
+        self.assertTrue(np.isfinite(portfolio['sharpe'][1, 0]))
+        self.assertEqual(portfolio['n_trades'][0, 0], 0)
+        self.assertEqual(table['significance_level'].tolist(), [0.1])
+
+
+if __name__ == '__main__':
+    unittest.main()
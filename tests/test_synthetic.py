@@ -0,0 +1,39 @@
+#Тесты генератора синтетической панели цен
+
+
+import unittest
+
+from src.cointegration_tester import CointegrationTester
+from src.synthetic import synthetic_prices
+
+
+class TestSyntheticPrices(unittest.TestCase):
+
+    def test_deterministic(self):
+        #Одинаковый seed - одинаковая панель и пары
+        a, planted_a = synthetic_prices(30, 200, 5, seed=3, late_start=0.2)
+        b, planted_b = synthetic_prices(30, 200, 5, seed=3, late_start=0.2)
+        self.assertTrue(a.equals(b))
+        self.assertEqual(planted_a, planted_b)
+        self.assertFalse(a.equals(synthetic_prices(30, 200, 5, seed=4)[0]))
+
+    def test_planted_pairs_are_found(self):
+        #Заложенные пары находит полный поиск
+        prices, planted = synthetic_prices(40, 400, 6)
+        self.assertEqual(len(planted), 6)
+        found = {(p['ticker_x'], p['ticker_y']) for p in CointegrationTester().find_cointegrated_pairs(prices)}
+        self.assertLessEqual(planted, found)
+
+    def test_late_start(self):
+        #Часть тикеров начинается позже, пропуски только в начале
+        prices, _ = synthetic_prices(20, 100, 0, late_start=0.25)
+        late = prices.columns[prices.iloc[0].isna()]
+        self.assertEqual(len(late), 5)
+        for ticker in late:
+            series = prices[ticker]
+            self.assertTrue(series.loc[series.first_valid_index():].notna().all())
+        self.assertEqual(prices.index.name, 'Date')
+
+
+if __name__ == '__main__':
+    unittest.main()
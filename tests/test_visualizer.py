@@ -0,0 +1,80 @@
+#Тесты пакетной отрисовки графиков без экрана
+
+
+import os
+import tempfile
+import unittest
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+
+from src.cointegration_tester import CointegrationTester
+from src.synthetic import synthetic_prices
+from src.visualizer import Visualizer, downsample
+
+
+class TestDownsample(unittest.TestCase):
+
+    def test_keeps_extremes(self):
+        #Прореженный ряд не длиннее предела и сохраняет минимум и максимум
+        rng = np.random.default_rng(0)
+        series = pd.Series(rng.normal(size=10001).cumsum())
+        series.iloc[1234] = 1e3
+        short = downsample(series, 500)
+        self.assertLessEqual(len(short), 500)
+        self.assertEqual(short.max(), series.max())
+        self.assertEqual(short.min(), series.min())
+        self.assertTrue(short.index.is_monotonic_increasing)
+
+    def test_short_series_unchanged(self):
+        #Короткий ряд и max_points=None - без изменений
+        series = pd.Series(np.arange(10.0))
+        self.assertIs(downsample(series, 100), series)
+        self.assertIs(downsample(series, None), series)
+
+
+class TestHeadlessRendering(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        prices, _ = synthetic_prices(12, 400, 4, seed=2)
+        cls.prices = prices
+        cls.pairs = CointegrationTester().find_cointegrated_pairs(prices)[:4]
+
+    def test_render_pairs_to_files(self):
+        #Каждая пара дает два файла, фигуры одного вида переиспользуются
+        with tempfile.TemporaryDirectory() as tmp:
+            viz = Visualizer(output_dir=tmp, max_points=100, dpi=30)
+            paths = viz.render_pairs(self.prices, self.pairs)
+            self.assertEqual(len(paths), 2 * len(self.pairs) + 1)
+            self.assertTrue(all(os.path.getsize(path) > 0 for path in paths))
+            self.assertEqual(set(viz._figures), {'prices', 'spread', 'top_pairs'})
+
+    def test_figure_reuse_draws_only_current_pair(self):
+        #На переиспользуемой фигуре нет линий предыдущей пары
+        with tempfile.TemporaryDirectory() as tmp:
+            viz = Visualizer(output_dir=tmp, dpi=30)
+            for pair in self.pairs[:2]:
+                viz.plot_price_comparison(self.prices, pair)
+            _, axes = viz._figures['prices']
+            labels = [line.get_label() for line in axes[0].get_lines()]
+            self.assertEqual(labels, [self.pairs[1]['ticker_x'], self.pairs[1]['ticker_y']])
+
+    def test_parallel_matches_serial(self):
+        #Параллельная отрисовка создает те же файлы
+        with tempfile.TemporaryDirectory() as tmp:
+            serial = Visualizer(output_dir=os.path.join(tmp, 'serial'), dpi=30).render_pairs(
+                self.prices, self.pairs)
+            parallel = Visualizer(output_dir=os.path.join(tmp, 'parallel'), dpi=30).render_pairs(
+                self.prices, self.pairs, n_jobs=2)
+            self.assertEqual([os.path.basename(p) for p in serial], [os.path.basename(p) for p in parallel])
+
+    def test_render_requires_output_dir(self):
+        #Без каталога пакетная отрисовка недоступна
+        with self.assertRaises(ValueError):
+            Visualizer().render_pairs(self.prices, self.pairs)
+
+
+if __name__ == '__main__':
+    unittest.main()